@@ -102,7 +102,7 @@ def main():
     parser.add_argument("--public-url", type=str, default="", help="Public URL for QR codes")
     parser.add_argument("--config", type=str, default="buddai_config.json", help="Path to main config file")
     parser.add_argument("--personality", type=str, help="Override personality file path")
-    parser.add_argument("--domain", type=str, help="Override domain config file path")
+    parser.add_argument("--domain", type=str, help="Override domain config file path (comma-separated to combine several)")
     args = parser.parse_args()
 
     if args.server:
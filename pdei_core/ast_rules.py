@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\ast_rules.py
+P.DE.I Framework - AST Rules for Python Code
+============================================
+
+Substring rules cannot tell a `def` in a comment from a real one, or which function lacks a
+decorator. For Python code blocks a rule may instead name AST node types and a predicate:
+
+    {"id": "audit_trail_header", "severity": "error", "message": "...",
+     "ast": {"node": ["FunctionDef", "ClassDef"], "predicate": "missing_decorator",
+             "args": {"name": "audit_log"}}}
+
+Every node of those types for which the predicate holds is reported. Predicates are looked up
+by name in `PREDICATES` (config files never carry code). When the block is not valid Python
+(e.g. a fragment), the rule's substring fields, if any, are checked instead.
+
+Key Components:
+1. parse_python: One `ast.parse` per distinct block (memoized), with a node-type index and
+   line/column -> offset mapping shared by every AST rule and by AST-based fixes.
+2. AstCheck: Compiled `ast` spec of a rule (node classes + predicate + args).
+3. PREDICATES: The named predicates available to domain configs.
+
+Where it fits:
+    `rules.py` compiles the `ast` field of a rule into an `AstCheck`. `lexer.py` exposes the
+    parsed block as `BlockAnalysis.python`, which `logic.py` evaluates AST rules against.
+"""
+import ast
+import logging
+import re
+import warnings
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+Predicate = Callable[[ast.AST, Dict[str, Any]], bool]
+
+_NEWLINE = re.compile(r'\r\n|\r|\n')
+
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+DEFINITION_NODES = FUNCTION_NODES + (ast.ClassDef,)
+
+
+class ParsedPython:
+    """A parsed block: the tree, its nodes grouped by type, and offsets of every line."""
+    __slots__ = ("code", "tree", "_by_type", "_line_starts")
+
+    def __init__(self, code: str, tree: ast.Module):
+        self.code = code
+        self.tree = tree
+        self._by_type: Dict[Type[ast.AST], List[ast.AST]] = {}
+        for node in ast.walk(tree):
+            self._by_type.setdefault(type(node), []).append(node)
+        self._line_starts = [0] + [m.end() for m in _NEWLINE.finditer(code)]
+
+    def nodes(self, *types: Type[ast.AST]) -> List[ast.AST]:
+        """Nodes of the given types, in source order."""
+        found = [node for t in types for node in self._by_type.get(t, [])]
+        if len(types) > 1:
+            found.sort(key=lambda n: (n.lineno, n.col_offset))
+        return found
+
+    def offset(self, lineno: int, col_offset: int) -> int:
+        """Character offset of an AST position (`col_offset` counts UTF-8 bytes)."""
+        start = self._line_starts[lineno - 1]
+        line = self.code[start:start + col_offset * 4]
+        return start + len(line.encode('utf-8')[:col_offset].decode('utf-8', errors='ignore'))
+
+    def span(self, node: ast.AST) -> Tuple[int, int]:
+        start = self.offset(node.lineno, node.col_offset)
+        end_lineno = getattr(node, 'end_lineno', None)
+        if end_lineno is None:
+            return start, start
+        return start, self.offset(end_lineno, node.end_col_offset)
+
+
+@lru_cache(maxsize=32)
+def parse_python(code: str) -> Optional[ParsedPython]:
+    """Parse a block once; None if it is not valid Python (fragments, other languages)."""
+    try:
+        with warnings.catch_warnings():
+            # Generated code often has invalid escape sequences; that is not our report to make
+            warnings.simplefilter("ignore")
+            tree = ast.parse(code)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return None
+    return ParsedPython(code, tree)
+
+
+# --- Predicates ---
+
+def decorator_names(node: ast.AST) -> List[str]:
+    names = []
+    for decorator in getattr(node, 'decorator_list', []):
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        names.append(dotted_name(target).rsplit('.', 1)[-1])
+    return names
+
+
+def dotted_name(node: ast.AST) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = dotted_name(node.value)
+        return f"{base}.{node.attr}" if base else node.attr
+    return ""
+
+
+def _is_public(node: ast.AST) -> bool:
+    return not getattr(node, 'name', '').startswith('_')
+
+
+def _missing_docstring(node: ast.AST, args: Dict[str, Any]) -> bool:
+    if not isinstance(node, DEFINITION_NODES + (ast.Module,)):
+        return False
+    if args.get('public_only', True) and not _is_public(node):
+        return False
+    return ast.get_docstring(node, clean=False) is None
+
+
+def _missing_arg_annotations(node: ast.AST, args: Dict[str, Any]) -> bool:
+    if not isinstance(node, FUNCTION_NODES):
+        return False
+    a = node.args
+    params = a.posonlyargs + a.args + a.kwonlyargs + [p for p in (a.vararg, a.kwarg) if p is not None]
+    if params and params[0].arg in ('self', 'cls'):
+        params = params[1:]
+    return any(p.annotation is None for p in params)
+
+
+def _missing_return_annotation(node: ast.AST, args: Dict[str, Any]) -> bool:
+    return isinstance(node, FUNCTION_NODES) and node.returns is None and node.name != '__init__'
+
+
+def _missing_decorator(node: ast.AST, args: Dict[str, Any]) -> bool:
+    return args['name'] not in decorator_names(node)
+
+
+def _calls(node: ast.AST, args: Dict[str, Any]) -> bool:
+    if not isinstance(node, ast.Call):
+        return False
+    name = dotted_name(node.func)
+    return any(name == f or name.endswith('.' + f) for f in args['names'])
+
+
+def _bare_except(node: ast.AST, args: Dict[str, Any]) -> bool:
+    return isinstance(node, ast.ExceptHandler) and node.type is None
+
+
+def _mutable_default(node: ast.AST, args: Dict[str, Any]) -> bool:
+    if not isinstance(node, FUNCTION_NODES):
+        return False
+    defaults = node.args.defaults + [d for d in node.args.kw_defaults if d is not None]
+    return any(isinstance(d, (ast.List, ast.Dict, ast.Set))
+               or (isinstance(d, ast.Call) and dotted_name(d.func) in ('list', 'dict', 'set'))
+               for d in defaults)
+
+
+def _imports(node: ast.AST, args: Dict[str, Any]) -> bool:
+    if isinstance(node, ast.Import):
+        modules = [alias.name for alias in node.names]
+    elif isinstance(node, ast.ImportFrom):
+        modules = [node.module or ""]
+    else:
+        return False
+    return any(m == target or m.startswith(target + '.') for m in modules for target in args['modules'])
+
+
+def _string_contains(node: ast.AST, args: Dict[str, Any]) -> bool:
+    return isinstance(node, ast.Constant) and isinstance(node.value, str) and any(v in node.value for v in args['values'])
+
+
+def _always(node: ast.AST, args: Dict[str, Any]) -> bool:
+    return True
+
+
+# Name -> (predicate, required args)
+PREDICATES: Dict[str, Tuple[Predicate, Tuple[str, ...]]] = {
+    "always": (_always, ()),
+    "missing_docstring": (_missing_docstring, ()),
+    "missing_arg_annotations": (_missing_arg_annotations, ()),
+    "missing_return_annotation": (_missing_return_annotation, ()),
+    "missing_decorator": (_missing_decorator, ("name",)),
+    "calls": (_calls, ("names",)),
+    "bare_except": (_bare_except, ()),
+    "mutable_default": (_mutable_default, ()),
+    "imports": (_imports, ("modules",)),
+    "string_contains": (_string_contains, ("values",)),
+}
+
+
+class AstCheck:
+    """The compiled `ast` field of a rule."""
+    __slots__ = ("node_types", "predicate_name", "predicate", "args")
+
+    def __init__(self, node_types: Tuple[Type[ast.AST], ...], predicate_name: str, args: Dict[str, Any]):
+        self.node_types = node_types
+        self.predicate_name = predicate_name
+        self.predicate = PREDICATES[predicate_name][0]
+        self.args = args
+
+    def find(self, parsed: ParsedPython) -> List[ast.AST]:
+        """Nodes violating the rule."""
+        return [node for node in parsed.nodes(*self.node_types) if self.predicate(node, self.args)]
+
+    def describe(self, node: ast.AST) -> str:
+        name = getattr(node, 'name', None)
+        target = f"{type(node).__name__} '{name}'" if name else type(node).__name__
+        return f"AST check failed ({self.predicate_name}): {target}"
+
+
+def compile_ast_check(spec: Any, rule_id: Any = None) -> Optional[AstCheck]:
+    """Validate an `ast` rule spec; invalid specs are logged and disable the AST check."""
+    try:
+        if not isinstance(spec, dict):
+            raise ValueError("'ast' must be an object")
+        names = spec.get('node')
+        names = [names] if isinstance(names, str) else list(names or [])
+        node_types = []
+        for name in names:
+            node_type = getattr(ast, str(name), None)
+            if not (isinstance(node_type, type) and issubclass(node_type, ast.AST)):
+                raise ValueError(f"unknown node type {name!r}")
+            node_types.append(node_type)
+        if not node_types:
+            raise ValueError("no node type given")
+        predicate = spec.get('predicate', 'always')
+        if predicate not in PREDICATES:
+            raise ValueError(f"unknown predicate {predicate!r}")
+        args = dict(spec.get('args') or {})
+        missing = [a for a in PREDICATES[predicate][1] if a not in args]
+        if missing:
+            raise ValueError(f"predicate {predicate!r} needs {', '.join(missing)}")
+        for key in ('names', 'modules', 'values'):
+            if isinstance(args.get(key), str):
+                args[key] = [args[key]]
+        return AstCheck(tuple(node_types), predicate, args)
+    except (TypeError, ValueError) as e:
+        logging.warning(f"Ignoring invalid AST spec of rule {rule_id!r}: {e}")
+        return None
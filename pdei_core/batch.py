@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\batch.py
+P.DE.I Framework - Batch Validation Pool
+========================================
+
+Validating a whole project (VS Code extension, CI scripts) means thousands of independent
+`(code, context, language)` items. Rule matching is CPU-bound pure Python, so threads do not help; this
+module fans the work out over worker processes instead.
+
+Key Components:
+1. ValidationPool: A process pool whose workers each build one `PDEIValidator` at startup (the
+   compiled rule set is then reused for every item) and validate items in chunks.
+2. get_pool: Process-wide pools keyed by the rule set they were built for.
+
+Where it fits:
+    `PDEIValidator.validate_many` (`logic.py`) serves cache hits itself and sends the misses
+    here. `server.py` streams the results of `POST /api/validate` as NDJSON.
+"""
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+ValidationResult = Tuple[bool, List[Dict[str, Any]]]
+
+# Items per task: large enough to amortize pickling, small enough to balance across workers
+DEFAULT_CHUNK_SIZE = 16
+# Below this many uncached items, starting/feeding the pool costs more than it saves
+MIN_POOL_ITEMS = 32
+# Pools kept alive at once (each one holds `workers` processes)
+MAX_POOLS = 2
+
+# The validator owned by a worker process (set by the pool initializer)
+_worker_validator = None
+
+
+def _init_worker(domain_config: Dict[str, Any], config_path: Optional[str], db_path: Optional[str], user_id: str):
+    global _worker_validator
+    # Imported here: logic.py imports this module
+    from pdei_core.logic import PDEIValidator
+    from pdei_core.memory import PDEIMemory
+
+    memory = PDEIMemory(db_path, user_id) if db_path else None
+    _worker_validator = PDEIValidator(domain_config, memory, config_path=config_path)
+
+
+def _validate_chunk(chunk: List[Tuple[str, str, Optional[str]]]) -> List[ValidationResult]:
+    return [_worker_validator.validate(code, context, language) for code, context, language in chunk]
+
+
+class ValidationPool:
+    """
+    Process pool that validates `(code, context, language)` items against one rule set.
+
+    Results are yielded in input order as soon as the chunk holding them is done. At most two
+    chunks per worker are in flight, so a long batch is streamed instead of buffered.
+    """
+    def __init__(self, workers: int, domain_config: Dict[str, Any], config_path: Optional[str] = None,
+                 db_path: Optional[str] = None, user_id: str = "default"):
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(domain_config, config_path, db_path, user_id),
+        )
+
+    def map(self, items: List[Tuple[str, str, Optional[str]]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[ValidationResult]:
+        chunks = iter([items[i:i + chunk_size] for i in range(0, len(items), chunk_size)])
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(self._executor.submit(_validate_chunk, chunk))
+            if len(in_flight) >= self.workers * 2:
+                break
+        while in_flight:
+            results = in_flight.popleft().result()
+            chunk = next(chunks, None)
+            if chunk is not None:
+                in_flight.append(self._executor.submit(_validate_chunk, chunk))
+            yield from results
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_POOLS: "OrderedDict[Hashable, ValidationPool]" = OrderedDict()
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(key: Hashable, build: Callable[[], ValidationPool]) -> ValidationPool:
+    """Return the pool for `key`, building it on first use; the least recently used pool is shut down."""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is not None:
+            _POOLS.move_to_end(key)
+            return pool
+        pool = build()
+        _POOLS[key] = pool
+        while len(_POOLS) > MAX_POOLS:
+            _, evicted = _POOLS.popitem(last=False)
+            evicted.shutdown()
+        return pool
+
+
+def discard_pool(key: Hashable):
+    """Drop a pool (e.g. after one of its workers died) so the next batch starts a fresh one."""
+    with _POOLS_LOCK:
+        pool = _POOLS.pop(key, None)
+    if pool is not None:
+        logging.warning("Batch validation pool discarded; remaining items are validated in-process")
+        pool.shutdown()
@@ -36,9 +36,16 @@ try:
 except ImportError:
     psutil = None
 
+from pdei_core.composite import CompositeValidator
+from pdei_core.fixes import apply_edits
 from pdei_core.logic import PDEIValidator
-from pdei_core.memory import PDEIMemory
-from pdei_core.shared import DATA_DIR, DB_PATH, MODELS, OLLAMA_HOST, OLLAMA_PORT, COMPLEX_TRIGGERS, SERVER_AVAILABLE, APP_NAME, DEFAULT_USER, DEFAULT_AI, MODULE_PATTERNS
+from pdei_core.lut import lut_header_for_tau, lut_header_for_tuning
+from pdei_core.memory import PDEIMemory, content_hash, get_pool, sync_repo_search
+from pdei_core.profiler import format_profile
+from pdei_core.safe_regex import get_guard, is_safe_pattern
+from pdei_core.shared import DATA_DIR, DB_PATH, MODELS, OLLAMA_HOST, OLLAMA_PORT, COMPLEX_TRIGGERS, SERVER_AVAILABLE, APP_NAME, DEFAULT_USER, DEFAULT_AI, MODULE_PATTERNS, SOURCE_SUFFIXES
+from pdei_core.tuning import TuningConstraints, optimize_tuning
+from pdei_core.vectors import VectorIndex, make_embedder
 
 class OllamaConnectionPool:
     def __init__(self, host: str, port: int, max_size: int = 10):
@@ -148,10 +155,8 @@ class BuddAI(PDEIExecutive):
 
     def search_repositories(self, query: str) -> str:
         """Search repo_index for relevant functions and code"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM repo_index WHERE user_id = ?", (self.user_id,))
-        count = cursor.fetchone()[0]
+        with self.memory.connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM repo_index WHERE user_id = ?", (self.user_id,)).fetchone()[0]
         print(f"\n🔍 Searching {count} indexed functions...\n")
 
         # Extract keywords from query
@@ -167,41 +172,18 @@ class BuddAI(PDEIExecutive):
         
         if not keywords:
             print("❌ No search terms found")
-            conn.close()
             return "No search terms provided."
             
-        # Build parameterized query
-        conditions = []
-        params = []
-        for keyword in keywords:
-            conditions.append("(function_name LIKE ? OR content LIKE ? OR repo_name LIKE ?)")
-            params.extend([f"%{keyword}%", f"%{keyword}%", f"%{keyword}%"])
-            
-        sql = f"SELECT repo_name, file_path, function_name, content FROM repo_index WHERE ({' OR '.join(conditions)}) AND user_id = ? ORDER BY last_modified DESC LIMIT 10"
-        params.append(self.user_id)
-        
-        cursor.execute(sql, params)
-        results = cursor.fetchall()
-        conn.close()
+        # Ranked full-text search (FTS5/BM25), best match first
+        results = self.memory.search_repo_index(keywords, limit=10, snippet_tokens=64)
         if not results:
             return f"❌ No functions found matching: {', '.join(keywords)}\n\nTry: /index <path> to index more repositories"
         # Format results
         output = f"✅ Found {len(results)} matches for: {', '.join(set(keywords))}\n\n"
-        for i, (repo, file_path, func, content) in enumerate(results, 1):
-            # Extract relevant snippet
-            lines = content.split('\n')
-            snippet_lines = []
-            for line in lines[:30]:  # First 30 lines
-                if any(kw in line.lower() for kw in keywords):
-                    snippet_lines.append(line)
-                if len(snippet_lines) >= 10:
-                    break
-            if not snippet_lines:
-                snippet_lines = lines[:10]
-            snippet = '\n'.join(snippet_lines)
-            output += f"**{i}. {func}()** in {repo}\n"
-            output += f"   📁 {Path(file_path).name}\n"
-            output += f"\n```cpp\n{snippet}\n```\n"
+        for i, hit in enumerate(results, 1):
+            output += f"**{i}. {hit['function']}()** in {hit['repo']}\n"
+            output += f"   📁 {Path(hit['file_path']).name}\n"
+            output += f"\n```cpp\n{hit['snippet']}\n```\n"
             output += f"   ---\n\n"
         return output
     
@@ -224,8 +206,12 @@ class BuddAI(PDEIExecutive):
         if 'domain' not in self.app_config:
             self.app_config['domain'] = "domain_configs/embedded.json"
 
-        # 2. Initialize Generic Core (Loads Personality & Domain)
-        super().__init__(self.app_config['personality'], self.app_config['domain'])
+        # Several domains: a JSON list in the config file, or comma-separated from --domain
+        domain = self.app_config['domain']
+        self.domain_config_paths = domain if isinstance(domain, list) else [p.strip() for p in str(domain).split(',') if p.strip()]
+
+        # 2. Initialize Generic Core (Loads Personality & Domain; settings come from the first domain)
+        super().__init__(self.app_config['personality'], self.domain_config_paths[0])
 
         self.user_id = user_id
         self.last_generated_id = None
@@ -237,8 +223,13 @@ class BuddAI(PDEIExecutive):
         self._load_active_model()
         
         # 3. Initialize Core Components
-        self.memory = PDEIMemory(DB_PATH, user_id)
-        self.validator = PDEIValidator(self.domain_config, self.memory)
+        # Chat messages are written behind by default; "message_durability": "sync" commits each one.
+        # Large text (reports, indexed files) is stored as-is unless "compression" is "zlib" or "zstd".
+        self.memory = PDEIMemory(DB_PATH, user_id, durability=self.app_config.get('message_durability', 'async'),
+                                 compression=self.app_config.get('compression', 'none'))
+        self.validator = self._create_validator()
+        # Semantic code search for style context ("embedder": "hashing" | "ollama" | "ollama:<model>")
+        self.vector_index = VectorIndex(self.memory, make_embedder(self.app_config.get('embedder')), DATA_DIR / "vectors")
         
         self.session_id = self.create_session()
         self.server_mode = server_mode
@@ -279,7 +270,17 @@ class BuddAI(PDEIExecutive):
                         return json.load(f)
                 except: pass
         return {}
-        
+
+    def _create_validator(self) -> PDEIValidator:
+        """One validator for the configured domain, or a composite one (single pass) for several."""
+        if len(self.domain_config_paths) > 1:
+            try:
+                return CompositeValidator.from_paths(self.domain_config_paths, self.memory,
+                                                     suppressed_rules=self.app_config.get('suppressed_rules', []))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not combine domains {self.domain_config_paths}: {e}; using {self.domain_config_path}")
+        return PDEIValidator(self.domain_config, self.memory, config_path=self.domain_config_path)
+
     def _load_active_model(self):
         """Load the currently active model from deployment log."""
         try:
@@ -316,11 +317,8 @@ class BuddAI(PDEIExecutive):
         welcome_msg = welcome_tmpl.replace("{ai_name}", ai_name).replace("{user_name}", user_name)
         
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM code_rules")
-            count = cursor.fetchone()[0]
-            conn.close()
+            with self.memory.connection() as conn:
+                count = conn.execute("SELECT COUNT(*) FROM code_rules").fetchone()[0]
             welcome_msg = welcome_msg.replace("{rule_count}", str(count))
             welcome_msg = welcome_msg.replace("{schedule_status}", self.get_user_status())
             print(welcome_msg)
@@ -393,34 +391,29 @@ class BuddAI(PDEIExecutive):
         now = datetime.now()
         base_id = now.strftime("%Y%m%d_%H%M%S")
         session_id = base_id
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
         
         counter = 0
-        while True:
-            try:
-                cursor.execute(
-                    "INSERT INTO sessions (session_id, user_id, started_at) VALUES (?, ?, ?)",
-                    (session_id, self.user_id, now.isoformat())
-                )
-                conn.commit()
-                break
-            except sqlite3.IntegrityError:
-                counter += 1
-                session_id = f"{base_id}_{counter}"
+        with self.memory.connection() as conn:
+            while True:
+                try:
+                    conn.execute(
+                        "INSERT INTO sessions (session_id, user_id, started_at) VALUES (?, ?, ?)",
+                        (session_id, self.user_id, now.isoformat())
+                    )
+                    break
+                except sqlite3.IntegrityError:
+                    counter += 1
+                    session_id = f"{base_id}_{counter}"
                 
-        conn.close()
         return session_id
         
     def end_session(self) -> None:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE sessions SET ended_at = ? WHERE session_id = ?",
-            (datetime.now().isoformat(), self.session_id)
-        )
-        conn.commit()
-        conn.close()
+        self.memory.flush_messages()
+        with self.memory.connection() as conn:
+            conn.execute(
+                "UPDATE sessions SET ended_at = ? WHERE session_id = ?",
+                (datetime.now().isoformat(), self.session_id)
+            )
         
     def save_message(self, role: str, content: str) -> int:
         return self.memory.save_message(self.session_id, role, content)
@@ -436,42 +429,43 @@ class BuddAI(PDEIExecutive):
             print(f"❌ Path not found: {root_path}")
             return
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        count = 0
+        rows = []
+        blobs = {}
         
         for file_path in path.rglob('*'):
-            if file_path.is_file() and file_path.suffix in ['.py', '.ino', '.cpp', '.h', '.js', '.jsx', '.html', '.css']:
+            if file_path.is_file() and file_path.suffix in SOURCE_SUFFIXES:
                 try:
                     with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                         content = f.read()
                         
+                    # (name, start, end) of each function's code within the file
                     functions = []
                     
                     # Python parsing
                     if file_path.suffix == '.py':
                         try:
                             tree = ast.parse(content)
+                            line_starts = self._line_starts(content)
                             for node in ast.walk(tree):
                                 if isinstance(node, ast.FunctionDef):
-                                    functions.append(node.name)
-                        except:
+                                    functions.append((node.name, line_starts[node.lineno - 1], line_starts[min(node.end_lineno, len(line_starts) - 1)]))
+                        except (SyntaxError, ValueError):
                             pass
                             
                     # C++/Arduino parsing
                     elif file_path.suffix in ['.ino', '.cpp', '.h']:
-                        matches = re.findall(r'\b(?:void|int|bool|float|double|String|char)\s+(\w+)\s*\(', content)
-                        functions.extend(matches)
+                        for m in re.finditer(r'\b(?:void|int|bool|float|double|String|char)\s+(\w+)\s*\(', content):
+                            functions.append((m.group(1), m.start(), self._block_end(content, m.end())))
 
                     # JS/Web parsing
                     elif file_path.suffix in ['.js', '.jsx']:
-                        matches = re.findall(r'(?:function\s+(\w+)|const\s+(\w+)\s*=\s*(?:async\s*)?\(?.*?\)?\s*=>)', content)
-                        functions.extend([m[0] or m[1] for m in matches if m[0] or m[1]])
+                        for m in re.finditer(r'(?:function\s+(\w+)|const\s+(\w+)\s*=\s*(?:async\s*)?\(?.*?\)?\s*=>)', content):
+                            if m.group(1) or m.group(2):
+                                functions.append((m.group(1) or m.group(2), m.start(), self._block_end(content, m.end())))
 
                     # HTML/CSS - Index as whole file
                     elif file_path.suffix in ['.html', '.css']:
-                        functions.append("file_content")
+                        functions.append(("file_content", 0, len(content)))
                     
                     # Determine repo name
                     try:
@@ -481,19 +475,56 @@ class BuddAI(PDEIExecutive):
                         
                     timestamp = datetime.fromtimestamp(file_path.stat().st_mtime)
                     
-                    for func in functions:
-                        cursor.execute("""
-                            INSERT INTO repo_index (user_id, file_path, repo_name, function_name, content, last_modified)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        """, (self.user_id, str(file_path), repo_name, func, content, timestamp.isoformat()))
-                        count += 1
+                    if functions:
+                        # The file is stored once (content-addressed); each function row points at its span
+                        digest = content_hash(content)
+                        blobs[digest] = content
+                        for func, start, end in functions:
+                            rows.append((self.user_id, str(file_path), repo_name, func, digest, start, end, timestamp.isoformat()))
                         
                 except Exception:
                     pass
                     
-        conn.commit()
-        conn.close()
-        print(f"✅ Indexed {count} functions across repositories")
+        # One pooled connection and one transaction for the whole walk
+        with self.memory.connection() as conn:
+            conn.executemany("INSERT OR IGNORE INTO repo_blobs (hash, content) VALUES (?, ?)",
+                             [(digest, self.memory.pack(content)) for digest, content in blobs.items()])
+            conn.executemany("""
+                INSERT INTO repo_index (user_id, file_path, repo_name, function_name, blob_hash, start_offset, end_offset, last_modified)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            sync_repo_search(conn)
+        print(f"✅ Indexed {len(rows)} functions across repositories ({len(blobs)} files)")
+        try:
+            print(f"🧭 Embedded {self.vector_index.rebuild()} functions for semantic search")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Semantic index not rebuilt ({e}); keyword search still works")
+
+    @staticmethod
+    def _line_starts(content: str) -> List[int]:
+        """Offset of each line start, plus the end of the text, counting lines the way `ast` does."""
+        # Not splitlines(): it also breaks on \x0c, \x1c-\x1e, \x85, \u2028 and \u2029
+        starts = [0] + [m.end() for m in re.finditer(r'\r\n|\r|\n', content)]
+        if starts[-1] != len(content):
+            starts.append(len(content))
+        return starts
+
+    @staticmethod
+    def _block_end(content: str, start: int) -> int:
+        """End offset of the brace block opened after `start` (a prototype ends at its ';')."""
+        brace = content.find('{', start)
+        semicolon = content.find(';', start)
+        if brace < 0 or (0 <= semicolon < brace):
+            return semicolon + 1 if semicolon >= 0 else len(content)
+        depth = 0
+        for i in range(brace, len(content)):
+            if content[i] == '{':
+                depth += 1
+            elif content[i] == '}':
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+        return len(content)
 
     def retrieve_style_context(self, message: str) -> str:
         """Search repo_index for code snippets matching the request"""
@@ -502,54 +533,51 @@ class BuddAI(PDEIExecutive):
         if not keywords:
             return ""
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Build a search query for function names or repo names
-        search_terms = " OR ".join([f"function_name LIKE '%{k}%'" for k in keywords])
-        search_terms += " OR " + " OR ".join([f"repo_name LIKE '%{k}%'" for k in keywords])
-        
-        query = f"SELECT repo_name, function_name, content FROM repo_index WHERE ({search_terms}) AND user_id = ? LIMIT 2"
-        
-        cursor.execute(query, (self.user_id,))
-        results = cursor.fetchall()
-        conn.close()
+        # Two functions closest in meaning to the request; keyword match on names as the fallback
+        results = self.vector_index.search(message, k=2, min_score=0.1)
+        if not results:
+            results = self.memory.search_repo_index(keywords, limit=2, names_only=True, snippet_tokens=64)
         
         if not results:
             return ""
             
         prompt_template = self.get_personality_value("prompts.style_reference", "\n[REFERENCE STYLE FROM {user_name}'S PAST PROJECTS]\n")
         context_block = prompt_template.format(user_name=self.get_personality_value("identity.user_name", "the user"))
-        for repo, func, content in results:
-            # Just grab the first 500 chars of the file to save context window
-            snippet = content[:500] + "..."
-            context_block += f"Repo: {repo} | Function: {func}\nCode:\n{snippet}\n---\n"
+        for hit in results:
+            # The function itself (or a snippet of it) rather than the whole file, to save context window
+            snippet = hit.get('snippet') or (hit['content'] or '')[:800]
+            context_block += f"Repo: {hit['repo']} | Function: {hit['function']}\nCode:\n{snippet}...\n---\n"
         
         return context_block
 
     def scan_style_signature(self) -> None:
         """V3.0: Analyze repo_index AND recent chat logs to extract style preferences."""
         print("\n🕵️  Scanning repositories and chat logs for style signature...")
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Get a sample of code from Repos
-        # V4.1: Prioritize local "Digital Twin" folders (readme-hub) over generic repos
-        cursor.execute("""
-            SELECT content FROM repo_index 
-            WHERE user_id = ? 
-            ORDER BY CASE WHEN file_path LIKE '%readme-hub%' THEN 0 ELSE 1 END, RANDOM() 
-            LIMIT 3
-        """, (self.user_id,))
-        repo_rows = cursor.fetchall()
-        
-        # Get recent generated code from Chat
-        cursor.execute("SELECT content FROM messages WHERE role = 'assistant' AND content LIKE '%```%' ORDER BY id DESC LIMIT 3")
-        chat_rows = cursor.fetchall()
+        with self.memory.messages_connection() as conn:
+            # Get a sample of code from Repos
+            # V4.1: Prioritize local "Digital Twin" folders (readme-hub) over generic repos
+            repo_rows = conn.execute("""
+                SELECT content FROM repo_functions 
+                WHERE user_id = ? 
+                ORDER BY CASE WHEN file_path LIKE '%readme-hub%' THEN 0 ELSE 1 END, RANDOM() 
+                LIMIT 3
+            """, (self.user_id,)).fetchall()
+            
+            # Get recent generated code from Chat: newest first, stopping at the third reply with code.
+            # Plain-text rows are filtered in SQL; compressed ones are only unpacked until then.
+            chat_rows = []
+            for row in conn.execute("""
+                SELECT unpack(content) FROM messages
+                WHERE role = 'assistant' AND (typeof(content) = 'blob' OR content LIKE '%```%')
+                ORDER BY id DESC
+            """):
+                if '```' in row[0]:
+                    chat_rows.append(row)
+                    if len(chat_rows) == 3:
+                        break
         
         if not repo_rows and not chat_rows:
             print("❌ No code indexed or generated. Run /index first or generate some code.")
-            conn.close()
             return
             
         samples = []
@@ -577,69 +605,70 @@ class BuddAI(PDEIExecutive):
         # Store in DB
         timestamp = datetime.now().isoformat()
         
-        # Clear old preferences to avoid duplicates/pollution
-        cursor.execute("DELETE FROM style_preferences WHERE user_id = ?", (self.user_id,))
+        # Not held during the model call above: the connection is only taken to write the results
+        with self.memory.connection() as conn:
+            cursor = conn.cursor()
+            # Clear old preferences to avoid duplicates/pollution
+            cursor.execute("DELETE FROM style_preferences WHERE user_id = ?", (self.user_id,))
         
-        lines = summary.split('\n')
-        in_code_block = False
-        current_category = None
+            lines = summary.split('\n')
+            in_code_block = False
+            current_category = None
 
-        for line in lines:
-            if "```" in line:
-                in_code_block = not in_code_block
-                continue
-            if in_code_block:
-                continue
+            for line in lines:
+                if "```" in line:
+                    in_code_block = not in_code_block
+                    continue
+                if in_code_block:
+                    continue
                 
-            line = line.strip()
-            if not line: continue
+                line = line.strip()
+                if not line: continue
 
-            # 1. Handle "Category: Description" (Explicit)
-            if line.lower().startswith("category:"):
-                current_category = line.split(':', 1)[1].strip()
-                continue
-            if line.lower().startswith("description:") and current_category:
-                pref = line.split(':', 1)[1].strip()
-                self._save_preference(cursor, current_category, pref, timestamp)
-                current_category = None
-                continue
+                # 1. Handle "Category: Description" (Explicit)
+                if line.lower().startswith("category:"):
+                    current_category = line.split(':', 1)[1].strip()
+                    continue
+                if line.lower().startswith("description:") and current_category:
+                    pref = line.split(':', 1)[1].strip()
+                    self._save_preference(cursor, current_category, pref, timestamp)
+                    current_category = None
+                    continue
 
-            # 2. Handle Headers (e.g. "Naming:", "### Architecture")
-            clean_line = line.lstrip('#*- ')
-            is_header = False
-            # Check if line ends in colon or is a markdown header
-            if line.endswith(':') or line.startswith('#'):
-                header_candidate = line.strip('# :')
-                # Heuristic: Headers are usually short
-                if len(header_candidate.split()) < 4: 
-                    current_category = header_candidate
-                    is_header = True
+                # 2. Handle Headers (e.g. "Naming:", "### Architecture")
+                clean_line = line.lstrip('#*- ')
+                is_header = False
+                # Check if line ends in colon or is a markdown header
+                if line.endswith(':') or line.startswith('#'):
+                    header_candidate = line.strip('# :')
+                    # Heuristic: Headers are usually short
+                    if len(header_candidate.split()) < 4: 
+                        current_category = header_candidate
+                        is_header = True
             
-            if is_header:
-                continue
+                if is_header:
+                    continue
 
-            # 3. Handle Key: Value lines (e.g. "- Variables: Snake_case")
-            if ':' in clean_line:
-                parts = clean_line.split(':', 1)
-                key = parts[0].strip()
-                val = parts[1].strip()
+                # 3. Handle Key: Value lines (e.g. "- Variables: Snake_case")
+                if ':' in clean_line:
+                    parts = clean_line.split(':', 1)
+                    key = parts[0].strip()
+                    val = parts[1].strip()
                 
-                if current_category:
-                    # Combine context: Category="Naming", Line="Variables: Snake_case" -> Pref="Variables: Snake_case"
-                    self._save_preference(cursor, current_category, f"{key}: {val}", timestamp)
-                else:
-                    # Fallback: Use Key as Category
-                    self._save_preference(cursor, key, val, timestamp)
-                continue
+                    if current_category:
+                        # Combine context: Category="Naming", Line="Variables: Snake_case" -> Pref="Variables: Snake_case"
+                        self._save_preference(cursor, current_category, f"{key}: {val}", timestamp)
+                    else:
+                        # Fallback: Use Key as Category
+                        self._save_preference(cursor, key, val, timestamp)
+                    continue
+
+                # 4. Handle Bullet points under a header (e.g. "- Snake_case...")
+                if current_category and (line.startswith('-') or line.startswith('*')):
+                    val = line.lstrip('- *').strip()
+                    self._save_preference(cursor, current_category, val, timestamp)
+                    continue
 
-            # 4. Handle Bullet points under a header (e.g. "- Snake_case...")
-            if current_category and (line.startswith('-') or line.startswith('*')):
-                val = line.lstrip('- *').strip()
-                self._save_preference(cursor, current_category, val, timestamp)
-                continue
-        
-        conn.commit()
-        conn.close()
         
         # Sync to JSON Profile
         self._sync_profile_from_db()
@@ -663,11 +692,8 @@ class BuddAI(PDEIExecutive):
 
     def _sync_profile_from_db(self):
         """Update the loaded JSON profile with latest DB scan results"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT category, preference FROM style_preferences WHERE user_id = ?", (self.user_id,))
-        rows = cursor.fetchall()
-        conn.close()
+        with self.memory.connection() as conn:
+            rows = conn.execute("SELECT category, preference FROM style_preferences WHERE user_id = ?", (self.user_id,)).fetchall()
         
         if not rows: return
 
@@ -765,21 +791,15 @@ class BuddAI(PDEIExecutive):
     def get_applicable_rules(self, user_message: str) -> List[Dict]:
         """Get rules relevant to the user message"""
         # user_message is currently unused
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        # Fetch rules with reasonable confidence
-        cursor.execute("SELECT rule_text, confidence FROM code_rules WHERE confidence > 0.6 ORDER BY confidence DESC")
-        rows = cursor.fetchall()
-        conn.close()
+        with self.memory.connection() as conn:
+            # Fetch rules with reasonable confidence
+            rows = conn.execute("SELECT rule_text, confidence FROM code_rules WHERE confidence > 0.6 ORDER BY confidence DESC").fetchall()
         return [{"rule_text": r[0], "confidence": r[1]} for r in rows]
 
     def get_style_summary(self) -> str:
         """Get summary of learned style preferences"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT category, preference FROM style_preferences WHERE confidence > 0.6")
-        rows = cursor.fetchall()
-        conn.close()
+        with self.memory.connection() as conn:
+            rows = conn.execute("SELECT category, preference FROM style_preferences WHERE confidence > 0.6").fetchall()
         if not rows:
             return "Standard coding style."
         return ", ".join([f"{r[0]}: {r[1]}" for r in rows])
@@ -829,11 +849,8 @@ class BuddAI(PDEIExecutive):
 
     def get_all_rules(self) -> List[str]:
         """Get all learned rules as text"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT rule_text FROM code_rules ORDER BY confidence DESC LIMIT 50")
-        rows = cursor.fetchall()
-        conn.close()
+        with self.memory.connection() as conn:
+            rows = conn.execute("SELECT rule_text FROM code_rules ORDER BY confidence DESC LIMIT 50").fetchall()
         return [r[0] for r in rows]
 
     def filter_rules_by_hardware(self, all_rules, hardware):
@@ -1076,34 +1093,29 @@ INTERNAL CHECK (Do not output confirmation):
 
     def log_compilation_result(self, code: str, success: bool, errors: str = ""):
         """Track what compiles vs what fails"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS compilation_log (
-                id INTEGER PRIMARY KEY,
-                timestamp TEXT,
-                code TEXT,
-                success BOOLEAN,
-                errors TEXT,
-                hardware TEXT
-            )
-        """)
-        
-        cursor.execute("""
-            INSERT INTO compilation_log 
-            (timestamp, code, success, errors, hardware)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            datetime.now().isoformat(),
-            code,
-            success,
-            errors,
-            "ESP32-C3"  # Your target hardware
-        ))
-        
-        conn.commit()
-        conn.close()
+        with self.memory.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS compilation_log (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT,
+                    code TEXT,
+                    success BOOLEAN,
+                    errors TEXT,
+                    hardware TEXT
+                )
+            """)
+            
+            conn.execute("""
+                INSERT INTO compilation_log 
+                (timestamp, code, success, errors, hardware)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                datetime.now().isoformat(),
+                self.memory.pack(code),
+                success,
+                errors,
+                "ESP32-C3"  # Your target hardware
+            ))
 
     def is_simple_question(self, message: str) -> bool:
         """Check if this is a simple question that should use FAST model"""
@@ -1157,11 +1169,8 @@ INTERNAL CHECK (Do not output confirmation):
         # Repo History Detection (Context Awareness)
         # If user mentions a repo name, treat it as a module
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT repo_name FROM repo_index WHERE user_id = ?", (self.user_id,))
-            repos = [r[0] for r in cursor.fetchall()]
-            conn.close()
+            with self.memory.connection() as conn:
+                repos = [r[0] for r in conn.execute("SELECT DISTINCT repo_name FROM repo_index WHERE user_id = ?", (self.user_id,))]
             
             for repo in repos:
                 if repo and repo.lower() in message_lower:
@@ -1400,13 +1409,15 @@ INTERNAL CHECK (Do not output confirmation):
         if not has_content and not fully_consumed:
             yield "\n[Error: Empty response from Ollama. Check if model is loaded.]"
                 
-    def execute_modular_build(self, _: str, modules: List[str], plan: List[Dict[str, str]], forge_mode: str = "2") -> str:
-        """Execute build plan step by step"""
+    def execute_modular_build(self, _: str, modules: List[str], plan: List[Dict[str, str]], forge_mode: str = "2",
+                              tuning: Optional[Dict[str, Any]] = None) -> str:
+        """Execute build plan step by step. `tuning` (constraints for `optimize_tuning`) selects an optimized k."""
         print(f"\n🔨 MODULAR BUILD MODE")
         print(f"Detected {len(modules)} modules: {', '.join(modules)}")
         print(f"Breaking into {len(plan)} steps...\n")
         
         all_code = {}
+        lut_header = ""
         
         for i, step in enumerate(plan, 1):
             print(f"📦 Step {i}/{len(plan)}: {step['task']}")
@@ -1421,15 +1432,27 @@ INTERNAL CHECK (Do not output confirmation):
                 print("1. Aggressive (k=0.3) - High snap, combat ready")
                 print("2. Balanced (k=0.1) - Standard movement")
                 print("3. Graceful (k=0.03) - Roasting / Smooth curves")
+                print("4. Optimized - Simulated for your response time / overshoot")
                 
-                if self.server_mode:
-                    choice = forge_mode
+                if self.server_mode or tuning is not None:
+                    choice = "4" if tuning is not None else forge_mode
                 else:
-                    choice = input("Select Tuning Constant [1-3, default 2]: ")
+                    choice = input("Select Tuning Constant [1-4, default 2]: ")
+                    if choice == "4":
+                        tuning = {
+                            "response_time_s": input("Response time in seconds [0.5]: ").strip() or None,
+                            "max_overshoot": input("Max overshoot fraction [0]: ").strip() or None,
+                        }
                 
                 k_val = "0.1"
-                if choice == "1": k_val = "0.3"
-                elif choice == "3": k_val = "0.03"
+                preset = "balanced"
+                tau = None
+                if choice == "1": k_val, preset = "0.3", "aggressive"
+                elif choice == "3": k_val, preset = "0.03", "graceful"
+                elif choice in ("4", "optimize"):
+                    optimized = self._optimize_forge_tuning(tuning or {})
+                    if optimized:
+                        k_val, tau = f"{optimized['k']:.4g}", optimized['tau']
 
                 prompt_template = self.get_personality_value("prompts.integration_task", "INTEGRATION TASK: Combine modules into a cohesive system.")
                 prompt = prompt_template.format(
@@ -1437,12 +1460,18 @@ INTERNAL CHECK (Do not output confirmation):
                     modules_summary=modules_summary,
                     k_val=k_val
                 )
+                lut_header = self._forge_lut_header(preset, tau)
+                if lut_header:
+                    prompt += ("\n\nPrecomputed Forge Theory lookup tables are provided (FORGE_DECAY_LUT, FORGE_GROWTH_LUT, "
+                               "FORGE_STEP_RESPONSE_LUT). Use forge_lut_lookup(table, table_LEN, elapsed_us) instead of calling exp().")
             else:
                 # Individual module
                 prompt = f"Generate ESP32-C3 code for: {step['task']}. Keep it modular with clear comments."
             
             # Call balanced model for each module
             response = self.call_model("balanced", prompt)
+            if step['module'] == 'integration' and lut_header:
+                response += f"\n\n```cpp\n{lut_header}```\n"
             all_code[step['module']] = response
             
             print(f"✅ {step['module'].upper()} module complete\n")
@@ -1478,12 +1507,14 @@ Context:
         
         for module, code in all_code.items():
             # Extract code blocks if response contains markdown
-            code_blocks = self.extract_code(code)
-            if not code_blocks:
-                code_blocks = [code] # Assume raw code if no blocks
+            block_spans = self.extract_code_blocks(code)
+            if not block_spans:
+                block_spans = [(0, len(code), None)] # Assume raw code if no blocks
                 
-            for block in code_blocks:
-                valid, issues = self.validator.validate(block, context=module)
+            block_edits = []
+            for start, end, language in block_spans:
+                block = code[start:end]
+                valid, issues = self.validator.validate(block, context=module, language=language)
                 if not valid:
                     validation_report += f"### {module.upper()} Issues:\n"
                     for issue in issues:
@@ -1493,10 +1524,11 @@ Context:
                     # Attempt Auto-Fix
                     fixed = self.validator.auto_fix(block, issues)
                     if fixed != block:
-                        all_code[module] = all_code[module].replace(block, fixed)
+                        block_edits.append((start, end, fixed))
                         validation_report += f"  ✨ Auto-fixed critical issues in {module}.\n"
                 else:
                     validation_report += f"- ✅ {module.upper()} Passed\n"
+            all_code[module] = apply_edits(code, block_edits)
 
         # Compile final response
         final = "# COMPLETE SYSTEM CONTROLLER - MODULAR BUILD\n\n"
@@ -1508,6 +1540,27 @@ Context:
             
         return final
         
+    def _forge_lut_header(self, preset: str, tau: Optional[float] = None) -> str:
+        """Fixed-point Forge Theory tables for the chosen tuning, or "" if they cannot be generated."""
+        try:
+            return lut_header_for_tau(tau) if tau is not None else lut_header_for_tuning(preset)
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Forge Theory LUT generation failed: {e}")
+            return ""
+
+    def _optimize_forge_tuning(self, constraints: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Tau sweep for the integration step; None (balanced preset) if the constraints are invalid."""
+        try:
+            result = optimize_tuning(TuningConstraints.from_dict(constraints))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid tuning constraints ({e}), using Balanced")
+            return None
+        settle = f"{result['settling_time_s']:.3f}s" if result['settling_time_s'] is not None else "never"
+        status = "" if result['feasible'] else " (constraints not met, closest candidate)"
+        print(f"🎯 Optimized k={result['k']:.4g} (tau={result['tau']:.4g}s): settles in {settle}, "
+              f"overshoot {result['overshoot']:.1%} from {result['candidates']} candidates{status}")
+        return result
+
     def apply_style_signature(self, generated_code: str) -> str:
         """Refine generated code to match user's specific naming and safety patterns"""
         # Hardware profile rules are now handled by the Validator/Domain Config
@@ -1515,17 +1568,53 @@ Context:
 
         # Apply learned replacements (High Confidence Only)
         rules = self.get_learned_rules()
+        replacements = []
         for r in rules:
             if r['confidence'] >= 0.95 and r['find'] and r['replace']:
                 # Simple safety check: don't replace if replacement contains spaces (likely a description)
                 if ' ' not in r['replace']:
-                    try:
-                        generated_code = re.sub(r['find'], r['replace'], generated_code)
-                    except re.error:
-                        pass
+                    if not is_safe_pattern(r['find']):
+                        self.memory.quarantine_rule(r['find'], "Failed static complexity check")
+                        continue
+                    replacements.append((r['find'], r['replace']))
+
+        if replacements:
+            # Learned patterns come from the model: run them in the guarded worker
+            generated_code, exceeded = get_guard().sub(replacements, generated_code)
+            for pattern in exceeded:
+                self.memory.quarantine_rule(pattern, "Exceeded regex time budget")
         
         return generated_code
 
+    def format_quarantine_report(self) -> str:
+        """Summarize learned rules taken out of service by the regex guard."""
+        quarantined = self.memory.get_quarantined_rules()
+        if not quarantined:
+            return ""
+        report = "🚫 Quarantined Rules (unsafe regex, not applied):\n"
+        for q in quarantined:
+            rule_name = q['rule'] if q['rule'] else q['find']
+            report += f"  - {rule_name} `{q['find']}`: {q['reason']} ({q['timestamp'][:19]})\n"
+        return report
+
+    def profile_rules_command(self, arg: str = "") -> str:
+        """/profile-rules [on|off|reset]: toggle the validator's rule profiler or show its report."""
+        profiler = self.validator.profiler
+        if arg == "on":
+            profiler.enabled = True
+            # Cached results would bypass the rules being profiled
+            self.validator.result_cache.clear()
+            return "⏱️ Rule profiling enabled. Run /profile-rules to see the report."
+        if arg == "off":
+            profiler.enabled = False
+            return "⏱️ Rule profiling disabled (counters kept)."
+        if arg == "reset":
+            profiler.reset()
+            return "⏱️ Rule profiler counters reset."
+        if arg:
+            return "Usage: /profile-rules [on|off|reset]"
+        return format_profile(self.validator.profile_report())
+
     def record_feedback(self, message_id: int, feedback: bool, comment: str = "") -> Optional[str]:
         """Learn from user feedback."""
         # This logic should ideally move to Memory, but for now we keep it here
@@ -1642,7 +1731,7 @@ Context:
                     message = data.get('message', '')
                     forge_mode = data.get('forge_mode', '2')
                     if message:
-                        response = executive.chat(message, forge_mode=forge_mode)
+                        response = executive.chat(message, forge_mode=forge_mode, tuning=data.get('tuning'))
                         self._send_json({
                             "response": response, 
                             "message_id": executive.last_generated_id
@@ -1691,23 +1780,17 @@ Context:
 
     def regenerate_response(self, message_id: int, comment: str = "") -> str:
         """Regenerate a response, optionally considering feedback comment"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT session_id, id FROM messages WHERE id = ?", (message_id,))
-        row = cursor.fetchone()
-        if not row:
-            conn.close()
-            return "Error: Message not found."
+        with self.memory.messages_connection() as conn:
+            row = conn.execute("SELECT session_id, id FROM messages WHERE id = ?", (message_id,)).fetchone()
+            if not row:
+                return "Error: Message not found."
+                
+            session_id, current_id = row
             
-        session_id, current_id = row
-        
-        cursor.execute(
-            "SELECT content FROM messages WHERE session_id = ? AND id < ? AND role = 'user' ORDER BY id DESC LIMIT 1",
-            (session_id, current_id)
-        )
-        user_row = cursor.fetchone()
-        conn.close()
+            user_row = conn.execute(
+                "SELECT unpack(content) FROM messages WHERE session_id = ? AND id < ? AND role = 'user' ORDER BY id DESC LIMIT 1",
+                (session_id, current_id)
+            ).fetchone()
         
         if user_row:
             prompt = user_row[0]
@@ -1720,11 +1803,8 @@ Context:
 
     def analyze_failure(self, message_id: int) -> None:
         """Analyze why a message received negative feedback"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT content FROM messages WHERE id = ?", (message_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with self.memory.messages_connection() as conn:
+            row = conn.execute("SELECT unpack(content) FROM messages WHERE id = ?", (message_id,)).fetchone()
         
         if row:
             print(f"\n⚠️  Negative Feedback on Message #{message_id}")
@@ -1736,7 +1816,8 @@ Context:
         # Placeholder for V4.0 learning loop
         pass
 
-    def _route_request(self, user_message: str, force_model: Optional[str], forge_mode: str) -> str:
+    def _route_request(self, user_message: str, force_model: Optional[str], forge_mode: str,
+                       tuning: Optional[Dict[str, Any]] = None) -> str:
         """Route the request to the appropriate model or handler."""
         # Determine model based on complexity
         if force_model:
@@ -1751,7 +1832,7 @@ Context:
             print(f"Modules needed: {', '.join(modules)}")
             print(f"Breaking into {len(plan)} manageable steps")
             print("=" * 50)
-            return self.execute_modular_build(user_message, modules, plan, forge_mode)
+            return self.execute_modular_build(user_message, modules, plan, forge_mode, tuning)
         elif self.is_search_query(user_message):
             # This is a search query - query the database
             return self.search_repositories(user_message)
@@ -1778,7 +1859,8 @@ Context:
             print("\n⚖️  Using BALANCED model...")
             return self.call_model("balanced", user_message)
 
-    def chat_stream(self, user_message: str, force_model: Optional[str] = None, forge_mode: str = "2") -> Generator[str, None, None]:
+    def chat_stream(self, user_message: str, force_model: Optional[str] = None, forge_mode: str = "2",
+                    tuning: Optional[Dict[str, Any]] = None) -> Generator[str, None, None]:
         """Streaming version of chat"""
         
         
@@ -1809,7 +1891,7 @@ Context:
             # We yield the final result as one chunk
             modules = self.extract_modules(user_message)
             plan = self.build_modular_plan(modules)
-            result = self.execute_modular_build(user_message, modules, plan, forge_mode)
+            result = self.execute_modular_build(user_message, modules, plan, forge_mode, tuning)
             iterator = [result]
         elif self.is_search_query(user_message):
             result = self.search_repositories(user_message)
@@ -1851,7 +1933,15 @@ Context:
 
     def extract_code(self, text: str) -> List[str]:
         """Extract code blocks from markdown"""
-        return re.findall(r'```(?:\w+)?\n(.*?)```', text, re.DOTALL)
+        return [text[start:end] for start, end in self.extract_code_spans(text)]
+
+    def extract_code_spans(self, text: str) -> List[Tuple[int, int]]:
+        """Offsets of each markdown code block's content, so fixes can be spliced back in place"""
+        return [(start, end) for start, end, _ in self.extract_code_blocks(text)]
+
+    def extract_code_blocks(self, text: str) -> List[Tuple[int, int, Optional[str]]]:
+        """Offsets of each markdown code block's content, with its fence language tag (None if untagged)"""
+        return [(m.start(2), m.end(2), m.group(1)) for m in re.finditer(r'```(\w+)?\n(.*?)```', text, re.DOTALL)]
 
     def handle_slash_command(self, command: str) -> str:
         """Handle slash commands when received via chat interface"""
@@ -1882,11 +1972,8 @@ Context:
             return "❌ No recent message to correct."
 
         if cmd == '/rules':
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("SELECT rule_text, confidence FROM code_rules ORDER BY confidence DESC")
-            rows = cursor.fetchall()
-            conn.close()
+            with self.memory.connection() as conn:
+                rows = conn.execute("SELECT rule_text, confidence FROM code_rules ORDER BY confidence DESC").fetchall()
             if not rows: return "🤷 No rules learned yet."
             return "🧠 Learned Rules:\n" + "\n".join([f"- {r[0]}" for r in rows])
 
@@ -1901,20 +1988,21 @@ Context:
             return "📊 Metrics module pending migration to P.DE.I Core."
 
         if cmd == '/audit':
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("SELECT learned_from, COUNT(*) as count, AVG(confidence) as avg_conf FROM code_rules GROUP BY learned_from ORDER BY count DESC")
-            rows = cursor.fetchall()
-            conn.close()
+            with self.memory.connection() as conn:
+                rows = conn.execute("SELECT learned_from, COUNT(*) as count, AVG(confidence) as avg_conf FROM code_rules GROUP BY learned_from ORDER BY count DESC").fetchall()
+            quarantine_report = self.format_quarantine_report()
             
-            if not rows:
+            if not rows and not quarantine_report:
                 return "🤷 No rules learned yet."
             
             report = "📊 Source Audit (Where am I learning from?):\n"
             for source, count, avg_conf in rows:
                 source_name = source if source else "Unknown"
                 report += f"  - {source_name}: {count} rules (Avg Conf: {avg_conf:.2f})\n"
-            return report
+            return report + quarantine_report
+
+        if cmd.startswith('/profile-rules'):
+            return self.profile_rules_command(cmd[len('/profile-rules'):].strip())
 
         if cmd == '/debug':
             if self.last_prompt_debug:
@@ -1936,14 +2024,14 @@ Context:
             if not last_response:
                 return "❌ No recent code to validate."
 
-            code_blocks = self.extract_code(last_response)
+            code_blocks = self.extract_code_blocks(last_response)
             if not code_blocks:
                 return "❌ No code blocks found in last response."
 
             report = ["🔍 Validating last response..."]
             all_valid = True
-            for i, code in enumerate(code_blocks, 1):
-                valid, issues = self.validator.validate(code, user_context)
+            for i, (start, end, language) in enumerate(code_blocks, 1):
+                valid, issues = self.validator.validate(last_response[start:end], user_context, language)
                 if not valid:
                     all_valid = False
                     report.append(f"\nBlock {i} Issues:")
@@ -1990,7 +2078,8 @@ Context:
 
 
     # --- Main Chat Method ---
-    def chat(self, user_message: str, force_model: Optional[str] = None, forge_mode: str = "2") -> str:
+    def chat(self, user_message: str, force_model: Optional[str] = None, forge_mode: str = "2",
+             tuning: Optional[Dict[str, Any]] = None) -> str:
         """Main chat with smart routing and shadow suggestions"""
         
         # Intercept commands
@@ -2021,35 +2110,40 @@ Context:
             self.context_messages.append({"id": msg_id, "role": "assistant", "content": response, "timestamp": datetime.now().isoformat()})
             return response
 
-        response = self._route_request(user_message, force_model, forge_mode)
+        response = self._route_request(user_message, force_model, forge_mode, tuning)
 
         # Apply Style Guard
         response = self.apply_style_signature(response)
         
         # Extract code blocks
-        code_blocks = self.extract_code(response)
-        
-        # Validate each code block
-        for code in code_blocks:
-            valid, issues = self.validator.validate(code, user_message)
+        block_spans = self.extract_code_blocks(response)
+        
+        # Validate each code block (lexed as its fence tag says); fixes are spliced into the response in a single pass
+        block_edits = []
+        invalid_blocks = []
+        for start, end, language in block_spans:
+            code = response[start:end]
+            valid, issues = self.validator.validate(code, user_message, language)
             
             if not valid:
                 # Auto-fix critical issues
                 fixed_code = self.validator.auto_fix(code, issues)
                 if fixed_code != code:
-                    response = response.replace(code, fixed_code)
-                    code = fixed_code
-                
-                # Sanitize explanation text based on fixes
-                for issue in issues:
-                    if "Debouncing detected" in issue['message']:
-                        response = re.sub(r'(?i)(\*\*?Debouncing\*\*?:?|Debouncing)', r'~~\1~~ (Removed)', response)
-                
-                # Append explanation
-                response += "\n\n⚠️  **Auto-corrected:**\n"
-                for issue in issues:
-                    if issue['severity'] == 'error':
-                        response += f"- {issue['message']}\n"
+                    block_edits.append((start, end, fixed_code))
+                invalid_blocks.append(issues)
+        
+        response = apply_edits(response, block_edits)
+        for issues in invalid_blocks:
+            # Sanitize explanation text based on fixes
+            for issue in issues:
+                if "Debouncing detected" in issue['message']:
+                    response = re.sub(r'(?i)(\*\*?Debouncing\*\*?:?|Debouncing)', r'~~\1~~ (Removed)', response)
+            
+            # Append explanation
+            response += "\n\n⚠️  **Auto-corrected:**\n"
+            for issue in issues:
+                if issue['severity'] == 'error':
+                    response += f"- {issue['message']}\n"
         
         # Generate Suggestion Bar
         suggestions = self.shadow_engine.get_all_suggestions(user_message, response)
@@ -2065,53 +2159,35 @@ Context:
         
     def get_sessions(self, limit: int = 20) -> List[Dict[str, str]]:
         """Retrieve recent sessions from DB"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT session_id, started_at, title FROM sessions WHERE user_id = ? ORDER BY started_at DESC LIMIT ?", (self.user_id, limit))
-        rows = cursor.fetchall()
-        conn.close()
+        with self.memory.messages_connection() as conn:
+            rows = conn.execute("SELECT session_id, started_at, title FROM sessions WHERE user_id = ? ORDER BY started_at DESC LIMIT ?", (self.user_id, limit)).fetchall()
         return [{"id": r[0], "date": r[1], "title": r[2] if len(r) > 2 else None} for r in rows]
 
     def rename_session(self, session_id: str, new_title: str) -> None:
         """Rename a session"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE sessions SET title = ? WHERE session_id = ? AND user_id = ?", (new_title, session_id, self.user_id))
-        conn.commit()
-        conn.close()
+        with self.memory.connection() as conn:
+            conn.execute("UPDATE sessions SET title = ? WHERE session_id = ? AND user_id = ?", (new_title, session_id, self.user_id))
 
     def delete_session(self, session_id: str) -> None:
         """Delete a session and its messages"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM sessions WHERE session_id = ? AND user_id = ?", (session_id, self.user_id))
-        if cursor.rowcount > 0:
-            cursor.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
-        conn.commit()
-        conn.close()
+        with self.memory.messages_connection() as conn:
+            cursor = conn.execute("DELETE FROM sessions WHERE session_id = ? AND user_id = ?", (session_id, self.user_id))
+            if cursor.rowcount > 0:
+                conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
 
     def clear_current_session(self) -> None:
         """Clear all messages from the current session"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM messages WHERE session_id = ?", (self.session_id,))
-        conn.commit()
-        conn.close()
+        with self.memory.messages_connection() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (self.session_id,))
         self.context_messages = []
 
     def load_session(self, session_id: str) -> List[Dict[str, str]]:
         """Load a specific session context"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT 1 FROM sessions WHERE session_id = ? AND user_id = ?", (session_id, self.user_id))
-        if not cursor.fetchone():
-            conn.close()
-            return []
-            
-        cursor.execute("SELECT id, role, content, timestamp FROM messages WHERE session_id = ? ORDER BY id ASC", (session_id,))
-        rows = cursor.fetchall()
-        conn.close()
+        with self.memory.messages_connection() as conn:
+            if not conn.execute("SELECT 1 FROM sessions WHERE session_id = ? AND user_id = ?", (session_id, self.user_id)).fetchone():
+                return []
+                
+            rows = conn.execute("SELECT id, role, unpack(content), timestamp FROM messages WHERE session_id = ? ORDER BY id ASC", (session_id,)).fetchall()
         
         self.session_id = session_id
         self.context_messages = []
@@ -2147,11 +2223,8 @@ Context:
         """Export session history to a Markdown file"""
         sid = session_id or self.session_id
         
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT role, content, timestamp FROM messages WHERE session_id = ? ORDER BY id ASC", (sid,))
-        rows = cursor.fetchall()
-        conn.close()
+        with self.memory.messages_connection() as conn:
+            rows = conn.execute("SELECT role, unpack(content), timestamp FROM messages WHERE session_id = ? ORDER BY id ASC", (sid,)).fetchall()
         
         if not rows:
             return "No history found."
@@ -2169,11 +2242,8 @@ Context:
     def get_session_export_data(self, session_id: str = None) -> Dict:
         """Get session data as a dictionary for export"""
         sid = session_id or self.session_id
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT role, content, timestamp FROM messages WHERE session_id = ? ORDER BY id ASC", (sid,))
-        rows = cursor.fetchall()
-        conn.close()
+        with self.memory.messages_connection() as conn:
+            rows = conn.execute("SELECT role, unpack(content), timestamp FROM messages WHERE session_id = ? ORDER BY id ASC", (sid,)).fetchall()
         
         return {
             "session_id": sid,
@@ -2203,35 +2273,32 @@ Context:
         if not session_id or not messages:
             raise ValueError("Invalid session JSON format")
             
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Check if session exists to avoid collision
-        cursor.execute("SELECT 1 FROM sessions WHERE session_id = ? AND user_id = ?", (session_id, self.user_id))
-        if cursor.fetchone():
-            # Generate new ID
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            session_id = f"{session_id}_imp_{timestamp}"
-        
-        # Determine start time
-        started_at = datetime.now().isoformat()
-        if messages and "timestamp" in messages[0]:
-            started_at = messages[0]["timestamp"]
+        with self.memory.messages_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Check if session exists to avoid collision
+            cursor.execute("SELECT 1 FROM sessions WHERE session_id = ? AND user_id = ?", (session_id, self.user_id))
+            if cursor.fetchone():
+                # Generate new ID
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                session_id = f"{session_id}_imp_{timestamp}"
+        
+            # Determine start time
+            started_at = datetime.now().isoformat()
+            if messages and "timestamp" in messages[0]:
+                started_at = messages[0]["timestamp"]
             
-        cursor.execute(
-            "INSERT INTO sessions (session_id, user_id, started_at, title) VALUES (?, ?, ?, ?)",
-            (session_id, self.user_id, started_at, f"Imported: {data.get('session_id')}")
-        )
-        
-        # Insert messages
-        for msg in messages:
             cursor.execute(
-                "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
-                (session_id, msg.get("role"), msg.get("content"), msg.get("timestamp", datetime.now().isoformat()))
+                "INSERT INTO sessions (session_id, user_id, started_at, title) VALUES (?, ?, ?, ?)",
+                (session_id, self.user_id, started_at, f"Imported: {data.get('session_id')}")
             )
-            
-        conn.commit()
-        conn.close()
+        
+            # Insert messages
+            for msg in messages:
+                cursor.execute(
+                    "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                    (session_id, msg.get("role"), self.memory.pack(msg.get("content")), msg.get("timestamp", datetime.now().isoformat()))
+                )
         
         return session_id
 
@@ -2247,12 +2314,10 @@ Context:
         
         try:
             # Use SQLite backup API for consistency
-            src = sqlite3.connect(DB_PATH)
             dst = sqlite3.connect(backup_path)
-            with dst:
+            with self.memory.messages_connection() as src, dst:
                 src.backup(dst)
             dst.close()
-            src.close()
             return True, str(backup_path)
         except Exception as e:
             return False, str(e)
@@ -2298,7 +2363,8 @@ Context:
                         print("/validate - Re-validate last response")
                         print("/rules - Show learned rules")
                         print("/metrics - Show improvement stats")
-                        print("/audit - Show rule sources")
+                        print("/audit - Show rule sources and quarantined rules")
+                        print("/profile-rules [on|off|reset] - Per-rule timing and hit counts")
                         print("/train - Export corrections for fine-tuning")
                         print("/build - Generate Ollama Modelfile from rules")
                         print("/save - Export chat to Markdown")
@@ -2327,11 +2393,8 @@ Context:
                             print("No new patterns found.")
                             # Fallback: Check for recent explicit corrections that look like rules
                             try:
-                                conn = sqlite3.connect(DB_PATH)
-                                cursor = conn.cursor()
-                                cursor.execute("SELECT reason FROM corrections ORDER BY id DESC LIMIT 1")
-                                row = cursor.fetchone()
-                                conn.close()
+                                with self.memory.connection() as conn:
+                                    row = conn.execute("SELECT reason FROM corrections ORDER BY id DESC LIMIT 1").fetchone()
                                 
                                 if row and row[0]:
                                     reason = row[0]
@@ -2394,15 +2457,15 @@ Context:
                             print("❌ No recent code to validate.")
                             continue
 
-                        code_blocks = self.extract_code(last_response)
+                        code_blocks = self.extract_code_blocks(last_response)
                         if not code_blocks:
                             print("❌ No code blocks found in last response.")
                             continue
 
                         print("\n🔍 Validating last response...")
                         all_valid = True
-                        for i, code in enumerate(code_blocks, 1):
-                            valid, issues = self.validator.validate(code, user_context)
+                        for i, (start, end, language) in enumerate(code_blocks, 1):
+                            valid, issues = self.validator.validate(last_response[start:end], user_context, language)
                             if not valid:
                                 all_valid = False
                                 print(f"\nBlock {i} Issues:")
@@ -2416,11 +2479,8 @@ Context:
                             print("\n✨ All code blocks look good!")
                         continue
                     elif cmd == '/rules':
-                        conn = sqlite3.connect(DB_PATH)
-                        cursor = conn.cursor()
-                        cursor.execute("SELECT rule_text, confidence, learned_from FROM code_rules ORDER BY confidence DESC")
-                        rows = cursor.fetchall()
-                        conn.close()
+                        with self.memory.connection() as conn:
+                            rows = conn.execute("SELECT rule_text, confidence, learned_from FROM code_rules ORDER BY confidence DESC").fetchall()
                         
                         if not rows:
                             print("🤷 No rules learned yet.")
@@ -2450,19 +2510,22 @@ Context:
                         print("📊 Metrics module pending migration to P.DE.I Core.")
                         continue 
                     elif cmd == '/audit':
-                        conn = sqlite3.connect(DB_PATH)
-                        cursor = conn.cursor()
-                        cursor.execute("SELECT learned_from, COUNT(*) as count, AVG(confidence) as avg_conf FROM code_rules GROUP BY learned_from ORDER BY count DESC")
-                        rows = cursor.fetchall()
-                        conn.close()
+                        with self.memory.connection() as conn:
+                            rows = conn.execute("SELECT learned_from, COUNT(*) as count, AVG(confidence) as avg_conf FROM code_rules GROUP BY learned_from ORDER BY count DESC").fetchall()
+                        quarantine_report = self.format_quarantine_report()
                         
-                        if not rows:
+                        if not rows and not quarantine_report:
                             print("🤷 No rules learned yet.")
                         else:
                             print("📊 Source Audit (Where am I learning from?):")
                             for source, count, avg_conf in rows:
                                 source_name = source if source else "Unknown"
                                 print(f"  - {source_name}: {count} rules (Avg Conf: {avg_conf:.2f})")
+                            if quarantine_report:
+                                print(quarantine_report.rstrip())
+                        continue
+                    elif cmd.startswith('/profile-rules'):
+                        print(self.profile_rules_command(cmd[len('/profile-rules'):].strip()))
                         continue
                     elif cmd == '/debug':
                         if self.last_prompt_debug:
@@ -2509,16 +2572,14 @@ class ModelFineTuner:
     
     def prepare_training_data(self):
         """Convert corrections to training format"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT original_code, corrected_code, reason 
-            FROM corrections
-        """)
+        with get_pool(DB_PATH).connection() as conn:
+            rows = conn.execute("""
+                SELECT unpack(original_code), unpack(corrected_code), reason 
+                FROM corrections
+            """).fetchall()
         
         training_data = []
-        for original, corrected, reason in cursor.fetchall():
+        for original, corrected, reason in rows:
             training_data.append({
                 "messages": [
                     {"role": "user", "content": f"Generate code for: {reason}"},
@@ -2526,8 +2587,6 @@ class ModelFineTuner:
                 ]
             })
         
-        conn.close()
-        
         # Save as JSONL for fine-tuning
         output_path = DATA_DIR / 'training_data.jsonl'
         with open(output_path, 'w', encoding='utf-8') as f:
@@ -2537,13 +2596,9 @@ class ModelFineTuner:
     
     def fine_tune_model(self):
         """Generate an Ollama Modelfile based on learned rules"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
         # Get high confidence rules
-        cursor.execute("SELECT rule_text FROM code_rules WHERE confidence >= 0.8")
-        rules = [r[0] for r in cursor.fetchall()]
-        conn.close()
+        with get_pool(DB_PATH).connection() as conn:
+            rules = [r[0] for r in conn.execute("SELECT rule_text FROM code_rules WHERE confidence >= 0.8")]
         
         if not rules:
             return "⚠️ No high-confidence rules found. Teach me some rules first!"
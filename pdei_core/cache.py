@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\cache.py
+P.DE.I Framework - Validation Result Cache
+==========================================
+
+Chat, `/validate`, modular builds and regenerations keep validating the same code blocks against
+the same context and rules (temperature-0 generation makes exact repeats common). This module
+memoizes those results.
+
+Key Components:
+1. ValidationCache: Thread-safe LRU of `(is_valid, issues)` keyed by a content hash, bounded by
+   an approximate memory budget, with hit/miss counters.
+
+Where it fits:
+    Owned by `PDEIValidator` (`logic.py`). The validator supplies the ruleset version, so results
+    computed under an older rule set are never served.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+ValidationResult = Tuple[bool, List[Dict[str, Any]]]
+
+# Default memory budget for cached results (bytes)
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+
+def copy_issues(issues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy issue dicts (and their span lists) so callers cannot mutate cached results."""
+    return [{k: ([list(x) if isinstance(x, list) else x for x in v] if isinstance(v, list) else v)
+             for k, v in issue.items()} for issue in issues]
+
+
+class ValidationCache:
+    """
+    LRU cache of validation results.
+
+    Keys are `sha256(ruleset version, normalized context, language, code)`, so the code itself is never
+    stored. Entry sizes are estimated from the issue payload; least recently used entries are
+    evicted once the total exceeds `max_bytes`.
+    """
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[ValidationResult, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(code: str, context: str, version: Any, language: Optional[str] = None) -> str:
+        h = hashlib.sha256()
+        # Context only ever feeds case-insensitive checks
+        for part in (repr(version), context.lower(), language or "", code):
+            data = part.encode('utf-8', 'surrogatepass')
+            h.update(len(data).to_bytes(8, 'little'))
+            h.update(data)
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[ValidationResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        (is_valid, issues), _ = entry
+        return is_valid, copy_issues(issues)
+
+    def put(self, key: str, result: ValidationResult):
+        is_valid, issues = result
+        stored = (is_valid, copy_issues(issues))
+        size = 200 + len(repr(issues))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (stored, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\composite.py
+P.DE.I Framework - Composite (Multi-Domain) Validator
+=====================================================
+
+Firmware repos mix concerns (embedded, web_dev, cybersecurity...), but a `PDEIValidator` applies
+one domain config. Running one validator per domain rescans the code once per domain; this
+module merges the domains into a single config instead, so their rules compile into one rule
+set and one validation pass checks them all.
+
+    embedded.safety_timeout, web_dev.no_var, cybersecurity.hardcoded_secrets, ...
+
+Key Components:
+1. merge_domain_configs: Namespaces every rule ID as `<domain>.<id>` (the original ID is kept as
+   `base_id`), tags each rule with its domain and applies suppressions.
+2. CompositeValidator: A `PDEIValidator` over the merged config. Issues carry a `domain` key;
+   edits to any of the member config files are hot-reloaded.
+
+Suppression entries (`suppressed_rules`) may be namespaced (`web_dev.no_var`,
+`forge_theory.decay_negative_exponent`) or bare IDs, which suppress the rule in every domain.
+The members' own `suppressed_rules` still apply to Forge Theory rules. Settings other than rules
+(hardware profiles, prompts) are taken from the first domain.
+
+Where it fits:
+    `BuddAI` builds one when its `domain` setting lists several config files (a JSON list in
+    `buddai_config.json`, or comma-separated with `--domain`); `python -m pdei_core.lint
+    --domain embedded,web_dev` does the same.
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pdei_core.logic import PDEIValidator
+
+# Namespace of the core rules merged in by the validator (not a member domain)
+FORGE_NAMESPACE = "forge_theory"
+
+
+def merge_domain_configs(domains: Dict[str, Dict[str, Any]], suppressed_rules: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    One domain config holding the rules of every `domains` entry (name -> config), in order.
+
+    Rules are copied, never mutated. Rules without an ID are tagged but not namespaced.
+    """
+    if not domains:
+        raise ValueError("A composite validator needs at least one domain")
+    suppressed = set(suppressed_rules)
+    names = list(domains)
+    first = domains[names[0]]
+
+    merged = {key: value for key, value in first.items() if key not in ('validation_rules', 'suppressed_rules')}
+    merged['domain'] = "+".join(names)
+    merged['domains'] = names
+    merged['namespaced'] = True
+
+    validation_rules: Dict[str, List[Dict[str, Any]]] = {}
+    # Forge Theory rules are merged by the validator itself; it filters them by bare ID
+    forge_suppressed = {rule_id.split(".", 1)[1] for rule_id in suppressed if rule_id.startswith(FORGE_NAMESPACE + ".")}
+    forge_suppressed |= {rule_id for rule_id in suppressed if "." not in rule_id}
+    for name, config in domains.items():
+        forge_suppressed.update(config.get('suppressed_rules', []))
+        for category, rules in config.get('validation_rules', {}).items():
+            merged_rules = validation_rules.setdefault(category, [])
+            for rule in rules:
+                rule_id = rule.get('id')
+                if rule_id is None:
+                    merged_rules.append(dict(rule, domain=name))
+                    continue
+                if rule_id in suppressed or f"{name}.{rule_id}" in suppressed:
+                    continue
+                merged_rules.append(dict(rule, id=f"{name}.{rule_id}", base_id=rule_id, domain=name))
+
+    merged['validation_rules'] = validation_rules
+    merged['suppressed_rules'] = sorted(forge_suppressed)
+    return merged
+
+
+class CompositeValidator(PDEIValidator):
+    """
+    Validator for several domains at once.
+
+    The merged config is an ordinary domain config, so compilation, the shared registry, the
+    result cache and batch validation (`validate_many`) work exactly as for a single domain.
+    """
+    def __init__(self, domains: Dict[str, Dict[str, Any]], memory_interface: Any = None,
+                 suppressed_rules: Iterable[str] = (), config_paths: Optional[Dict[str, str]] = None):
+        self.domains = dict(domains)
+        self.suppressed_rules = list(suppressed_rules)
+        # Domain name -> config file, for hot reload
+        self.config_paths = dict(config_paths or {})
+        super().__init__(merge_domain_configs(self.domains, self.suppressed_rules), memory_interface)
+
+    @classmethod
+    def from_paths(cls, paths: Sequence[str], memory_interface: Any = None,
+                   suppressed_rules: Iterable[str] = ()) -> "CompositeValidator":
+        """Load each config file; the file name (e.g. `web_dev` for web_dev.json) is its namespace."""
+        domains: Dict[str, Dict[str, Any]] = {}
+        config_paths: Dict[str, str] = {}
+        for path in paths:
+            name = Path(path).stem
+            if name in domains:
+                raise ValueError(f"Domain '{name}' is listed twice")
+            with open(path, 'r', encoding='utf-8') as f:
+                domains[name] = json.load(f)
+            config_paths[name] = str(path)
+        return cls(domains, memory_interface, suppressed_rules, config_paths)
+
+    def _config_mtime_ns(self) -> Optional[Tuple[Optional[int], ...]]:
+        if not getattr(self, 'config_paths', None):
+            return None
+        return tuple(Path(path).stat().st_mtime_ns if Path(path).exists() else None
+                     for path in self.config_paths.values())
+
+    def _reload_domain_config(self):
+        """Re-read member configs that changed on disk (a broken edit keeps that domain's old rules)."""
+        mtime = self._config_mtime_ns()
+        if mtime is None or mtime == self._config_mtime:
+            return
+        previous = self._config_mtime or (None,) * len(mtime)
+        self._config_mtime = mtime
+        for (name, path), old, new in zip(self.config_paths.items(), previous, mtime):
+            if new is None or new == old:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.domains[name] = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"⚠️ Keeping previous {name} rules, failed to reload {path}: {e}")
+        self.domain_config = merge_domain_configs(self.domains, self.suppressed_rules)
+        self.domain = self.domain_config['domain']
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\fixes.py
+P.DE.I Framework - Auto-Fix Planner
+===================================
+
+Auto-fixes are expressed as edits, `(start, end, replacement)` operations against the text they
+were computed on, instead of whole-string rewrites. The planner merges the edits of every fix and
+applies them in one linear pass.
+
+Key Components:
+1. apply_edits: Applies a set of non-overlapping edits in a single pass.
+2. FixPlanner: Dedupes fixes per rule, merges non-conflicting edits and re-plans the rest.
+
+Where it fits:
+    `logic.py` (`PDEIValidator.auto_fix`) plans the fixes for a code block. `buddai_executive.py`
+    uses `apply_edits` to splice every fixed block back into the enclosing response at once.
+"""
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+Edit = Tuple[int, int, str]
+
+
+def apply_edits(text: str, edits: List[Edit]) -> str:
+    """Apply non-overlapping edits in one pass (edits may be given in any order)."""
+    if not edits:
+        return text
+    parts: List[str] = []
+    pos = 0
+    for start, end, replacement in sorted(edits, key=lambda e: (e[0], e[1])):
+        parts.append(text[pos:start])
+        parts.append(replacement)
+        pos = end
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def edits_conflict(a: Edit, b: Edit) -> bool:
+    """Overlapping ranges, or two edits anchored at the same offset (their order would matter)."""
+    return (a[0] < b[1] and b[0] < a[1]) or a[0] == b[0]
+
+
+def fix_key(issue: Dict[str, Any]) -> Hashable:
+    """Issues that would apply the same fix: same fixer, same rule, same pattern/replacement."""
+    return (issue.get('auto_fix'), issue.get('id'), issue.get('trigger_pattern'), issue.get('replacement'))
+
+
+class FixPlanner:
+    """
+    Plans the fixes for a list of issues against one block of code.
+
+    Fixes are considered in issue order. Each round computes every pending fix's edits on the
+    current text and accepts those that do not conflict with edits already accepted; all accepted
+    edits are then applied in one pass. A fix is re-planned on the merged result in the next round
+    when its edits conflict, or when it found nothing to do after an earlier fix changed the text
+    (it may only apply to that fix's output). Every round settles at least its first fix.
+    """
+    def __init__(self, plan_fix: Callable[[str, Dict[str, Any]], List[Edit]]):
+        self.plan_fix = plan_fix
+
+    def apply(self, code: str, issues: List[Dict[str, Any]]) -> str:
+        unique: Dict[Hashable, Dict[str, Any]] = {}
+        for issue in issues:
+            if 'auto_fix' in issue:
+                unique.setdefault(fix_key(issue), issue)
+        pending = list(unique.values())
+
+        while pending:
+            accepted: List[Edit] = []
+            deferred: List[Dict[str, Any]] = []
+            for issue in pending:
+                edits = self.plan_fix(code, issue)
+                if not edits:
+                    if accepted:
+                        deferred.append(issue)
+                    continue
+                if any(edits_conflict(e, a) for e in edits for a in accepted):
+                    deferred.append(issue)
+                    continue
+                accepted.extend(edits)
+
+            if not accepted:
+                break
+            code = apply_edits(code, accepted)
+            pending = deferred
+        return code
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\formulas.py
+P.DE.I Framework - Forge Theory Formula Verifier
+================================================
+
+The decay/growth/step-response rules used to look for literal text like `exp(t/`, so
+`exp( t / tau )` or `expf(time/TAU)` slipped through. This module finds every exponential in a
+block, evaluates its argument over a grid of time and tau values and classifies it by what it
+actually does:
+
+    exp(-t/tau), expf(-time/TAU)        -> 'decay'      (falls towards 0)
+    1 - exp(-t/tau), 1.0f - expf(...)   -> 'growth'     (rises towards 1)
+    exp(t/tau), 1 - exp(k*t)            -> 'divergent'  (blows up)
+
+Arguments are evaluated by a small interpreter over the expression AST (never `eval`). Names that
+look like time (`t`, `time`, `elapsed`, `millis()`...) sweep the time grid; every other name is a
+positive constant sweeping the tau grid. Anything else (casts it cannot strip, unknown calls, no
+time variable) classifies as 'unknown' and is left to the literal rule fields.
+
+Key Components:
+1. find_exp_terms: Memoized extraction + classification of every `exp(...)`/`1 - exp(...)` term.
+2. FormulaCheck: The compiled `formula` field of a rule (`{"expect": "decay", "forbid": [...]}`).
+3. negate_expression: Sign flip used by the decay/growth/step-response auto-fixes.
+
+Where it fits:
+    `rules.py` compiles the `formula` field of a rule. `lexer.py` exposes the terms of a block as
+    `BlockAnalysis.formulas`; `logic.py` checks rules and plans the formula fixes from them.
+    Uses NumPy when installed (one vectorized evaluation per term), plain floats otherwise.
+"""
+import ast
+import logging
+import math
+import re
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+KINDS = ('decay', 'growth', 'divergent')
+
+# Time from 0 to 10 (seconds, or any unit), and the tau presets of forge_theory.json plus slower ones
+TIME_GRID = tuple(i * 0.25 for i in range(41))
+TAU_GRID = (0.03, 0.1, 0.3, 1.0, 3.0, 10.0)
+# Growth beyond this factor over the grid counts as divergent even if it stays finite
+DIVERGENCE_LIMIT = 1e6
+
+TIME_NAMES = {'t', 'time', 'elapsed', 'now', 'dt', 'ms', 'sec', 'secs', 'seconds', 'millis', 'micros'}
+TIME_CALLS = {'millis', 'micros', 'time', 'monotonic', 'perf_counter', 'now'}
+# A name containing one of these is a duration constant, not the time variable (time_constant, decay_period)
+TIME_CONSTANT_WORDS = {'tau', 'constant', 'const', 'period', 'interval', 'timeout'}
+
+_EXP_CALL = re.compile(
+    r'(?P<complement>(?<![\w.])1(?:\.0*)?[fF]?\s*-\s*)?'
+    r'(?P<fn>\b(?:(?:np|numpy|math|Math|std)\s*(?:\.|::)\s*)?exp[fl]?)\s*\('
+)
+_FLOAT_SUFFIX = re.compile(r'\b(\d+\.?\d*(?:[eE][-+]?\d+)?)[fFlL]\b')
+# snake_case and camelCase parts of an identifier (digits stay with their word: t0, x2)
+_NAME_PART = re.compile(r'[A-Z]+(?![a-z])\d*|[A-Z]?[a-z]+\d*|\d+')
+_C_CAST = re.compile(r'\(\s*(?:float|double|int|long|unsigned\s+long|unsigned)\s*\)')
+
+
+class FormulaTerm:
+    """One exponential term: its span in the block, its argument span and its classification."""
+    __slots__ = ("start", "end", "fn", "arg_start", "arg_end", "complement", "arg_decays", "kind")
+
+    def __init__(self, start: int, end: int, fn: str, arg_start: int, arg_end: int, complement: bool, arg_decays: Optional[bool]):
+        self.start = start
+        self.end = end
+        self.fn = fn
+        self.arg_start = arg_start
+        self.arg_end = arg_end
+        self.complement = complement
+        # True: exp(arg) decays, False: exp(arg) diverges, None: could not tell
+        self.arg_decays = arg_decays
+        if arg_decays is None:
+            self.kind = 'unknown'
+        elif arg_decays:
+            self.kind = 'growth' if complement else 'decay'
+        else:
+            self.kind = 'divergent'
+
+
+@lru_cache(maxsize=64)
+def find_exp_terms(code: str) -> Tuple[FormulaTerm, ...]:
+    """Every exponential term in `code`, in order (nested exponentials are part of the outer term)."""
+    terms = []
+    pos = 0
+    while True:
+        m = _EXP_CALL.search(code, pos)
+        if m is None:
+            break
+        open_paren = m.end() - 1
+        close_paren = _closing_paren(code, open_paren)
+        if close_paren < 0:
+            pos = m.end()
+            continue
+        arg_start, arg_end = open_paren + 1, close_paren
+        terms.append(FormulaTerm(m.start(), close_paren + 1, m.group('fn'), arg_start, arg_end,
+                                 m.group('complement') is not None, classify_argument(code[arg_start:arg_end])))
+        pos = close_paren + 1
+    return tuple(terms)
+
+
+def _closing_paren(code: str, open_paren: int) -> int:
+    depth = 0
+    for i in range(open_paren, len(code)):
+        c = code[i]
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+        elif c in ';{}\n':
+            break
+    return -1
+
+
+# --- Classification ---
+
+class _Unsupported(Exception):
+    pass
+
+
+@lru_cache(maxsize=256)
+def classify_argument(arg: str) -> Optional[bool]:
+    """True if exp(arg) decays over time, False if it diverges, None if it cannot be told."""
+    try:
+        tree = ast.parse(_normalize(arg), mode='eval').body
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+    if not _uses_time(tree):
+        return None
+    try:
+        if np is not None:
+            t = np.array(TIME_GRID).reshape(-1, 1)
+            tau = np.array(TAU_GRID).reshape(1, -1)
+            with np.errstate(all='ignore'):
+                values = np.exp(np.broadcast_to(_evaluate(tree, t, tau), (len(TIME_GRID), len(TAU_GRID))))
+            columns = values.T.tolist()
+        else:
+            columns = [[_exp(_evaluate(tree, t, tau)) for t in TIME_GRID] for tau in TAU_GRID]
+    except _Unsupported:
+        return None
+    return _classify_columns(columns)
+
+
+def _classify_columns(columns: Sequence[Sequence[float]]) -> Optional[bool]:
+    decays = True
+    for column in columns:
+        if any(math.isnan(v) for v in column):
+            return None
+        if any(math.isinf(v) for v in column) or max(column) > DIVERGENCE_LIMIT * max(1.0, column[0]):
+            return False
+        steps = [b - a for a, b in zip(column, column[1:])]
+        if not (all(s <= 1e-12 for s in steps) and any(s < 0 for s in steps)):
+            decays = False
+    # Bounded but not falling (e.g. exp(-tau/t)): not a Forge Theory shape
+    return True if decays else None
+
+
+def _exp(value: float) -> float:
+    try:
+        return math.exp(value)
+    except OverflowError:
+        return math.inf
+
+
+def _normalize(arg: str) -> str:
+    """C/C++/JS spellings -> a Python expression."""
+    arg = _C_CAST.sub('', arg)
+    arg = _FLOAT_SUFFIX.sub(r'\1', arg)
+    return arg.replace('->', '.').replace('::', '.').strip()
+
+
+def _name(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _is_time_name(name: str) -> bool:
+    """Whole words only: `elapsed_ms`, `startTime` and `t` are time; `time_constant` and `timeout` are not."""
+    parts = [part.lower() for part in _NAME_PART.findall(name)]
+    if any(part in TIME_CONSTANT_WORDS for part in parts):
+        return False
+    return any(part in TIME_NAMES or part.startswith(('time', 'elapsed')) or part.endswith('time') for part in parts)
+
+
+def _is_time_call(node: ast.AST) -> bool:
+    return isinstance(node, ast.Call) and not node.args and _name(node.func) in TIME_CALLS
+
+
+def _uses_time(tree: ast.AST) -> bool:
+    for node in ast.walk(tree):
+        name = _name(node)
+        if _is_time_call(node) or (name is not None and _is_time_name(name)):
+            return True
+    return False
+
+
+_BINARY = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b,
+}
+_UNARY_CALLS = {'float', 'double', 'int', 'abs', 'fabs', 'fabsf'}
+
+
+def _evaluate(node: ast.AST, t: Any, tau: Any) -> Any:
+    """Evaluate an argument expression; `t`/`tau` are floats or broadcastable NumPy arrays."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return float(node.value)
+    if _is_time_call(node):
+        return t
+    if isinstance(node, (ast.Name, ast.Attribute)):
+        return t if _is_time_name(_name(node)) else tau
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _evaluate(node.operand, t, tau)
+        return -value if isinstance(node.op, ast.USub) else value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+        left, right = _evaluate(node.left, t, tau), _evaluate(node.right, t, tau)
+        try:
+            return _BINARY[type(node.op)](left, right)
+        except ZeroDivisionError:
+            return math.inf if left > 0 else (-math.inf if left < 0 else math.nan)
+    if isinstance(node, ast.Call) and len(node.args) == 1 and _name(node.func) in _UNARY_CALLS:
+        value = _evaluate(node.args[0], t, tau)
+        return abs(value) if _name(node.func).endswith(('abs', 'absf')) else value
+    raise _Unsupported(type(node).__name__)
+
+
+# --- Rule checks and fixes ---
+
+def negate_expression(arg: str) -> str:
+    """`t/tau` -> `-t/tau`, `-t/tau` -> `t/tau`, `a + b` -> `-(a + b)` (outer spacing trimmed)."""
+    text = arg.strip()
+    if text.startswith('-') and not _has_top_level_sum(text[1:]):
+        return text[1:].lstrip()
+    return f"-({text})" if _has_top_level_sum(text) else f"-{text}"
+
+
+def _has_top_level_sum(text: str) -> bool:
+    depth = 0
+    for i, c in enumerate(text):
+        if c in '([':
+            depth += 1
+        elif c in ')]':
+            depth -= 1
+        elif c in '+-' and depth == 0 and i > 0 and text[i - 1] not in 'eE*/(':
+            return True
+    return False
+
+
+def decay_argument(code: str, term: FormulaTerm) -> str:
+    """The argument of `term` rewritten so that exp(arg) decays."""
+    arg = code[term.arg_start:term.arg_end]
+    return arg if term.arg_decays else negate_expression(arg)
+
+
+class FormulaCheck:
+    """The compiled `formula` field of a rule."""
+    __slots__ = ("expect", "forbid")
+
+    def __init__(self, expect: Optional[str], forbid: Tuple[str, ...]):
+        self.expect = expect
+        self.forbid = forbid
+
+    def violations(self, terms: Sequence[FormulaTerm], expect_met: bool = False) -> Optional[List[Tuple[FormulaTerm, str]]]:
+        """
+        (term, message) pairs; None if no term could be classified (the literal fields apply).
+
+        `expect_met`: the block satisfies the rule another way (e.g. uses a lookup table), so only
+        forbidden kinds are reported.
+        """
+        known = [term for term in terms if term.kind != 'unknown']
+        if not known:
+            return None
+        found = [(term, f"Formula behaves as {term.kind}") for term in known if term.kind in self.forbid]
+        if self.expect is not None and not expect_met and not any(term.kind == self.expect for term in known) and not found:
+            found.append((known[0], f"Expected a {self.expect} formula, found {known[0].kind}"))
+        return found
+
+
+def compile_formula_check(spec: Any, rule_id: Any = None) -> Optional[FormulaCheck]:
+    """Validate a `formula` rule spec; invalid specs are logged and disable the numeric check."""
+    try:
+        if not isinstance(spec, dict):
+            raise ValueError("'formula' must be an object")
+        expect = spec.get('expect')
+        forbid = spec.get('forbid', [])
+        forbid = (forbid,) if isinstance(forbid, str) else tuple(forbid)
+        for kind in ((expect,) if expect is not None else ()) + forbid:
+            if kind not in KINDS:
+                raise ValueError(f"unknown formula kind {kind!r}")
+        return FormulaCheck(expect, forbid)
+    except (TypeError, ValueError) as e:
+        logging.warning(f"Ignoring invalid formula spec of rule {rule_id!r}: {e}")
+        return None
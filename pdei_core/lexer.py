@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\lexer.py
+P.DE.I Framework - Code Block Lexer
+===================================
+
+A small tokenizer per language family that splits a code block into code, comment and string
+spans in one pass, so comment markers inside strings (`"#"`, `'http://...'`) and preprocessor
+lines (`#include`) are no longer mistaken for comments.
+
+Key Components:
+1. detect_language: Picks a language family from strong syntax markers (or 'generic').
+2. tokenize: Yields `(kind, start, end)` spans, kind being 'code', 'comment' or 'string'.
+3. BlockAnalysis: Per-block result shared by every rule category: the comment-blanked code
+   (offsets preserved), an offset -> line map, the classified exponential terms (`formulas.py`)
+   and, for Python, the parsed AST (`ast_rules.py`).
+
+Where it fits:
+    `logic.py` builds one `BlockAnalysis` per validated block. Strings stay visible to the rules;
+    only comments are blanked.
+"""
+import re
+from bisect import bisect_right
+from typing import Iterator, List, Optional, Tuple
+
+from pdei_core.ast_rules import ParsedPython, parse_python
+from pdei_core.formulas import FormulaTerm, find_exp_terms
+
+Token = Tuple[str, int, int]
+
+_NON_NEWLINE = re.compile(r'[^\n]')
+
+_BLOCK = r'/\*[\s\S]*?\*/'
+_SLASH_LINE = r'//[^\n]*'
+_HASH_LINE = r'#[^\n]*'
+_DQ = r'"(?:\\.|[^"\\\n])*"'
+_SQ = r"'(?:\\.|[^'\\\n])*'"
+
+# Comment alternatives are captured in group 1; anything else matched is a string literal
+_FAMILY_PATTERNS = {
+    'c': re.compile(rf'({_SLASH_LINE}|{_BLOCK})|{_DQ}|{_SQ}'),
+    'python': re.compile(rf'({_HASH_LINE})|"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|{_DQ}|{_SQ}'),
+    'js': re.compile(rf'({_SLASH_LINE}|{_BLOCK})|{_DQ}|{_SQ}|`(?:\\[\s\S]|[^`\\])*`'),
+    'css': re.compile(rf'({_BLOCK})|{_DQ}|{_SQ}'),
+    'html': re.compile(rf'(<!--[\s\S]*?-->|{_BLOCK})'),
+    # Unknown or mixed snippets: every comment style, no string handling
+    'generic': re.compile(rf'({_BLOCK}|{_SLASH_LINE}|{_HASH_LINE})'),
+}
+
+# Fence labels / file suffixes mapped to families
+LANGUAGE_ALIASES = {
+    'c': 'c', 'cpp': 'c', 'c++': 'c', 'h': 'c', 'hpp': 'c', 'ino': 'c', 'arduino': 'c',
+    'java': 'c', 'cs': 'c', 'csharp': 'c', 'kotlin': 'c', 'swift': 'c', 'go': 'c', 'rust': 'c',
+    'py': 'python', 'python': 'python',
+    'js': 'js', 'javascript': 'js', 'jsx': 'js', 'ts': 'js', 'typescript': 'js', 'tsx': 'js',
+    'css': 'css', 'scss': 'css',
+    'html': 'html', 'htm': 'html', 'xml': 'html', 'svg': 'html',
+}
+
+_MARKERS = [
+    ('html', re.compile(r'^\s*<(?:!DOCTYPE|html|head|body|div|template|svg)\b', re.IGNORECASE)),
+    ('c', re.compile(r'^\s*#\s*(?:include|define|ifn?def|pragma)\b|\bvoid\s+(?:setup|loop|main)\s*\(|\bint\s+main\s*\(|\bSerial\.\w+\(|\bstd::', re.MULTILINE)),
+    ('python', re.compile(r'^\s*(?:def\s+\w+\s*\(.*\)\s*(?:->.*)?:|class\s+\w+(?:\(.*\))?\s*:|import\s+\w+|from\s+[\w.]+\s+import\b|elif\b)', re.MULTILINE)),
+    ('js', re.compile(r'\bfunction\s*\w*\s*\(|=>|\b(?:const|let)\s+\w+\s*=|\bconsole\.\w+\(|\bdocument\.\w+|\brequire\(', re.MULTILINE)),
+    ('css', re.compile(r'^\s*[.#]?[\w-]+(?:\s*[,>+~]\s*[.#]?[\w-]+)*\s*\{\s*[\w-]+\s*:', re.MULTILINE)),
+]
+
+
+def detect_language(code: str) -> str:
+    """Return the first family with a strong syntax marker, or 'generic' when none (or two) match."""
+    found = [family for family, marker in _MARKERS if marker.search(code)]
+    # HTML embeds CSS and JS; any other combination is ambiguous
+    if found and (len(found) == 1 or found[0] == 'html'):
+        return found[0]
+    return 'generic'
+
+
+def normalize_language(language: Optional[str]) -> Optional[str]:
+    if not language:
+        return None
+    language = language.lower().lstrip('.')
+    return language if language in _FAMILY_PATTERNS else LANGUAGE_ALIASES.get(language)
+
+
+def tokenize(code: str, language: str = 'generic') -> Iterator[Token]:
+    """Yield consecutive ('code' | 'comment' | 'string', start, end) spans covering `code`."""
+    pos = 0
+    for m in _FAMILY_PATTERNS[language].finditer(code):
+        if m.start() > pos:
+            yield ('code', pos, m.start())
+        yield ('comment' if m.group(1) is not None else 'string', m.start(), m.end())
+        pos = m.end()
+    if pos < len(code):
+        yield ('code', pos, len(code))
+
+
+class BlockAnalysis:
+    """
+    One lexer pass over a code block, shared by all rule categories.
+
+    `clean_code` has every comment replaced by spaces (newlines kept), so offsets and line numbers
+    in it match the original block.
+    """
+    __slots__ = ("code", "language", "comments", "strings", "clean_code", "_line_starts", "_python",
+                 "_formulas")
+
+    def __init__(self, code: str, language: Optional[str] = None):
+        self.code = code
+        self.language = normalize_language(language) or detect_language(code)
+        self.comments: List[Tuple[int, int]] = []
+        self.strings: List[Tuple[int, int]] = []
+        parts: List[str] = []
+        for kind, start, end in tokenize(code, self.language):
+            if kind == 'comment':
+                self.comments.append((start, end))
+                # Keep newlines (multi-line block comments) so line numbers survive
+                parts.append(_NON_NEWLINE.sub(' ', code[start:end]))
+                continue
+            if kind == 'string':
+                self.strings.append((start, end))
+            parts.append(code[start:end])
+        self.clean_code = ''.join(parts)
+        self._line_starts: Optional[List[int]] = None
+        self._python: Optional[ParsedPython] = None
+        self._formulas: Optional[Tuple[FormulaTerm, ...]] = None
+
+    def line_of(self, offset: int) -> int:
+        """1-based line number of a character offset."""
+        if self._line_starts is None:
+            self._line_starts = [0] + [m.end() for m in re.finditer('\n', self.code)]
+        return bisect_right(self._line_starts, offset)
+
+    @property
+    def python(self) -> Optional[ParsedPython]:
+        """The block parsed as Python (on first use), or None if it is not valid Python."""
+        if self._python is None and self.language in ('python', 'generic'):
+            self._python = parse_python(self.code) or False
+        return self._python or None
+
+    @property
+    def formulas(self) -> Tuple[FormulaTerm, ...]:
+        """Exponential terms outside comments, classified on first use."""
+        if self._formulas is None:
+            self._formulas = find_exp_terms(self.clean_code)
+        return self._formulas
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\lint.py
+P.DE.I Framework - Repository Lint CLI
+======================================
+
+Applies a domain's validation rules (plus Fundamental Forge Theory) to whole source trees, so
+existing firmware repos can be held to the same rules as generated code.
+
+    python -m pdei_core.lint <path> --domain embedded [--fix] [--format text|json|sarif]
+    python -m pdei_core.lint <path> --domain embedded,web_dev,cybersecurity   (one pass, see composite.py)
+
+Key Components:
+1. collect_files: Walks the tree for `SOURCE_SUFFIXES` (the set `index_local_repositories` indexes).
+2. LintCache: Per-file mtime/size/sha256 cache, so unchanged files are not re-validated on re-runs.
+3. lint_paths: Validates changed files through `PDEIValidator.validate_many` (process pool) and
+   optionally writes auto-fixes back.
+4. to_json / to_sarif: Report formats for scripts and CI code-scanning.
+
+Where it fits:
+    A standalone entry point over `logic.py`; it does not need Ollama or the memory database.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from pdei_core.composite import CompositeValidator
+from pdei_core.logic import PDEIValidator
+from pdei_core.shared import SOURCE_SUFFIXES
+
+DOMAIN_CONFIG_DIR = Path(__file__).parent.parent / "domain_configs"
+CACHE_FILENAME = ".pdei_lint_cache.json"
+CACHE_FORMAT = 1
+
+# Directories that never hold first-party sources
+SKIP_DIRS = {"node_modules", "__pycache__", "build", "dist", "venv", "env"}
+
+SARIF_LEVELS = {"error": "error", "warning": "warning", "info": "note"}
+
+
+def resolve_domain_config(domain: str) -> Path:
+    """Accept a config path or a name from `domain_configs/` (e.g. 'embedded')."""
+    path = Path(domain)
+    if path.suffix == ".json" and path.exists():
+        return path
+    path = DOMAIN_CONFIG_DIR / f"{domain}.json"
+    if not path.exists():
+        raise FileNotFoundError(f"Unknown domain '{domain}' (no {path})")
+    return path
+
+
+def collect_files(root: Path) -> List[Path]:
+    if root.is_file():
+        return [root] if root.suffix in SOURCE_SUFFIXES else []
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and d not in SKIP_DIRS)
+        for name in sorted(filenames):
+            if Path(name).suffix in SOURCE_SUFFIXES:
+                files.append(Path(dirpath) / name)
+    return files
+
+
+def ruleset_fingerprint(validator: PDEIValidator, context: str) -> str:
+    """Cached results are only valid for the same merged rule set and context."""
+    payload = json.dumps([validator.validation_rules, context.lower()], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LintCache:
+    """
+    Issues per file from previous runs.
+
+    A file whose mtime and size are unchanged is skipped without being read; otherwise its
+    content hash is compared, so touched-but-identical files are skipped too.
+    """
+    def __init__(self, path: Optional[Path], fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if path is not None and path.exists():
+            try:
+                data = json.loads(path.read_text(encoding='utf-8'))
+                if data.get("format") == CACHE_FORMAT and data.get("rules") == self.fingerprint:
+                    self.files = data.get("files", {})
+            except (OSError, ValueError):
+                self.files = {}
+
+    def lookup_stat(self, key: str, stat: os.stat_result) -> Optional[List[Dict[str, Any]]]:
+        entry = self.files.get(key)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry["issues"]
+        return None
+
+    def lookup_hash(self, key: str, digest: str) -> Optional[List[Dict[str, Any]]]:
+        entry = self.files.get(key)
+        return entry["issues"] if entry and entry["sha256"] == digest else None
+
+    def store(self, key: str, stat: os.stat_result, digest: str, issues: List[Dict[str, Any]]):
+        self.files[key] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest, "issues": issues}
+
+    def save(self, keep: List[str]):
+        if self.path is None:
+            return
+        files = {key: self.files[key] for key in keep if key in self.files}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"format": CACHE_FORMAT, "rules": self.fingerprint, "files": files}), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+
+def lint_paths(root: Path, validator: PDEIValidator, context: str = "", fix: bool = False,
+               cache_path: Optional[Path] = None, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Validate every source file under `root`.
+
+    Returns `{"files": [...relative paths], "results": {path: issues}, "fixed": [...], "cached": n}`.
+    """
+    root = Path(root)
+    base = root if root.is_dir() else root.parent
+    cache = LintCache(cache_path, ruleset_fingerprint(validator, context))
+    files = collect_files(root)
+
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    pending: List[Tuple[str, Path, os.stat_result, str, bytes]] = []
+    cached = 0
+    for path in files:
+        key = path.relative_to(base).as_posix()
+        stat = path.stat()
+        issues = cache.lookup_stat(key, stat)
+        # With --fix, files with fixable cached issues still have to be read and rewritten
+        if issues is None or (fix and _fixable(issues)):
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            issues = cache.lookup_hash(key, digest)
+            if issues is None or (fix and _fixable(issues)):
+                pending.append((key, path, stat, digest, data))
+                continue
+            # Same content under a new mtime: refresh the stat so the next run skips the read
+            cache.store(key, stat, digest, issues)
+        results[key] = issues
+        cached += 1
+
+    sources = [data.decode('utf-8', errors='replace') for _, _, _, _, data in pending]
+    # The file suffix picks the lexer (e.g. `#include` in an ambiguous .ino is code, not a comment)
+    checked = validator.validate_many([(code, context, path.suffix) for code, (_, path, _, _, _) in zip(sources, pending)],
+                                      workers=workers)
+    fixed = []
+    for (key, path, stat, digest, data), code, (_, issues) in zip(pending, sources, checked):
+        results[key] = issues
+        # Files that are not valid UTF-8 are reported but never rewritten
+        writable = code.encode('utf-8') == data
+        if fix and writable and _fixable(issues):
+            new_code = validator.auto_fix(code, issues)
+            if new_code != code:
+                # Bytes, not text mode: line endings are left exactly as the fixer produced them
+                path.write_bytes(new_code.encode('utf-8'))
+                fixed.append(key)
+                # Not cached: the rewritten file is validated again on the next run
+                continue
+        cache.store(key, stat, digest, issues)
+
+    cache.save(list(results))
+    return {"files": [path.relative_to(base).as_posix() for path in files], "results": results, "fixed": fixed, "cached": cached}
+
+
+def _fixable(issues: List[Dict[str, Any]]) -> bool:
+    return any('auto_fix' in issue for issue in issues)
+
+
+def _iter_issues(report: Dict[str, Any]):
+    for key in sorted(report["results"]):
+        for issue in report["results"][key]:
+            yield key, issue
+
+
+def to_json(report: Dict[str, Any]) -> Dict[str, Any]:
+    issues = [{"path": key, "line": issue.get("line", -1), "severity": issue.get("severity", "warning"),
+               "id": issue.get("id"), "message": issue.get("message")} for key, issue in _iter_issues(report)]
+    return {
+        "files_checked": len(report["files"]),
+        "files_cached": report["cached"],
+        "files_fixed": report["fixed"],
+        "errors": sum(1 for i in issues if i["severity"] == "error"),
+        "issues": issues,
+    }
+
+
+def to_sarif(report: Dict[str, Any]) -> Dict[str, Any]:
+    rules: Dict[str, Dict[str, Any]] = {}
+    results = []
+    for key, issue in _iter_issues(report):
+        rule_id = str(issue.get("id") or "pdei")
+        rules.setdefault(rule_id, {"id": rule_id, "shortDescription": {"text": issue.get("message") or rule_id}})
+        location: Dict[str, Any] = {"artifactLocation": {"uri": key}}
+        if issue.get("line", -1) > 0:
+            location["region"] = {"startLine": issue["line"]}
+        results.append({
+            "ruleId": rule_id,
+            "level": SARIF_LEVELS.get(issue.get("severity"), "warning"),
+            "message": {"text": issue.get("message") or rule_id},
+            "locations": [{"physicalLocation": location}],
+        })
+    return {
+        "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+        "version": "2.1.0",
+        "runs": [{
+            "tool": {"driver": {"name": "pdei-lint", "informationUri": "https://github.com/JamesTheGiblet/P.DE.I-framework",
+                                "rules": list(rules.values())}},
+            "results": results,
+        }],
+    }
+
+
+def to_text(report: Dict[str, Any]) -> str:
+    lines = [f"{key}:{issue.get('line', -1)}: {issue.get('severity', 'warning')} [{issue.get('id')}] {issue.get('message')}"
+             for key, issue in _iter_issues(report)]
+    summary = f"{len(report['files'])} files checked ({report['cached']} unchanged), {len(lines)} issues"
+    if report["fixed"]:
+        summary += f", {len(report['fixed'])} files fixed"
+    return "\n".join(lines + [summary])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m pdei_core.lint", description="Apply P.DE.I domain rules to a source tree")
+    parser.add_argument("path", help="File or directory to lint")
+    parser.add_argument("--domain", default="embedded", help="Domain name in domain_configs/ or path to a domain config (comma-separated for several)")
+    parser.add_argument("--context", default="", help="Validation context (e.g. target platform: 'esp32 motor')")
+    parser.add_argument("--fix", action="store_true", help="Write auto-fixes back to the files")
+    parser.add_argument("--format", choices=["text", "json", "sarif"], default="text", help="Report format")
+    parser.add_argument("--output", help="Write the report to a file instead of stdout")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--no-cache", action="store_true", help=f"Ignore and do not write {CACHE_FILENAME}")
+    args = parser.parse_args(argv)
+
+    root = Path(args.path)
+    if not root.exists():
+        parser.error(f"{root} does not exist")
+    try:
+        config_paths = [resolve_domain_config(domain.strip()) for domain in args.domain.split(",") if domain.strip()]
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    if not config_paths:
+        parser.error("--domain needs at least one config")
+    if len(config_paths) > 1:
+        try:
+            validator = CompositeValidator.from_paths([str(path) for path in config_paths])
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        with open(config_paths[0], 'r', encoding='utf-8') as f:
+            domain_config = json.load(f)
+        validator = PDEIValidator(domain_config, config_path=str(config_paths[0]))
+    cache_path = None if args.no_cache else (root if root.is_dir() else root.parent) / CACHE_FILENAME
+    report = lint_paths(root, validator, context=args.context, fix=args.fix, cache_path=cache_path, workers=args.workers)
+
+    if args.format == "json":
+        output = json.dumps(to_json(report), indent=2)
+    elif args.format == "sarif":
+        output = json.dumps(to_sarif(report), indent=2)
+    else:
+        output = to_text(report)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding='utf-8')
+    else:
+        print(output)
+
+    has_errors = any(issue.get("severity") == "error" for _, issue in _iter_issues(report))
+    return 1 if has_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
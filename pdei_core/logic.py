@@ -18,11 +18,37 @@ Where it fits:
     This module is imported by `buddai_executive.py`. It is invoked immediately after the LLM generates code
     to validate, sanitize, and potentially auto-repair the output before it is shown to the user.
 """
+import hashlib
 import logging
+import os
 import re
 import json
+import time
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pdei_core.ast_rules import DEFINITION_NODES, decorator_names, parse_python
+from pdei_core.batch import DEFAULT_CHUNK_SIZE, MIN_POOL_ITEMS, ValidationPool, discard_pool, get_pool
+from pdei_core.cache import ValidationCache
+from pdei_core.fixes import Edit, FixPlanner
+from pdei_core.formulas import decay_argument, find_exp_terms, negate_expression
+from pdei_core.lexer import BlockAnalysis, normalize_language
+from pdei_core.profiler import RuleProfiler
+from pdei_core.rules import RULE_REGISTRY, CompiledRule, CompiledRuleset, RegexLayer, RegistryEntry, Span
+from pdei_core.safe_regex import is_safe_pattern
+
+
+FORGE_THEORY_PATH = Path(__file__).parent.parent / "domain_configs" / "forge_theory.json"
+
+# Seconds between checks of the domain config file and the learned-rule store for changes
+RELOAD_CHECK_INTERVAL = 1.0
+
+# Auto-fix patterns
+_ADC_10BIT = re.compile(r'102[34]')
+_ADC_12BIT = {"1023": "4095", "1024": "4096"}
+_INDENT = re.compile(r'[ \t]*')
+_ASSIGNMENT = re.compile(r'([a-zA-Z0-9_]+)\s*=\s*(\d+)')
 
 class PDEIValidator:
     """
@@ -30,24 +56,136 @@ class PDEIValidator:
     
     Handles domain-specific code validation and rule enforcement.
     This class acts as a generic engine that applies rules defined in the domain configuration.
+
+    The compiled rules live in the process-wide `RULE_REGISTRY`; a validator is a thin view over
+    the entry matching its configuration, so validators for many users share one rule set and
+    one result cache.
+
+    Rules are hot-reloaded: learned rules saved in this process are picked up on the next
+    validation, and at most every `RELOAD_CHECK_INTERVAL` seconds the domain config's mtime and
+    the learned-rule store (`rules_meta`, written by any process) are checked. A changed rule set is
+    compiled incrementally from the current one and swapped in with a single assignment, so
+    validations already running keep the rule set they started with.
     """
-    def __init__(self, domain_config: Dict[str, Any], memory_interface: Any = None):
+    def __init__(self, domain_config: Dict[str, Any], memory_interface: Any = None, config_path: Optional[str] = None):
         self.domain_config = domain_config
         self.memory_interface = memory_interface
+        # When given, the config file's path and mtime identify the rules instead of their content
+        self.config_path = config_path
         # Default to generic if not specified
         self.domain = domain_config.get('domain', 'generic')
-        self.validation_rules = self._load_validation_rules()
+        # Per-rule timing/hit counters, off unless requested (/profile-rules on)
+        self.profiler = RuleProfiler(enabled=os.environ.get("PDEI_PROFILE_RULES") == "1")
+        self._entry: Optional[RegistryEntry] = None
+        self._config_mtime = self._config_mtime_ns()
+        self._next_reload_check = time.monotonic() + RELOAD_CHECK_INTERVAL
+        self._attach()
+
+    @property
+    def validation_rules(self) -> Dict[str, List[Dict[str, Any]]]:
+        return self._entry.validation_rules
+
+    @property
+    def ruleset(self) -> CompiledRuleset:
+        return self._entry.ruleset
+
+    @property
+    def result_cache(self) -> ValidationCache:
+        """Results are cached per (code, context, rules_version)."""
+        return self._entry.result_cache
+
+    @property
+    def rules_version(self) -> Tuple[int, int]:
+        """Identifies the rule set in use: (registry build, learned-rule version)."""
+        return (self._entry.build_id, self._learned_version)
+
+    def _memory_rules_version(self) -> int:
+        return getattr(self.memory_interface, 'rules_version', 0) if self.memory_interface else 0
+
+    def _attach(self):
+        """Point this validator at the registry entry for its current configuration."""
+        self._learned_version = self._memory_rules_version()
+        previous = self._entry.ruleset if self._entry is not None else None
+        # A single assignment swaps the rule set (and its cache) for subsequent validations
+        self._entry = RULE_REGISTRY.get(self._registry_key(), partial(self._build_rules, previous))
+
+    def reload_rules(self):
+        """Re-resolve domain, Forge Theory and learned rules, e.g. after a config edit."""
+        self._reload_domain_config()
+        self._attach()
+
+    def _check_for_changes(self) -> RegistryEntry:
+        """Swap in a new rule set if learned rules or config files changed; returns the entry to use."""
+        now = time.monotonic()
+        if now >= self._next_reload_check:
+            self._next_reload_check = now + RELOAD_CHECK_INTERVAL
+            refresh = getattr(self.memory_interface, 'refresh_rules_version', None)
+            if refresh is not None:
+                try:
+                    refresh()
+                except Exception as e:
+                    logging.warning(f"Failed to check learned rules for changes: {e}")
+            self._reload_domain_config()
+            # Unchanged configuration maps to the same registry entry (a dict lookup)
+            self._attach()
+        elif self._memory_rules_version() != self._learned_version:
+            self._attach()
+        return self._entry
+
+    def _config_mtime_ns(self) -> Optional[int]:
+        if self.config_path and Path(self.config_path).exists():
+            return Path(self.config_path).stat().st_mtime_ns
+        return None
+
+    def _reload_domain_config(self):
+        """Re-read the domain config file if it changed on disk (a broken edit keeps the old rules)."""
+        mtime = self._config_mtime_ns()
+        if mtime is None or mtime == self._config_mtime:
+            return
+        self._config_mtime = mtime
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                domain_config = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"⚠️ Keeping previous rules, failed to reload {self.config_path}: {e}")
+            return
+        self.domain_config = domain_config
+        self.domain = domain_config.get('domain', 'generic')
+
+    def _registry_key(self) -> Tuple[Any, ...]:
+        config_id: Any = None
+        if self.config_path and Path(self.config_path).exists():
+            path = Path(self.config_path).resolve()
+            config_id = (str(path), path.stat().st_mtime_ns)
+        if config_id is None:
+            payload = json.dumps(self.domain_config.get('validation_rules', {}), sort_keys=True, default=str)
+            config_id = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        forge_mtime = FORGE_THEORY_PATH.stat().st_mtime_ns if FORGE_THEORY_PATH.exists() else None
+        suppressed = tuple(sorted(str(r) for r in self.domain_config.get('suppressed_rules', [])))
+        memory_id = None
+        if self.memory_interface is not None:
+            db_path = getattr(self.memory_interface, 'db_path', None)
+            memory_id = str(Path(db_path).resolve()) if db_path else id(self.memory_interface)
+        return (config_id, forge_mtime, suppressed, memory_id, self._learned_version)
+
+    def _build_rules(self, previous: Optional[CompiledRuleset] = None) -> Tuple[Dict[str, List[Dict[str, Any]]], CompiledRuleset]:
+        validation_rules = self._load_validation_rules()
+        # Bound to the memory, not this validator: the compiled rules outlive any single view
+        on_budget_exceeded = partial(_quarantine_pattern, self.memory_interface)
+        # Categories that did not change keep their compiled rules
+        return validation_rules, CompiledRuleset(validation_rules, on_budget_exceeded=on_budget_exceeded, previous=previous)
     
     def _load_validation_rules(self) -> Dict[str, List[Dict[str, Any]]]:
         """Load rules from the domain configuration and merge with Fundamental Forge Theory."""
         # Start with domain specific rules (copying to avoid mutation)
         source_rules = self.domain_config.get('validation_rules', {})
         rules = {k: v[:] for k, v in source_rules.items()}
+        # Composite configs (composite.py) tag every rule with the domain it came from
+        namespaced = bool(self.domain_config.get('namespaced'))
         
         # Load Fundamental Forge Theory Rules
         try:
-            root_dir = Path(__file__).parent.parent
-            forge_path = root_dir / "domain_configs" / "forge_theory.json"
+            forge_path = FORGE_THEORY_PATH
             
             if forge_path.exists():
                 with open(forge_path, 'r', encoding='utf-8') as f:
@@ -61,9 +199,14 @@ class PDEIValidator:
                         suppressed_ids = self.domain_config.get('suppressed_rules', [])
 
                         # Merge: Add Forge rule if ID not present in Domain rules
-                        existing_ids = {r.get('id') for r in rules[category] if 'id' in r}
+                        # (namespaced composite rules keep their original ID in 'base_id')
+                        existing_ids = {r.get('base_id', r.get('id')) for r in rules[category] if 'id' in r}
                         for rule in cat_rules:
                             if rule.get('id') not in existing_ids and rule.get('id') not in suppressed_ids:
+                                # Freshly loaded dict: tagging it does not touch the domain config
+                                rule['source'] = 'forge_theory'
+                                if namespaced:
+                                    rule['domain'] = 'forge_theory'
                                 rules[category].append(rule)
 
             # Load Learned Rules from Memory (The "Graduation" Link)
@@ -75,14 +218,22 @@ class PDEIValidator:
                             rules['learned_behavior'] = []
                         
                         for idx, rule in enumerate(learned_rules):
+                            # Rules saved before the complexity check existed may still be unsafe
+                            if not is_safe_pattern(rule['find']):
+                                _quarantine_pattern(self.memory_interface, rule['find'], "Failed static complexity check")
+                                continue
                             rules['learned_behavior'].append({
                                 "id": f"learned_{idx}",
                                 "severity": "warning",
                                 "message": f"Learned Violation: {rule['rule']}",
                                 "forbidden_regex": [rule['find']],
                                 "auto_fix": "generic_regex_replace",
-                                "replacement": rule['replace']
+                                "replacement": rule['replace'],
+                                "sandboxed": True,
+                                "source": "learned"
                             })
+                            if namespaced:
+                                rules['learned_behavior'][-1]['domain'] = 'learned'
                 except Exception as e:
                     logging.warning(f"Failed to load learned rules: {e}")
         except Exception as e:
@@ -90,158 +241,274 @@ class PDEIValidator:
 
         return rules
     
-    def validate(self, code: str, context: str = "") -> Tuple[bool, List[Dict[str, Any]]]:
+    def validate(self, code: str, context: str = "", language: Optional[str] = None) -> Tuple[bool, List[Dict[str, Any]]]:
         """
         Validate generated code against domain rules.
         
         Args:
             code: The source code to validate
             context: Additional context (user message, hardware profile, etc.)
+            language: Language tag or file suffix ("cpp", ".ino", "python"); detected from the
+                code when missing or unknown
             
         Returns:
             Tuple containing (is_valid: bool, issues: List[Dict])
         """
+        # Pick up learned rules saved (or quarantined) and config edits since the rule set was compiled
+        entry = self._check_for_changes()
+        ruleset = entry.ruleset
+
+        language = normalize_language(language)
+        cache_key = ValidationCache.make_key(code, context, (entry.build_id, self._learned_version), language)
+        cached = entry.result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         issues = []
+        profiling = self.profiler.enabled
+        if profiling:
+            scan_start = time.perf_counter_ns()
+        # One lexer pass: comment-blanked code and the line map, shared by every category
+        analysis = BlockAnalysis(code, language)
+        clean_code = analysis.clean_code
         
-        # Iterate through all rule categories (safety, style, etc.)
-        for category, rules in self.validation_rules.items():
-            if isinstance(rules, list):
-                issues.extend(self._check_rules(code, context, rules))
+        # One automaton pass over the code and one over the context resolves every literal
+        code_hits, context_hits = ruleset.scan(clean_code, context)
+        # Only rules whose trigger/platform literal was seen (plus ungated rules) are candidates
+        candidates = ruleset.candidates(code_hits, context_hits)
+        # Regex rules are precompiled; their match spans are reported by a single grouped scan
+        needs_regex = any(rule.needs_regex() for _, rules in candidates for rule in rules)
+        regex_hits = ruleset.regex.scan(clean_code) if needs_regex else {}
+        if profiling:
+            self.profiler.record_scan(time.perf_counter_ns() - scan_start)
         
-        return len([i for i in issues if i.get('severity') == 'error']) == 0, issues
+        # Iterate through the candidate rule categories (safety, style, etc.)
+        for category, rules in candidates:
+            if profiling:
+                issues.extend(self._check_rules_profiled(category, ruleset, analysis, rules, code_hits, context_hits, regex_hits))
+            else:
+                issues.extend(self._check_rules(ruleset, analysis, rules, code_hits, context_hits, regex_hits))
+        
+        result = (len([i for i in issues if i.get('severity') == 'error']) == 0, issues)
+        entry.result_cache.put(cache_key, result)
+        return result
+
+    def validate_many(self, items: Iterable[Tuple[str, ...]], workers: Optional[int] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      language: Optional[str] = None) -> Iterator[Tuple[bool, List[Dict[str, Any]]]]:
+        """
+        Validate many (code, context) pairs, yielding one `validate()` result per pair in order.
+        Items may also be (code, context, language) triples; `language` is the default for the rest.
+
+        Cached results are served directly; the rest are fanned out over a process pool whose
+        workers hold this validator's compiled rule set. Small batches (or `workers=1`) are
+        validated in-process. `workers` is capped at the CPU count, and only sizes a new pool:
+        each validator has one pool, whatever later callers ask for.
+        """
+        items = [(item[0], item[1] or "", normalize_language(item[2] if len(item) > 2 and item[2] else language))
+                 for item in items]
+        cpus = os.cpu_count() or 1
+        workers = max(1, min(workers or cpus, cpus))
+        self._check_for_changes()
+        pool_key = self._pool_key()
+        if workers < 2 or len(items) < MIN_POOL_ITEMS or pool_key is None:
+            for code, context, item_language in items:
+                yield self.validate(code, context, item_language)
+            return
 
-    def _check_rules(self, code: str, context: str, rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Generic rule checker engine."""
+        version = self.rules_version
+        keys = [ValidationCache.make_key(code, context, version, item_language) for code, context, item_language in items]
+        results = [self.result_cache.get(key) for key in keys]
+        misses = [items[i] for i, result in enumerate(results) if result is None]
+        if len(misses) < MIN_POOL_ITEMS:
+            pooled: Iterator = iter(())
+        else:
+            pooled = get_pool(pool_key, partial(self._build_pool, workers)).map(misses, chunk_size)
+
+        for index, result in enumerate(results):
+            if result is None:
+                try:
+                    result = next(pooled, None)
+                except Exception as e:
+                    # A dead worker breaks the whole pool; finish the batch in-process
+                    logging.warning(f"Batch validation worker failed: {e}")
+                    discard_pool(pool_key)
+                    pooled, result = iter(()), None
+                if result is None:
+                    result = self.validate(*items[index])
+                else:
+                    self.result_cache.put(keys[index], result)
+            yield result
+
+    def _pool_key(self) -> Optional[Tuple[Any, ...]]:
+        """Identifies the pool able to serve this validator, or None if workers cannot rebuild it."""
+        if self.memory_interface is not None and getattr(self.memory_interface, 'db_path', None) is None:
+            return None
+        return (self._registry_key(), getattr(self.memory_interface, 'user_id', None))
+
+    def _build_pool(self, workers: int) -> ValidationPool:
+        db_path = getattr(self.memory_interface, 'db_path', None)
+        return ValidationPool(
+            workers, self.domain_config, config_path=self.config_path,
+            db_path=str(db_path) if db_path else None,
+            user_id=getattr(self.memory_interface, 'user_id', "default"),
+        )
+
+    def _check_rules(self, ruleset: CompiledRuleset, analysis: BlockAnalysis, rules: List[CompiledRule], code_hits: Dict[str, int], context_hits: Dict[str, int], regex_hits: Dict[str, List[Span]]) -> List[Dict[str, Any]]:
+        """
+        Generic rule checker engine. Checks are resolved from the scan hits and their spans.
+        `ruleset` is the snapshot the scan ran against, so a hot reload mid-validation is not mixed in.
+        """
         issues = []
-        clean_code = self._strip_comments(code)
         
-        for rule in rules:
-            # 1. Check Platform/Context constraints
-            if 'platform' in rule:
-                if rule['platform'].lower() not in context.lower():
-                    continue
+        for compiled in rules:
+            # 1-2. Platform/Context constraints, excluded context and triggers
+            if compiled.is_active(code_hits, context_hits):
+                issues.extend(self._check_rule(ruleset, analysis, compiled, code_hits, regex_hits))
+        return issues
 
-            # 1.5 Check Excluded Context
-            if 'exclude_context' in rule:
-                exclusions = rule['exclude_context']
-                if isinstance(exclusions, str):
-                    exclusions = [exclusions]
-                
-                # If any exclusion term is found in code or context, skip this rule
-                if any(ex in clean_code or ex.lower() in context.lower() for ex in exclusions):
+    def _check_rules_profiled(self, category: str, ruleset: CompiledRuleset, analysis: BlockAnalysis, rules: List[CompiledRule], code_hits: Dict[str, int], context_hits: Dict[str, int], regex_hits: Dict[str, List[Span]]) -> List[Dict[str, Any]]:
+        """`_check_rules` with each rule's check timed and counted by the profiler."""
+        issues = []
+        for compiled in rules:
+            start = time.perf_counter_ns()
+            triggered = compiled.is_active(code_hits, context_hits)
+            found = self._check_rule(ruleset, analysis, compiled, code_hits, regex_hits) if triggered else []
+            self.profiler.record_check(category, compiled.rule, time.perf_counter_ns() - start, triggered, len(found))
+            issues.extend(found)
+        return issues
+
+    def _check_rule(self, ruleset: CompiledRuleset, analysis: BlockAnalysis, compiled: CompiledRule, code_hits: Dict[str, int], regex_hits: Dict[str, List[Span]]) -> List[Dict[str, Any]]:
+        """Checks of one active rule."""
+        issues = []
+        code = analysis.code
+        rule = compiled.rule
+
+        # 2.5 AST Rules: every block parses at most once, the tree is shared by all AST rules
+        if compiled.ast_check is not None:
+            parsed = analysis.python
+            if parsed is not None:
+                return [self._create_issue(rule, compiled.ast_check.describe(node), analysis, span=parsed.span(node))
+                        for node in compiled.ast_check.find(parsed)]
+
+        # 2.6 Formula Rules: exponentials classified by evaluating them, not by their spelling
+        if compiled.formula_check is not None:
+            alternative_used = any(alt in code_hits for alt in compiled.required_alternatives)
+            violations = compiled.formula_check.violations(analysis.formulas, expect_met=alternative_used)
+            if violations is not None:
+                return [self._create_issue(rule, message, analysis, span=(term.start, term.end))
+                        for term, message in violations]
+
+        # 3. Validate Forbidden Patterns
+        for pattern in compiled.forbidden:
+            if pattern in code_hits:
+                # Check exceptions
+                if compiled.exception is not None and compiled.exception in code:
                     continue
+                    
+                start = code_hits[pattern]
+                issues.append(self._create_issue(rule, f"Forbidden pattern: {pattern}", analysis, pattern, span=(start, start + len(pattern))))
 
-            # 2. Check Triggers
-            # If triggers exist, at least one must be present in code OR context
-            triggered = True
-            trigger_words = []
-            if 'trigger' in rule:
-                trigger_words = rule['trigger']
-                if isinstance(trigger_words, str):
-                    trigger_words = [trigger_words]
-                
-                found_trigger = False
-                for t in trigger_words:
-                    if t in clean_code or t.lower() in context.lower():
-                        found_trigger = True
-                        break
-                if not found_trigger:
-                    triggered = False
-            
-            if not triggered:
-                continue
+        # 3.5 Validate Forbidden Regex (For Learned Rules)
+        for pattern in compiled.forbidden_regex:
+            spans = regex_hits.get(pattern)
+            if spans:
+                issue = self._create_issue(rule, f"Forbidden pattern (regex): {pattern}", analysis, pattern, is_regex=True, span=spans[0],
+                                           regex=ruleset.regex)
+                if 'replacement' in rule:
+                    # Every match, so the fix can rewrite them without searching again
+                    issue['match_spans'] = [list(span) for span in spans]
+                issues.append(issue)
 
-            # 3. Validate Forbidden Patterns
-            if 'forbidden' in rule:
-                forbidden = rule['forbidden']
-                if isinstance(forbidden, str):
-                    forbidden = [forbidden]
-                
-                for pattern in forbidden:
-                    if pattern in clean_code:
-                        # Check exceptions
-                        if 'exception' in rule and rule['exception'] in code:
-                            continue
-                            
-                        issues.append(self._create_issue(rule, f"Forbidden pattern: {pattern}", code, pattern))
-
-            # 3.5 Validate Forbidden Regex (For Learned Rules)
-            if 'forbidden_regex' in rule:
-                forbidden_re = rule['forbidden_regex']
-                if isinstance(forbidden_re, str):
-                    forbidden_re = [forbidden_re]
-                
-                for pattern in forbidden_re:
-                    if re.search(pattern, clean_code):
-                        issues.append(self._create_issue(rule, f"Forbidden pattern (regex): {pattern}", code, pattern, is_regex=True))
-
-            # 4. Validate Required Patterns
-            if 'required_pattern' in rule:
-                pattern = rule['required_pattern']
-                # Simple string check for now (could be upgraded to regex)
-                if pattern not in clean_code:
-                    issues.append(self._create_issue(rule, f"Missing required pattern: {pattern}", code))
-
-            # 4.5 Validate Required Regex
-            if 'required_regex' in rule:
-                pattern = rule['required_regex']
-                if not re.search(pattern, clean_code):
-                    issues.append(self._create_issue(rule, f"Missing required pattern (regex): {pattern}", code))
-
-            # 5. Implicit Trigger Violation
-            # If no explicit forbidden/required patterns, the trigger itself might be the issue
-            # (e.g. "delay(" in non-blocking rule)
-            if 'forbidden' not in rule and 'required_pattern' not in rule and 'trigger' in rule:
-                for t in trigger_words:
-                    if t in clean_code:
-                        if 'exception' in rule and rule['exception'] in code:
-                            continue
-                        issues.append(self._create_issue(rule, f"Issue detected: {t}", code, t))
+        # 4. Validate Required Patterns
+        if compiled.required_pattern is not None:
+            pattern = compiled.required_pattern
+            if pattern not in code_hits and not any(alt in code_hits for alt in compiled.required_alternatives):
+                issues.append(self._create_issue(rule, f"Missing required pattern: {pattern}", analysis))
+
+        # 4.5 Validate Required Regex
+        if compiled.required_regex is not None:
+            pattern = compiled.required_regex
+            if pattern in ruleset.regex.compiled and pattern not in regex_hits:
+                issues.append(self._create_issue(rule, f"Missing required pattern (regex): {pattern}", analysis))
+
+        # 5. Implicit Trigger Violation
+        # If no explicit forbidden/required patterns, the trigger itself might be the issue
+        # (e.g. "delay(" in non-blocking rule)
+        if compiled.implicit_trigger:
+            for t in compiled.triggers:
+                if t in code_hits:
+                    if compiled.exception is not None and compiled.exception in code:
+                        continue
+                    start = code_hits[t]
+                    issues.append(self._create_issue(rule, f"Issue detected: {t}", analysis, t, span=(start, start + len(t))))
 
         return issues
 
-    def _create_issue(self, rule: Dict[str, Any], default_msg: str, code: str, pattern: str = None, is_regex: bool = False) -> Dict[str, Any]:
+    def _create_issue(self, rule: Dict[str, Any], default_msg: str, analysis: BlockAnalysis, pattern: str = None, is_regex: bool = False, span: Optional[Span] = None,
+                      regex: Optional[RegexLayer] = None) -> Dict[str, Any]:
+        if span is not None:
+            # Comment stripping preserves offsets, so the span maps straight onto the original code
+            line = analysis.line_of(span[0])
+        else:
+            line = self._find_line(analysis.code, pattern, is_regex, regex) if pattern else -1
         issue = {
             "id": rule.get('id'),
             "severity": rule.get('severity', 'warning'),
             "message": rule.get('message', default_msg),
-            "line": self._find_line(code, pattern, is_regex) if pattern else -1,
+            "line": line,
             "trigger_pattern": pattern
         }
+        if span is not None:
+            issue['span'] = list(span)
+        if 'domain' in rule:
+            issue['domain'] = rule['domain']
         if 'auto_fix' in rule:
             issue['auto_fix'] = rule['auto_fix']
         if 'replacement' in rule:
             issue['replacement'] = rule['replacement']
         return issue
 
-    def _find_line(self, code: str, substring: str, is_regex: bool = False) -> int:
+    def _find_line(self, code: str, substring: str, is_regex: bool = False, regex: Optional[RegexLayer] = None) -> int:
+        """Fallback line lookup for issues that carry no match span (`regex`: the validation's layer)."""
+        compiled = (regex or self.ruleset.regex).get(substring) if is_regex else None
         for i, line in enumerate(code.splitlines(), 1):
             if is_regex:
-                if re.search(substring, line):
+                if compiled and compiled.search(line):
                     return i
             elif substring in line:
                 return i
         return -1
 
-    def _strip_comments(self, code: str) -> str:
-        """Remove comments to prevent false positives in validation."""
-        # Remove C-style block comments /* ... */
-        code = re.sub(r'/\*[\s\S]*?\*/', '', code)
-        # Remove // comments and # comments
-        code = re.sub(r'//.*', '', code)
-        code = re.sub(r'#.*', '', code)
-        return code
+    def _strip_comments(self, code: str, language: Optional[str] = None) -> str:
+        """
+        Blank out comments to prevent false positives in validation.
+        Comments are replaced by spaces (newlines kept) so offsets and line numbers
+        in the stripped code match the original code. Strings are left intact.
+        """
+        return BlockAnalysis(code, language).clean_code
 
     def auto_fix(self, code: str, issues: List[Dict[str, Any]]) -> str:
         """Apply all auto-fixes and return corrected code"""
-        fixed_code = code
-        for issue in issues:
-            if 'auto_fix' in issue:
-                fixed_code = self._apply_fix(fixed_code, issue['auto_fix'], issue)
-        return fixed_code
-
-    def _apply_fix(self, code: str, fix_type: str, issue: Dict[str, Any]) -> str:
-        """Dispatcher for specific fix logic."""
+        # One rule set for the whole fix, even if a reload lands meanwhile
+        plan_fix = partial(self._plan_fix, ruleset=self.ruleset)
+        if self.profiler.enabled:
+            categories = {str(rule.get('id')): category for category, rules in self.validation_rules.items() for rule in rules}
+            plan_fix = self.profiler.timed_fix(categories, plan_fix)
+        return FixPlanner(plan_fix).apply(code, issues)
+
+    def profile_report(self) -> Dict[str, Any]:
+        """Per-rule profiler stats for the current rule set, plus result cache stats."""
+        report = self.profiler.report(self.validation_rules)
+        report["cache"] = self.result_cache.stats()
+        return report
+
+    def _plan_fix(self, code: str, issue: Dict[str, Any], ruleset: Optional[CompiledRuleset] = None) -> List[Edit]:
+        """Edits for one issue's fix, computed against `code`."""
+        return self._apply_fix(code, issue['auto_fix'], issue, ruleset or self.ruleset)
+
+    def _apply_fix(self, code: str, fix_type: str, issue: Dict[str, Any], ruleset: Optional[CompiledRuleset] = None) -> List[Edit]:
+        """Dispatcher for specific fix logic. Every fixer returns (start, end, replacement) edits."""
         if fix_type == "inject_safety_timeout":
             return self._fix_inject_safety_timeout(code)
         elif fix_type == "esp32_pwm_fix":
@@ -261,112 +528,167 @@ class PDEIValidator:
         elif fix_type == "fix_pid_dt":
             return self._fix_pid_dt(code, issue)
         elif fix_type == "generic_regex_replace":
-            return self._fix_generic_regex(code, issue)
-        return code
+            return self._fix_generic_regex(code, issue, ruleset or self.ruleset)
+        return []
 
-    def _fix_inject_safety_timeout(self, code: str) -> str:
+    def _fix_inject_safety_timeout(self, code: str) -> List[Edit]:
         """Inject a safety timeout check into the loop."""
-        if "SAFETY_TIMEOUT" in code: return code
+        if "SAFETY_TIMEOUT" in code: return []
         
         # 1. Inject globals
-        if "void setup" in code:
-            code = code.replace("void setup", "unsigned long lastCommand = 0;\nconst long SAFETY_TIMEOUT = 500;\n\nvoid setup")
+        edits = [(pos, pos, "unsigned long lastCommand = 0;\nconst long SAFETY_TIMEOUT = 500;\n\n")
+                 for pos in _find_all(code, "void setup")]
             
         # 2. Inject check in loop
-        if "void loop() {" in code:
-            injection = "\n  if (millis() - lastCommand > SAFETY_TIMEOUT) {\n    // Failsafe triggered\n  }\n"
-            code = code.replace("void loop() {", "void loop() {" + injection)
-            
-        return code
+        injection = "\n  if (millis() - lastCommand > SAFETY_TIMEOUT) {\n    // Failsafe triggered\n  }\n"
+        edits += [(end, end, injection) for end in (pos + len("void loop() {") for pos in _find_all(code, "void loop() {"))]
+        return edits
 
-    def _fix_esp32_pwm(self, code: str) -> str:
+    def _fix_esp32_pwm(self, code: str) -> List[Edit]:
         """Replace analogWrite with ledcWrite for ESP32."""
-        return code.replace("analogWrite", "ledcWrite")
+        return [(pos, pos + len("analogWrite"), "ledcWrite") for pos in _find_all(code, "analogWrite")]
 
-    def _fix_esp32_adc(self, code: str) -> str:
+    def _fix_esp32_adc(self, code: str) -> List[Edit]:
         """Update ADC resolution from 10-bit to 12-bit."""
-        return code.replace("1023", "4095").replace("1024", "4096")
+        return [(m.start(), m.end(), _ADC_12BIT[m.group(0)]) for m in _ADC_10BIT.finditer(code)]
 
-    def _fix_pharma_audit_header(self, code: str) -> str:
+    def _fix_pharma_audit_header(self, code: str) -> List[Edit]:
         """Inject @audit_log decorator for Pharma compliance."""
-        lines = code.splitlines()
-        fixed_lines = []
-        for line in lines:
+        parsed = parse_python(code)
+        if parsed is not None:
+            edits = []
+            for node in parsed.nodes(*DEFINITION_NODES):
+                if "audit_log" in decorator_names(node):
+                    continue
+                # Above any existing decorators, at the definition's indentation
+                lineno = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+                start = parsed.offset(lineno, 0)
+                indent = _INDENT.match(code, start).group(0)
+                edits.append((start, start, f"{indent}@audit_log\n"))
+            return edits
+
+        # Not valid Python (e.g. a fragment): fall back to scanning lines
+        edits = []
+        previous = None
+        for start, line in _iter_lines(code):
             stripped = line.strip()
             if stripped.startswith("def ") or stripped.startswith("class "):
                 # Check if @audit_log is already present in the previous line
-                if not (fixed_lines and "@audit_log" in fixed_lines[-1]):
+                if not (previous is not None and "@audit_log" in previous):
                     # Match indentation
                     indent = line[:len(line) - len(stripped)]
-                    fixed_lines.append(f"{indent}@audit_log")
-            fixed_lines.append(line)
-        return "\n".join(fixed_lines)
+                    edits.append((start, start, f"{indent}@audit_log\n"))
+            previous = line
+        return edits
 
-    def _fix_ada_compliance(self, code: str) -> str:
+    def _fix_ada_compliance(self, code: str) -> List[Edit]:
         """Ensure width assignments meet ADA minimums (36 inches)."""
         keywords = ["door", "ramp", "corridor", "hallway", "width"]
         
-        def replace_width(match):
+        edits = []
+        # Match any assignment: var = number
+        for match in _ASSIGNMENT.finditer(code):
             var_name = match.group(1)
             if not any(k in var_name.lower() for k in keywords):
-                return match.group(0)
+                continue
                 
             val = int(match.group(2))
             if val < 36:
-                return f"{var_name} = 36; // Auto-fixed for ADA (was {val})"
-            return match.group(0)
-        
-        # Match any assignment: var = number
-        return re.sub(r'([a-zA-Z0-9_]+)\s*=\s*(\d+)', replace_width, code)
+                edits.append((match.start(), match.end(), f"{var_name} = 36; // Auto-fixed for ADA (was {val})"))
+        return edits
 
-    def _fix_decay_formula(self, code: str, issue: Dict[str, Any]) -> str:
+    def _fix_decay_formula(self, code: str, issue: Dict[str, Any]) -> List[Edit]:
         """Convert incorrect decay formulas to exp(-t/tau) form."""
-        # Fix: (1 - exp(t/tau)) -> exp(-t/tau)
-        # Regex captures content inside exp(...) as group 1
-        code = re.sub(r'1\s*-\s*exp\(([^)]+)\)', r'exp(-\1)', code)
-        
-        # Fix: exp(t/tau) -> exp(-t/tau)
-        # Regex looks for exp(t/...) and captures the denominator (tau) as group 1
-        code = re.sub(r'exp\(\s*t\s*/\s*([^)]+)\)', r'exp(-t/\1)', code)
-        return code
+        # Fix: (1 - exp(t/tau)) -> exp(-t/tau)   (complement dropped, exponent made decaying)
+        # Fix: exp(t/tau) -> exp(-t/tau)         (sign of the exponent flipped)
+        edits = []
+        for term in find_exp_terms(code):
+            if term.kind in ('growth', 'divergent'):
+                edits.append((term.start, term.end, f"{term.fn}({decay_argument(code, term)})"))
+        return edits
 
-    def _fix_growth_formula(self, code: str, issue: Dict[str, Any]) -> str:
+    def _fix_growth_formula(self, code: str, issue: Dict[str, Any]) -> List[Edit]:
         """Convert incorrect growth formulas to (1 - exp(-t/tau)) form."""
-        lines = code.splitlines()
-        fixed = []
-        for line in lines:
-            # If line has exp(-t/tau) but no (1 - ...), wrap it
-            if 'exp(-' in line and '(1 -' not in line:
-                # Check context
-                if any(word in line.lower() for word in ['charge', 'heat', 'rise', 'grow']):
-                    line = re.sub(r'=\s*([^;]*?exp\([^)]+\))', r'= (1 - \1)', line)
-            fixed.append(line)
-        return '\n'.join(fixed)
-
-    def _fix_step_response(self, code: str, issue: Dict[str, Any]) -> str:
+        edits = []
+        for term in find_exp_terms(code):
+            if term.kind in ('growth', 'unknown'):
+                continue
+            # Check context: only terms on a charge/heat/rise/grow line
+            line_end = code.find('\n', term.start)
+            line = code[code.rfind('\n', 0, term.start) + 1:line_end if line_end >= 0 else len(code)]
+            if not any(word in line.lower() for word in ['charge', 'heat', 'rise', 'grow']):
+                continue
+            decaying = f"{term.fn}({decay_argument(code, term)})"
+            # 1 - exp(t/tau) only has the wrong sign; a plain exp(...) gets the complement
+            edits.append((term.start, term.end, f"1 - {decaying}" if term.complement else f"(1 - {decaying})"))
+        return edits
+
+    def _fix_step_response(self, code: str, issue: Dict[str, Any]) -> List[Edit]:
         """Fix sign in step response: (1 - exp(t/tau)) -> (1 - exp(-t/tau))"""
-        # Regex matches (1 - exp(t/tau)) and captures tau
-        return re.sub(r'\(1\s*-\s*exp\(\s*t\s*/\s*([^)]+)\)\)', r'(1 - exp(-t/\1))', code)
+        return [(term.arg_start, term.arg_end, negate_expression(code[term.arg_start:term.arg_end]))
+                for term in find_exp_terms(code) if term.complement and term.kind == 'divergent']
 
-    def _fix_pid_dt(self, code: str, issue: Dict[str, Any]) -> str:
+    def _fix_pid_dt(self, code: str, issue: Dict[str, Any]) -> List[Edit]:
         """Inject * dt into PID integral terms."""
-        lines = code.splitlines()
-        fixed = []
+        edits = []
         triggers = ["integral +=", "error_sum +="]
-        for line in lines:
+        for start, line in _iter_lines(code):
             if any(t in line for t in triggers) and "dt" not in line:
                 # Append * dt before the semicolon if present
                 if ";" in line:
-                    line = line.replace(";", " * dt;")
+                    edits.extend((start + pos, start + pos, " * dt") for pos in _find_all(line, ";"))
                 else:
-                    line = line + " * dt"
-            fixed.append(line)
-        return "\n".join(fixed)
+                    edits.append((start + len(line), start + len(line), " * dt"))
+        return edits
 
-    def _fix_generic_regex(self, code: str, issue: Dict[str, Any]) -> str:
+    def _fix_generic_regex(self, code: str, issue: Dict[str, Any], ruleset: CompiledRuleset) -> List[Edit]:
         """Apply a generic regex replacement from a learned rule."""
         pattern = issue.get('trigger_pattern')
         replacement = issue.get('replacement')
-        if pattern and replacement:
-            return re.sub(pattern, replacement, code)
-        return code
\ No newline at end of file
+        if not (pattern and replacement):
+            return []
+        regex = ruleset.regex
+        if regex.is_sandboxed(pattern):
+            # Learned patterns only ever run inside the guard
+            return regex.edits(pattern, replacement, code)
+        compiled = regex.get(pattern)
+        if compiled is None:
+            return []
+
+        # Rewrite the spans recorded during validation; each is only confirmed in place
+        spans = issue.get('match_spans')
+        if spans:
+            matches = [compiled.match(code, start) for start, _ in spans]
+            if all(m is not None and list(m.span()) == list(span) for m, span in zip(matches, spans)):
+                return [(m.start(), m.end(), m.expand(replacement)) for m in matches]
+
+        # Code changed since validation (earlier fixes): fall back to a full search
+        return regex.edits(pattern, replacement, code)
+
+
+def _quarantine_pattern(memory_interface: Any, pattern: str, reason: str = "Exceeded regex time budget"):
+    """Persist a quarantine for an unsafe learned pattern so it is not loaded again."""
+    if memory_interface is None:
+        return
+    try:
+        memory_interface.quarantine_rule(pattern, reason)
+    except Exception as e:
+        logging.warning(f"Failed to quarantine learned rule {pattern!r}: {e}")
+
+
+def _find_all(text: str, literal: str) -> List[int]:
+    """Start offsets of the non-overlapping occurrences `str.replace` would rewrite."""
+    positions = []
+    pos = text.find(literal)
+    while pos != -1:
+        positions.append(pos)
+        pos = text.find(literal, pos + len(literal))
+    return positions
+
+
+def _iter_lines(code: str):
+    """Yield (offset, line) for every line, without its line terminator."""
+    offset = 0
+    for raw in code.splitlines(keepends=True):
+        yield offset, raw.splitlines()[0]
+        offset += len(raw)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\lut.py
+P.DE.I Framework - Forge Theory Lookup Tables
+=============================================
+
+Modular builds target ESP32-C3 boards, where `exp(-t/tau)` in a control loop means a soft-float
+`exp()` call every iteration. This module precomputes the Forge Theory curves of
+`domain_configs/forge_theory.json` (`formula_templates`) as fixed-point `const` arrays, plus a
+small interpolation helper, so generated firmware can read a table instead.
+
+    decay:          FULL * exp(-t/tau)
+    growth:         FULL * (1 - exp(-t/tau))
+    step_response:  FULL * (1 - exp(-t/tau))   (offset/target applied by the caller)
+
+Key Components:
+1. generate_lut: Samples one curve for a tau, sample rate and bit width (NumPy when installed).
+2. render_lut_header: C/C++ source with the tables and `forge_lut_lookup()`.
+3. lut_header_for_tuning / lut_header_for_tau: The header for a tuning preset ('aggressive',
+   'balanced', 'graceful') or for any time constant (e.g. one found by `tuning.py`).
+
+Where it fits:
+    `BuddAI.execute_modular_build` appends the header to the integration step and asks the model to
+    use it. The decay/growth/step rules in `forge_theory.json` accept the table names
+    (`required_alternatives`) in place of `exp(`.
+"""
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FORGE_THEORY_PATH = Path(__file__).parent.parent / "domain_configs" / "forge_theory.json"
+
+LUT_KINDS = ("decay", "growth", "step_response")
+# Used when forge_theory.json has no "lut" section
+DEFAULT_LUT_SETTINGS = {"sample_rate_hz": 200, "bits": 12, "span_tau": 5}
+# Keeps a table within a few KB of flash
+MAX_LUT_LENGTH = 2048
+
+TABLE_NAMES = {kind: f"FORGE_{kind.upper()}_LUT" for kind in LUT_KINDS}
+
+
+def load_forge_templates(path: Path = FORGE_THEORY_PATH) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def generate_lut(kind: str, tau: float, sample_rate_hz: float, bits: int, span_tau: float = 5) -> List[int]:
+    """
+    Fixed-point samples of one curve, 0 .. span_tau * tau seconds inclusive, scaled to 2**bits - 1.
+
+    Decay starts at full scale and ends near 0; growth and step response are its complement.
+    """
+    if kind not in LUT_KINDS:
+        raise ValueError(f"Unknown LUT kind '{kind}' (expected one of {', '.join(LUT_KINDS)})")
+    if tau <= 0 or sample_rate_hz <= 0 or span_tau <= 0:
+        raise ValueError("tau, sample rate and span must be positive")
+    if not 1 <= bits <= 32:
+        raise ValueError("bits must be between 1 and 32")
+    length = math.ceil(span_tau * tau * sample_rate_hz) + 1
+    if length > MAX_LUT_LENGTH:
+        raise ValueError(f"LUT would have {length} entries (max {MAX_LUT_LENGTH}); lower the sample rate")
+
+    full = (1 << bits) - 1
+    rate = 1.0 / (tau * sample_rate_hz)
+    if np is not None:
+        curve = np.exp(-np.arange(length) * rate)
+        if kind != "decay":
+            curve = 1.0 - curve
+        return np.rint(curve * full).astype(np.int64).tolist()
+    values = []
+    for n in range(length):
+        sample = math.exp(-n * rate)
+        if kind != "decay":
+            sample = 1.0 - sample
+        values.append(int(round(sample * full)))
+    return values
+
+
+def c_type(bits: int) -> str:
+    return "uint8_t" if bits <= 8 else "uint16_t" if bits <= 16 else "uint32_t"
+
+
+def _format_array(name: str, values: Sequence[int], ctype: str, per_line: int = 12) -> str:
+    rows = [", ".join(str(v) for v in values[i:i + per_line]) for i in range(0, len(values), per_line)]
+    body = ",\n    ".join(rows)
+    return f"const {ctype} {name}[{len(values)}] = {{\n    {body}\n}};"
+
+
+def render_lut_header(tau: float, sample_rate_hz: float, bits: int, span_tau: float = 5,
+                      kinds: Optional[Sequence[str]] = None) -> str:
+    """C/C++ source defining the tables for `kinds` (default: all) and `forge_lut_lookup()`."""
+    kinds = list(kinds or LUT_KINDS)
+    ctype = c_type(bits)
+    period_us = round(1e6 / sample_rate_hz)
+    lines = [
+        "// Forge Theory lookup tables (generated: do not edit by hand)",
+        f"// Time constant {tau:g} s, {sample_rate_hz:g} Hz sampling, {bits}-bit full scale, {span_tau:g} time constants",
+        "#include <stdint.h>",
+        "",
+        f"#define FORGE_LUT_PERIOD_US {period_us}UL",
+        f"#define FORGE_LUT_FULL_SCALE {(1 << bits) - 1}UL",
+        "",
+    ]
+    for kind in kinds:
+        values = generate_lut(kind, tau, sample_rate_hz, bits, span_tau)
+        lines.append(_format_array(TABLE_NAMES[kind], values, ctype))
+        lines.append(f"#define {TABLE_NAMES[kind]}_LEN {len(values)}")
+        lines.append("")
+    lines += [
+        "// Linear interpolation between samples; times past the end of the table hold the last sample",
+        f"static inline {ctype} forge_lut_lookup(const {ctype} *lut, uint32_t len, uint32_t elapsed_us) {{",
+        "    uint32_t index = elapsed_us / FORGE_LUT_PERIOD_US;",
+        "    if (index >= len - 1) return lut[len - 1];",
+        "    int64_t a = lut[index];",
+        "    int64_t b = lut[index + 1];",
+        "    int64_t frac = elapsed_us % FORGE_LUT_PERIOD_US;",
+        f"    return ({ctype})(a + (b - a) * frac / (int64_t)FORGE_LUT_PERIOD_US);",
+        "}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def lut_header_for_tuning(tuning: str = "balanced", template: Optional[Dict[str, Any]] = None) -> str:
+    """Header for a tuning preset of forge_theory.json, with its "lut" settings."""
+    template = template if template is not None else load_forge_templates()
+    tau = template.get("formula_templates", {}).get("decay", {}).get("constants", {}).get(tuning, {}).get("tau")
+    if tau is None:
+        raise ValueError(f"Unknown tuning '{tuning}'")
+    return lut_header_for_tau(float(tau), template)
+
+
+def lut_header_for_tau(tau: float, template: Optional[Dict[str, Any]] = None) -> str:
+    """Header for any time constant, with the "lut" settings and templates of forge_theory.json."""
+    template = template if template is not None else load_forge_templates()
+    formulas = template.get("formula_templates", {})
+    settings = dict(DEFAULT_LUT_SETTINGS, **template.get("lut", {}))
+    kinds = [kind for kind in LUT_KINDS if kind in formulas]
+    return render_lut_header(tau, settings["sample_rate_hz"], settings["bits"], settings["span_tau"], kinds)
@@ -8,47 +8,646 @@ This module defines the `PDEIMemory` class and its sub-components (`PDEIShadowEn
 `PDEIAdaptiveLearner`, `PDEISmartLearner`). It acts as the central storage unit for the Exocortex.
 
 Key Responsibilities:
-1. Persistence: Manages SQLite connections for storing sessions, messages, and rules.
+1. Persistence: Manages SQLite connections for storing sessions, messages, and rules. Every module
+   (executive, server) goes through the per-file pools of `get_pool`, with tuned pragmas. Chat
+   messages are written behind (`MessageWriteBehind`) unless durability is "sync".
+   The schema is versioned (`PRAGMA user_version`) and upgraded by `SCHEMA_MIGRATIONS`.
+   Indexed repositories store each file once (`repo_blobs`, keyed by SHA-256) and are searched
+   through an FTS5 index (`search_repo_index`).
+   Large text columns can be stored compressed (`pack_text`) and are read back with `unpack()`.
+   The `repo_functions` view calls the SQL function `unpack()`, which only exists on pooled
+   connections (`get_pool`, `PDEIMemory.connection`); a plain `sqlite3.connect` or the sqlite3
+   shell fails with "no such function" on that view but can read and write every table. The
+   `repo_index` triggers use only built-in SQL: they queue changed rows in `repo_fts_pending`,
+   and `sync_repo_search` tokenizes them in Python (on the next index run or search).
 2. Shadow Engine: Proactively suggests modules or settings based on context (Shadow Mode).
 3. Adaptive Learning: Analyzes session history to identify implicit user preferences.
 4. Smart Learning: Extracts explicit rules from user corrections (e.g., "Don't do X, do Y").
+5. Quarantine: Learned rules that are unsafe to execute are kept out of the active rule set.
 
 Where it fits:
     This module is initialized by `buddai_executive.py`. It provides the database backend 
     and the learning logic that allows the AI to improve over time.
 """
+import atexit
+import hashlib
 import sqlite3
 import queue
 import re
 import difflib
 import json
 import logging
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple, Any, Union
+from typing import List, Dict, Optional, Tuple, Any, Union, Callable, ContextManager, Iterator
+
+from pdei_core.safe_regex import check_pattern
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+# Learned-rule version per database file, shared by every PDEIMemory in this process
+_RULES_VERSIONS: Dict[str, int] = {}
+# Last rules_meta.version seen per database (see PDEIMemory.refresh_rules_version)
+_STORED_RULES_VERSIONS: Dict[str, int] = {}
+
+# Writes that change the learned rule set; times_applied updates deliberately do not count
+RULE_CHANGE_TRIGGERS = [
+    ("code_rules_inserted", "AFTER INSERT ON code_rules"),
+    ("code_rules_updated", "AFTER UPDATE OF rule_text, pattern_find, pattern_replace, confidence ON code_rules"),
+    ("code_rules_deleted", "AFTER DELETE ON code_rules"),
+    ("rule_quarantine_inserted", "AFTER INSERT ON rule_quarantine"),
+    ("rule_quarantine_deleted", "AFTER DELETE ON rule_quarantine"),
+]
+
+# Core tables (migration 1)
+_CORE_TABLES = (
+    """CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        user_id TEXT,
+        started_at TIMESTAMP,
+        ended_at TIMESTAMP,
+        title TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT,
+        role TEXT,
+        content TEXT,
+        timestamp TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS repo_index (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT,
+        file_path TEXT,
+        repo_name TEXT,
+        function_name TEXT,
+        content TEXT,
+        last_modified TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS style_preferences (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT,
+        category TEXT,
+        preference TEXT,
+        confidence FLOAT,
+        extracted_at TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS feedback (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        message_id INTEGER,
+        positive BOOLEAN,
+        comment TEXT,
+        timestamp TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS corrections (
+        id INTEGER PRIMARY KEY,
+        timestamp TEXT,
+        original_code TEXT,
+        corrected_code TEXT,
+        reason TEXT,
+        context TEXT,
+        processed BOOLEAN DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS code_rules (
+        id INTEGER PRIMARY KEY,
+        rule_text TEXT,
+        pattern_find TEXT,
+        pattern_replace TEXT,
+        context TEXT,
+        confidence FLOAT,
+        learned_from TEXT,
+        times_applied INTEGER DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS rule_quarantine (
+        id INTEGER PRIMARY KEY,
+        pattern_find TEXT UNIQUE,
+        rule_text TEXT,
+        reason TEXT,
+        timestamp TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS rules_meta (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL DEFAULT 0
+    )""",
+)
+
+
+def sync_repo_search(conn: sqlite3.Connection, batch_size: int = 500) -> int:
+    """
+    Index the repo_index rows queued in repo_fts_pending into repo_fts; returns how many. Needs a
+    pooled connection (reads through repo_functions, which decompresses blobs with `unpack()`).
+    """
+    synced = 0
+    while True:
+        ids = [row[0] for row in conn.execute("SELECT id FROM repo_fts_pending ORDER BY id LIMIT ?", (batch_size,))]
+        if not ids:
+            return synced
+        marks = ", ".join("?" * len(ids))
+        rows = conn.execute(
+            f"SELECT id, function_name, repo_name, content FROM repo_functions WHERE id IN ({marks})", ids
+        ).fetchall()
+        # Re-queued rows (a second update before a sync) replace their old entry
+        conn.execute(f"DELETE FROM repo_fts WHERE rowid IN ({marks})", ids)
+        conn.executemany(
+            "INSERT INTO repo_fts (rowid, function_name, repo_name, content, name_terms, content_terms) VALUES (?, ?, ?, ?, ?, ?)",
+            [(row_id, name, repo, content, code_terms(f"{name} {repo}"), code_terms(content))
+             for row_id, name, repo, content in rows]
+        )
+        conn.execute(f"DELETE FROM repo_fts_pending WHERE id IN ({marks})", ids)
+        synced += len(ids)
+
+
+def content_hash(content: str) -> str:
+    """Key of a file in repo_blobs (SHA-256 of its UTF-8 text)."""
+    return hashlib.sha256(content.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+
+def _move_repo_content_to_blobs(conn: sqlite3.Connection, batch_size: int = 500):
+    """Migration 4: store each distinct repo_index file once in repo_blobs and report the space saved."""
+    stored, rows = conn.execute(
+        "SELECT COALESCE(SUM(length(CAST(content AS BLOB))), 0), COUNT(*) FROM repo_index WHERE content IS NOT NULL"
+    ).fetchone()
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            "SELECT id, content FROM repo_index WHERE id > ? AND content IS NOT NULL ORDER BY id LIMIT ?",
+            (last_id, batch_size)
+        ).fetchall()
+        if not batch:
+            break
+        # Legacy rows hold the whole file, so their span is the whole blob
+        hashed = [(row_id, content, content_hash(content)) for row_id, content in batch]
+        conn.executemany("INSERT OR IGNORE INTO repo_blobs (hash, content) VALUES (?, ?)",
+                         [(digest, content) for _, content, digest in hashed])
+        conn.executemany("UPDATE repo_index SET blob_hash = ?, start_offset = 0, end_offset = ?, content = NULL WHERE id = ?",
+                         [(digest, len(content), row_id) for row_id, content, digest in hashed])
+        last_id = batch[-1][0]
+    if rows:
+        blobs, blob_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length(CAST(content AS BLOB))), 0) FROM repo_blobs"
+        ).fetchone()
+        logging.info(f"repo_index: {rows} rows now share {blobs} stored files; {(stored - blob_bytes) / 1048576:.1f} MB "
+                     f"of duplicate content reclaimed (reused by SQLite; VACUUM shrinks the file)")
+
+
+# Schema migrations: (user_version, steps), applied in order by PDEIMemory.ensure_db_init inside one
+# transaction; PRAGMA user_version records the last one applied. A step is SQL or a callable taking
+# the connection. Append new steps, never edit released ones (their statements must stay idempotent
+# for databases created before versioning).
+SCHEMA_MIGRATIONS: List[Tuple[int, Tuple[Union[str, Callable[[sqlite3.Connection], None]], ...]]] = [
+    (1, _CORE_TABLES + (
+        # Any write to the learned rules (from any process) bumps rules_meta.version
+        "INSERT OR IGNORE INTO rules_meta (id, version) VALUES (1, 0)",
+    ) + tuple(
+        f"""CREATE TRIGGER IF NOT EXISTS {name} {event}
+            BEGIN UPDATE rules_meta SET version = version + 1 WHERE id = 1; END"""
+        for name, event in RULE_CHANGE_TRIGGERS
+    )),
+    # Hot-path indexes: session history, session list, unprocessed corrections, repo lookups, rule ranking
+    (2, (
+        "CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_user_started ON sessions (user_id, started_at, session_id, title)",
+        "CREATE INDEX IF NOT EXISTS idx_corrections_unprocessed ON corrections (id) WHERE processed IS NOT 1",
+        "CREATE INDEX IF NOT EXISTS idx_repo_index_user_repo ON repo_index (user_id, repo_name)",
+        "CREATE INDEX IF NOT EXISTS idx_code_rules_confidence ON code_rules (confidence, rule_text)",
+    )),
+    # Ranked full-text search over repo_index (see search_repo_index). The FTS table reads its text
+    # from repo_search_source, which adds the camelCase parts of names and code (code_terms);
+    # the unicode61 tokenizer already splits snake_case and paths.
+    (3, (
+        """CREATE VIEW IF NOT EXISTS repo_search_source AS
+            SELECT id, function_name, repo_name, content,
+                   code_terms(function_name || ' ' || repo_name) AS name_terms,
+                   code_terms(content) AS content_terms
+            FROM repo_index""",
+        """CREATE VIRTUAL TABLE IF NOT EXISTS repo_fts USING fts5(
+            function_name, repo_name, content, name_terms, content_terms,
+            content='repo_search_source', content_rowid='id', tokenize='unicode61'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS repo_index_fts_inserted AFTER INSERT ON repo_index BEGIN
+            INSERT INTO repo_fts (rowid, function_name, repo_name, content, name_terms, content_terms)
+            VALUES (new.id, new.function_name, new.repo_name, new.content,
+                    code_terms(new.function_name || ' ' || new.repo_name), code_terms(new.content));
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS repo_index_fts_deleted AFTER DELETE ON repo_index BEGIN
+            INSERT INTO repo_fts (repo_fts, rowid, function_name, repo_name, content, name_terms, content_terms)
+            VALUES ('delete', old.id, old.function_name, old.repo_name, old.content,
+                    code_terms(old.function_name || ' ' || old.repo_name), code_terms(old.content));
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS repo_index_fts_updated AFTER UPDATE ON repo_index BEGIN
+            INSERT INTO repo_fts (repo_fts, rowid, function_name, repo_name, content, name_terms, content_terms)
+            VALUES ('delete', old.id, old.function_name, old.repo_name, old.content,
+                    code_terms(old.function_name || ' ' || old.repo_name), code_terms(old.content));
+            INSERT INTO repo_fts (rowid, function_name, repo_name, content, name_terms, content_terms)
+            VALUES (new.id, new.function_name, new.repo_name, new.content,
+                    code_terms(new.function_name || ' ' || new.repo_name), code_terms(new.content));
+        END""",
+        "INSERT INTO repo_fts (repo_fts) VALUES ('rebuild')",
+    )),
+    # Content-addressed storage: each file is stored once in repo_blobs and a repo_index row points at
+    # its function's span. repo_functions is the read view ("content" = the function's code); the
+    # full-text triggers read from it, and unreferenced blobs are dropped with their last row.
+    (4, (
+        "DROP TRIGGER IF EXISTS repo_index_fts_inserted",
+        "DROP TRIGGER IF EXISTS repo_index_fts_deleted",
+        "DROP TRIGGER IF EXISTS repo_index_fts_updated",
+        "DROP VIEW IF EXISTS repo_search_source",
+        """CREATE TABLE IF NOT EXISTS repo_blobs (
+            hash TEXT PRIMARY KEY,
+            content TEXT NOT NULL
+        )""",
+        "ALTER TABLE repo_index ADD COLUMN blob_hash TEXT",
+        "ALTER TABLE repo_index ADD COLUMN start_offset INTEGER",
+        "ALTER TABLE repo_index ADD COLUMN end_offset INTEGER",
+        _move_repo_content_to_blobs,
+        "CREATE INDEX IF NOT EXISTS idx_repo_index_blob ON repo_index (blob_hash)",
+        """CREATE VIEW IF NOT EXISTS repo_functions AS
+            SELECT r.id, r.user_id, r.file_path, r.repo_name, r.function_name, r.last_modified,
+                   COALESCE(r.content, substr(b.content, r.start_offset + 1, r.end_offset - r.start_offset)) AS content
+            FROM repo_index r LEFT JOIN repo_blobs b ON b.hash = r.blob_hash""",
+        """CREATE VIEW IF NOT EXISTS repo_search_source AS
+            SELECT id, function_name, repo_name, content,
+                   code_terms(function_name || ' ' || repo_name) AS name_terms,
+                   code_terms(content) AS content_terms
+            FROM repo_functions""",
+        """CREATE TRIGGER IF NOT EXISTS repo_index_fts_inserted AFTER INSERT ON repo_index BEGIN
+            INSERT INTO repo_fts (rowid, function_name, repo_name, content, name_terms, content_terms)
+            SELECT * FROM repo_search_source WHERE id = new.id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS repo_index_fts_deleted BEFORE DELETE ON repo_index BEGIN
+            INSERT INTO repo_fts (repo_fts, rowid, function_name, repo_name, content, name_terms, content_terms)
+            SELECT 'delete', * FROM repo_search_source WHERE id = old.id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS repo_index_fts_before_update BEFORE UPDATE ON repo_index BEGIN
+            INSERT INTO repo_fts (repo_fts, rowid, function_name, repo_name, content, name_terms, content_terms)
+            SELECT 'delete', * FROM repo_search_source WHERE id = old.id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS repo_index_fts_updated AFTER UPDATE ON repo_index BEGIN
+            INSERT INTO repo_fts (rowid, function_name, repo_name, content, name_terms, content_terms)
+            SELECT * FROM repo_search_source WHERE id = new.id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS repo_blobs_released AFTER DELETE ON repo_index BEGIN
+            DELETE FROM repo_blobs WHERE hash = old.blob_hash
+                AND NOT EXISTS (SELECT 1 FROM repo_index WHERE blob_hash = old.blob_hash);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS repo_blobs_replaced AFTER UPDATE OF blob_hash ON repo_index BEGIN
+            DELETE FROM repo_blobs WHERE hash = old.blob_hash
+                AND NOT EXISTS (SELECT 1 FROM repo_index WHERE blob_hash = old.blob_hash);
+        END""",
+        "INSERT INTO repo_fts (repo_fts) VALUES ('rebuild')",
+    )),
+    # Blobs may be compressed (see pack_text); unpack() is a no-op on plain text
+    (5, (
+        "DROP VIEW IF EXISTS repo_functions",
+        """CREATE VIEW repo_functions AS
+            SELECT r.id, r.user_id, r.file_path, r.repo_name, r.function_name, r.last_modified,
+                   COALESCE(r.content, substr(unpack(b.content), r.start_offset + 1, r.end_offset - r.start_offset)) AS content
+            FROM repo_index r LEFT JOIN repo_blobs b ON b.hash = r.blob_hash""",
+    )),
+    # Full-text sync without SQL functions, so plain connections can write repo_index: repo_fts keeps
+    # its own copy of the text, the triggers drop stale entries and queue rows in repo_fts_pending,
+    # and sync_repo_search adds the camelCase terms in Python
+    (6, (
+        "DROP TRIGGER IF EXISTS repo_index_fts_inserted",
+        "DROP TRIGGER IF EXISTS repo_index_fts_deleted",
+        "DROP TRIGGER IF EXISTS repo_index_fts_before_update",
+        "DROP TRIGGER IF EXISTS repo_index_fts_updated",
+        "DROP VIEW IF EXISTS repo_search_source",
+        "DROP TABLE IF EXISTS repo_fts",
+        """CREATE VIRTUAL TABLE repo_fts USING fts5(
+            function_name, repo_name, content, name_terms, content_terms, tokenize='unicode61'
+        )""",
+        "CREATE TABLE IF NOT EXISTS repo_fts_pending (id INTEGER PRIMARY KEY)",
+        """CREATE TRIGGER repo_index_fts_inserted AFTER INSERT ON repo_index BEGIN
+            INSERT OR IGNORE INTO repo_fts_pending (id) VALUES (new.id);
+        END""",
+        """CREATE TRIGGER repo_index_fts_updated AFTER UPDATE ON repo_index BEGIN
+            DELETE FROM repo_fts WHERE rowid = old.id;
+            INSERT OR IGNORE INTO repo_fts_pending (id) VALUES (new.id);
+        END""",
+        """CREATE TRIGGER repo_index_fts_deleted AFTER DELETE ON repo_index BEGIN
+            DELETE FROM repo_fts WHERE rowid = old.id;
+            DELETE FROM repo_fts_pending WHERE id = old.id;
+        END""",
+        "INSERT OR IGNORE INTO repo_fts_pending (id) SELECT id FROM repo_index",
+        sync_repo_search,
+    )),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+# Applied to every pooled connection. WAL lets readers run alongside a writer; NORMAL sync is
+# durable across application crashes in WAL mode; busy_timeout waits out short write locks
+# instead of failing with "database is locked".
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",   # 256 MB memory-mapped reads
+    "PRAGMA cache_size=-16000",     # 16 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Large text columns (messages.content, repo_blobs.content, corrections code, compilation_log.code)
+# can be stored compressed: a BLOB of COMPRESSION_MAGIC + codec tag + payload. Plain TEXT rows are
+# left as they are, so old databases and small values need no conversion.
+COMPRESSION_CODECS = ("zlib", "zstd")
+COMPRESSION_MAGIC = b"PDEI"
+_CODEC_TAGS = {"zlib": b"\x01", "zstd": b"\x02"}
+# Values shorter than this (in characters) are stored as plain text
+COMPRESSION_THRESHOLD = 1024
+
+
+def pack_text(text: Optional[str], codec: Optional[str], threshold: int = COMPRESSION_THRESHOLD) -> Union[str, bytes, None]:
+    """Compress `text` for storage if it is long enough and compression actually saves space."""
+    if codec is None or text is None or len(text) < threshold:
+        return text
+    raw = text.encode('utf-8', errors='surrogatepass')
+    if codec == "zstd":
+        payload = zstd.ZstdCompressor(level=3).compress(raw)
+    else:
+        payload = zlib.compress(raw, 6)
+    packed = COMPRESSION_MAGIC + _CODEC_TAGS[codec] + payload
+    return packed if len(packed) < len(raw) else text
+
+
+def unpack_text(value: Union[str, bytes, None]) -> Union[str, bytes, None]:
+    """
+    Inverse of `pack_text`; anything that is not a packed value is returned unchanged. Registered
+    on pooled connections as the SQL function `unpack`, so queries decompress only the rows they return.
+    """
+    if not isinstance(value, bytes) or value[:len(COMPRESSION_MAGIC)] != COMPRESSION_MAGIC:
+        return value
+    tag, payload = value[len(COMPRESSION_MAGIC):len(COMPRESSION_MAGIC) + 1], value[len(COMPRESSION_MAGIC) + 1:]
+    if tag == _CODEC_TAGS["zlib"]:
+        raw = zlib.decompress(payload)
+    elif tag == _CODEC_TAGS["zstd"]:
+        if zstd is None:
+            raise ValueError("zstd-compressed value found but the zstandard package is not installed")
+        raw = zstd.ZstdDecompressor().decompress(payload)
+    else:
+        return value
+    return raw.decode('utf-8', errors='surrogatepass')
+
+
+_CAMEL_BOUNDARY = re.compile(r'(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])')
+_IDENTIFIER = re.compile(r'[A-Za-z][A-Za-z0-9]*')
+
+
+def code_terms(text: Optional[str]) -> str:
+    """
+    The camelCase/PascalCase parts of every identifier in `text`, lowercased and space-separated
+    ("applyForgeDecay" -> "apply forge decay"). Added to the full-text index by `sync_repo_search`;
+    also registered on pooled connections as the SQL function `code_terms` for migrations 3-5.
+    """
+    if not text:
+        return ""
+    parts = []
+    for ident in _IDENTIFIER.findall(text):
+        split = _CAMEL_BOUNDARY.split(ident)
+        if len(split) > 1:
+            parts.extend(split)
+    return " ".join(parts).lower()
+
+
+# Idle connections kept per database, shared by every PDEIMemory/BuddAI using it
+DEFAULT_POOL_SIZE = 10
+# Seconds between passive WAL checkpoints (keeps the -wal file from growing between auto-checkpoints)
+CHECKPOINT_INTERVAL = 300.0
+
 
 class SQLiteConnectionPool:
-    """Thread-safe SQLite connection pool."""
-    def __init__(self, db_path: Path, max_size: int = 10):
+    """
+    Thread-safe SQLite connection pool.
+
+    Connections are opened on demand with `CONNECTION_PRAGMAS`; up to `max_size` idle ones are
+    kept for reuse. A connection returned with an open transaction is rolled back first, and at
+    most every `CHECKPOINT_INTERVAL` seconds a returned connection runs a passive WAL checkpoint.
+    """
+    def __init__(self, db_path: Path, max_size: int = DEFAULT_POOL_SIZE):
         self.db_path = db_path
         self.pool = queue.Queue(maxsize=max_size)
+        self._next_checkpoint = time.monotonic() + CHECKPOINT_INTERVAL
 
     def get_connection(self) -> sqlite3.Connection:
         try:
             return self.pool.get_nowait()
         except queue.Empty:
             conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            conn.execute("PRAGMA journal_mode=WAL;")
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            conn.create_function("code_terms", 1, code_terms, deterministic=True)
+            conn.create_function("unpack", 1, unpack_text, deterministic=True)
             return conn
 
     def return_connection(self, conn: sqlite3.Connection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            now = time.monotonic()
+            if now >= self._next_checkpoint:
+                self._next_checkpoint = now + CHECKPOINT_INTERVAL
+                conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        except sqlite3.Error as e:
+            logging.warning(f"Discarding pooled connection to {self.db_path}: {e}")
+            conn.close()
+            return
         try:
             self.pool.put_nowait(conn)
         except queue.Full:
             conn.close()
 
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """A pooled connection for a `with` block: committed on success, rolled back on error, always returned."""
+        conn = self.get_connection()
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            self.return_connection(conn)
+
+    def close(self):
+        """Close the idle connections (e.g. before deleting the database file)."""
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_POOLS: Dict[str, SQLiteConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(db_path: Union[str, Path]) -> SQLiteConnectionPool:
+    """The process-wide pool for a database file, so all users of one file share its connections."""
+    key = str(Path(db_path).resolve())
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = SQLiteConnectionPool(Path(db_path))
+        return pool
+
+
+def close_pool(db_path: Union[str, Path]):
+    """Flush queued messages, then drop a database's pool and close its idle connections."""
+    key = str(Path(db_path).resolve())
+    with _POOLS_LOCK:
+        writer = _WRITERS.pop(key, None)
+        pool = _POOLS.pop(key, None)
+    if writer is not None:
+        writer.flush()
+    if pool is not None:
+        pool.close()
+
+
+# Message write-behind (PDEIMemory durability="async")
+DURABILITY_MODES = ("sync", "async")
+# A queued message waits at most this long (seconds) for others to share its commit...
+GROUP_COMMIT_INTERVAL = 0.005
+# ...or until this many are queued
+GROUP_COMMIT_ROWS = 64
+# Message IDs reserved from sqlite_sequence at a time
+MESSAGE_ID_BLOCK = 64
+# Pause before the writer thread retries a failed commit
+WRITE_RETRY_DELAY = 1.0
+
+
+class MessageWriteBehind:
+    """
+    Write-behind queue for the `messages` table with group commit.
+
+    `save` returns the new row ID immediately. IDs come from blocks reserved in
+    `sqlite_sequence`, so AUTOINCREMENT inserts from other connections or processes never reuse
+    them. A background thread inserts everything queued in one transaction, `GROUP_COMMIT_INTERVAL`
+    seconds after the first queued row (sooner once `GROUP_COMMIT_ROWS` are waiting). `flush`
+    writes the queue synchronously and also runs at interpreter exit.
+    """
+    __slots__ = ('pool', '_lock', '_wake', '_flush_lock', '_pending', '_next_id', '_last_id', '_thread')
+
+    def __init__(self, pool: SQLiteConnectionPool):
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        # Keeps batches in order when the thread and an explicit flush() race
+        self._flush_lock = threading.Lock()
+        self._pending: List[Tuple] = []
+        self._next_id = 1
+        self._last_id = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pending(self) -> int:
+        """Messages queued but not yet committed."""
+        return len(self._pending)
+
+    def save(self, session_id: str, role: str, content: Union[str, bytes]) -> int:
+        """Queue a message (content as stored, i.e. already packed) and return its ID."""
+        with self._lock:
+            if self._next_id > self._last_id:
+                self._reserve_ids()
+            msg_id = self._next_id
+            self._next_id += 1
+            self._pending.append((msg_id, session_id, role, content, datetime.now().isoformat()))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pdei-message-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+            self._wake.notify()
+        return msg_id
+
+    def _reserve_ids(self):
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'messages'").fetchone()
+            top = max(row[0] if row else 0, conn.execute("SELECT COALESCE(MAX(id), 0) FROM messages").fetchone()[0])
+            if row:
+                conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'messages'", (top + MESSAGE_ID_BLOCK,))
+            else:
+                conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('messages', ?)", (top + MESSAGE_ID_BLOCK,))
+        self._next_id, self._last_id = top + 1, top + MESSAGE_ID_BLOCK
+
+    def flush(self) -> bool:
+        """
+        Commit everything queued so far. Returns False on a database error and keeps the rows
+        queued, unless the batch itself is rejected (IntegrityError), which no retry would fix.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return True
+            try:
+                with self.pool.connection() as conn:
+                    conn.executemany(
+                        "INSERT INTO messages (id, session_id, role, content, timestamp) VALUES (?, ?, ?, ?, ?)",
+                        batch
+                    )
+            except sqlite3.IntegrityError as e:
+                # e.g. the IDs were already written by a forked copy of this queue
+                logging.error(f"Dropped {len(batch)} queued messages (IDs {batch[0][0]}-{batch[-1][0]}) rejected by {self.pool.db_path}: {e}")
+                return False
+            except sqlite3.Error as e:
+                logging.warning(f"Could not write {len(batch)} queued messages to {self.pool.db_path}: {e}")
+                with self._lock:
+                    self._pending[:0] = batch
+                return False
+            return True
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._wake.wait()
+                # Group commit: give other messages a moment to join this transaction
+                if len(self._pending) < GROUP_COMMIT_ROWS:
+                    self._wake.wait(GROUP_COMMIT_INTERVAL)
+            if not self.flush():
+                time.sleep(WRITE_RETRY_DELAY)
+
+
+_WRITERS: Dict[str, MessageWriteBehind] = {}
+
+
+def get_message_writer(db_path: Union[str, Path]) -> MessageWriteBehind:
+    """The process-wide message write-behind queue for a database file."""
+    key = str(Path(db_path).resolve())
+    pool = get_pool(db_path)
+    with _POOLS_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is None:
+            writer = _WRITERS[key] = MessageWriteBehind(pool)
+        return writer
+
+
+def _reset_after_fork():
+    # SQLite connections must not be used across fork(), and a forked child must not flush the
+    # parent's queued messages. Forget (don't close) the inherited pools and writers.
+    global _POOLS_LOCK
+    _POOLS.clear()
+    _WRITERS.clear()
+    _POOLS_LOCK = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
 class PooledConnectionWrapper:
-    """Wraps a connection to return it to the pool on close()."""
+    """
+    Wraps a connection to return it to the pool on close().
+
+    Also a context manager (`with memory.get_connection() as conn:`): commits on success, rolls
+    back on error, and returns the connection either way.
+    """
     def __init__(self, pool: SQLiteConnectionPool, conn: sqlite3.Connection):
         self._pool = pool
         self._conn = conn
@@ -58,6 +657,16 @@ class PooledConnectionWrapper:
             self._pool.return_connection(self._conn)
             self._conn = None
 
+    def __enter__(self) -> "PooledConnectionWrapper":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._conn is not None and exc_type is None:
+            self._conn.commit()
+        # return_connection rolls back anything left open
+        self.close()
+        return False
+
     def __getattr__(self, name):
         return getattr(self._conn, name)
 
@@ -67,12 +676,42 @@ class PDEIMemory:
     
     Handles database interactions, session management, and learning persistence.
     Acts as the central storage unit for the Exocortex.
+
+    `durability` controls `save_message`: "sync" commits each message before returning;
+    "async" queues it for a group commit a few milliseconds later (see `MessageWriteBehind`).
+    Either way, reads of `messages` through `messages_connection` (and the methods here that
+    read it) see every message saved in this process; other connections leave the queue alone.
+
+    `compression` ("zlib", "zstd", or None/"none" for off) compresses large text values on write (see `pack`);
+    reads decompress with the SQL function `unpack()` whatever the setting.
     """
-    def __init__(self, db_path: Union[str, Path], user_id: str = "default"):
+    def __init__(self, db_path: Union[str, Path], user_id: str = "default", durability: str = "sync",
+                 compression: Optional[str] = None, compression_threshold: int = COMPRESSION_THRESHOLD):
         self.db_path = Path(db_path)
         self.user_id = user_id
-        self.connection_pool = SQLiteConnectionPool(self.db_path)
+        self._rules_key = str(self.db_path.resolve())
+        if durability not in DURABILITY_MODES:
+            logging.warning(f"Unknown message durability '{durability}', using 'sync'")
+            durability = "sync"
+        self.durability = durability
+        if compression == "none":
+            compression = None
+        elif compression == "zstd" and zstd is None:
+            logging.warning("zstandard is not installed; compressing with zlib instead")
+            compression = "zlib"
+        elif compression is not None and compression not in COMPRESSION_CODECS:
+            logging.warning(f"Unknown compression codec '{compression}', storing text uncompressed")
+            compression = None
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        # Shared with every other PDEIMemory on the same file (pool size and checkpoints are per file)
+        self.connection_pool = get_pool(self.db_path)
+        self.message_writer = get_message_writer(self.db_path)
         self.ensure_db_init()
+        # Baseline for refresh_rules_version: rules loaded from here on are at least this new
+        stored = self._read_stored_rules_version()
+        if stored is not None:
+            _STORED_RULES_VERSIONS.setdefault(self._rules_key, stored)
         
         # Sub-components
         self.shadow_engine = PDEIShadowEngine(self)
@@ -84,82 +723,91 @@ class PDEIMemory:
         raw_conn = self.connection_pool.get_connection()
         return PooledConnectionWrapper(self.connection_pool, raw_conn)
 
+    def connection(self) -> ContextManager[sqlite3.Connection]:
+        """Pooled connection for a `with` block (see `SQLiteConnectionPool.connection`)."""
+        return self.connection_pool.connection()
+
+    def messages_connection(self) -> ContextManager[sqlite3.Connection]:
+        """`connection()` for work on the `messages` table: queued messages are committed first."""
+        # Read-your-writes only where it matters; rules and repo lookups on the response path
+        # must not turn the group commit back into a commit per message
+        if self.message_writer.pending:
+            self.message_writer.flush()
+        return self.connection_pool.connection()
+
+    def pack(self, text: Optional[str]) -> Union[str, bytes, None]:
+        """A large text value as it should be written with this memory's compression settings."""
+        return pack_text(text, self.compression, self.compression_threshold)
+
+    def flush_messages(self) -> bool:
+        """Commit any write-behind messages now (end of session, shutdown)."""
+        return self.message_writer.flush()
+
     def ensure_db_init(self):
-        """Initialize the generic schema if tables don't exist."""
+        """Create or upgrade the schema: apply the `SCHEMA_MIGRATIONS` newer than the file's user_version."""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Core tables definition
-        tables = [
-            """CREATE TABLE IF NOT EXISTS sessions (
-                session_id TEXT PRIMARY KEY,
-                user_id TEXT,
-                started_at TIMESTAMP,
-                ended_at TIMESTAMP,
-                title TEXT
-            )""",
-            """CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT,
-                role TEXT,
-                content TEXT,
-                timestamp TIMESTAMP
-            )""",
-            """CREATE TABLE IF NOT EXISTS repo_index (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                file_path TEXT,
-                repo_name TEXT,
-                function_name TEXT,
-                content TEXT,
-                last_modified TIMESTAMP
-            )""",
-            """CREATE TABLE IF NOT EXISTS style_preferences (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                category TEXT,
-                preference TEXT,
-                confidence FLOAT,
-                extracted_at TIMESTAMP
-            )""",
-            """CREATE TABLE IF NOT EXISTS feedback (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                message_id INTEGER,
-                positive BOOLEAN,
-                comment TEXT,
-                timestamp TIMESTAMP
-            )""",
-            """CREATE TABLE IF NOT EXISTS corrections (
-                id INTEGER PRIMARY KEY,
-                timestamp TEXT,
-                original_code TEXT,
-                corrected_code TEXT,
-                reason TEXT,
-                context TEXT,
-                processed BOOLEAN DEFAULT 0
-            )""",
-            """CREATE TABLE IF NOT EXISTS code_rules (
-                id INTEGER PRIMARY KEY,
-                rule_text TEXT,
-                pattern_find TEXT,
-                pattern_replace TEXT,
-                context TEXT,
-                confidence FLOAT,
-                learned_from TEXT,
-                times_applied INTEGER DEFAULT 0
-            )"""
-        ]
-        
-        for table_sql in tables:
-            cursor.execute(table_sql)
-            
-        conn.commit()
-        conn.close()
+        try:
+            # Up-to-date databases (every start after the first) cost one PRAGMA read
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            # Re-read under the write lock: another process may have migrated in the meantime
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, steps in SCHEMA_MIGRATIONS:
+                if target > version:
+                    for step in steps:
+                        if callable(step):
+                            step(conn)
+                        else:
+                            conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {max(version, SCHEMA_VERSION)}")
+            conn.commit()
+        finally:
+            conn.close()
+
+    @property
+    def rules_version(self) -> int:
+        """Bumped whenever a learned rule is saved or quarantined on this database."""
+        return _RULES_VERSIONS.get(self._rules_key, 0)
+
+    def _bump_rules_version(self, cursor=None):
+        _RULES_VERSIONS[self._rules_key] = _RULES_VERSIONS.get(self._rules_key, 0) + 1
+        if cursor is not None:
+            # Our own write is already reflected; don't let refresh_rules_version count it again
+            cursor.execute("SELECT version FROM rules_meta WHERE id = 1")
+            row = cursor.fetchone()
+            if row:
+                _STORED_RULES_VERSIONS[self._rules_key] = row[0]
+
+    def refresh_rules_version(self) -> int:
+        """
+        Pick up learned-rule changes made outside this process (another daemon, the server, a
+        direct edit of `code_rules`) and return the current `rules_version`.
+        """
+        stored = self._read_stored_rules_version()
+        if stored is not None:
+            if _STORED_RULES_VERSIONS.get(self._rules_key, stored) != stored:
+                _RULES_VERSIONS[self._rules_key] = _RULES_VERSIONS.get(self._rules_key, 0) + 1
+            _STORED_RULES_VERSIONS[self._rules_key] = stored
+        return self.rules_version
+
+    def _read_stored_rules_version(self) -> Optional[int]:
+        conn = self.get_connection()
+        try:
+            row = conn.execute("SELECT version FROM rules_meta WHERE id = 1").fetchone()
+        except sqlite3.Error:
+            row = None
+        finally:
+            conn.close()
+        return row[0] if row else None
 
     # --- Generic DB Helpers ---
     
     def save_message(self, session_id: str, role: str, content: str) -> int:
-        """Log a chat message."""
+        """Log a chat message. With async durability it is queued and its ID returned right away."""
+        content = self.pack(content)
+        if self.durability == "async":
+            return self.message_writer.save(session_id, role, content)
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute(
@@ -179,21 +827,29 @@ class PDEIMemory:
             INSERT INTO corrections 
             (timestamp, original_code, corrected_code, reason, context)
             VALUES (?, ?, ?, ?, ?)
-        """, (datetime.now().isoformat(), original, corrected, reason, context))
+        """, (datetime.now().isoformat(), self.pack(original), self.pack(corrected), reason, context))
         conn.commit()
         conn.close()
 
     def get_learned_rules(self, min_confidence: float = 0.8) -> List[Dict]:
-        """Retrieve high-confidence rules."""
+        """Retrieve high-confidence rules (quarantined patterns are excluded)."""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT rule_text, pattern_find, pattern_replace, confidence FROM code_rules WHERE confidence >= ?", (min_confidence,))
+        cursor.execute("""
+            SELECT rule_text, pattern_find, pattern_replace, confidence FROM code_rules
+            WHERE confidence >= ?
+            AND NOT EXISTS (SELECT 1 FROM rule_quarantine q WHERE q.pattern_find = code_rules.pattern_find)
+        """, (min_confidence,))
         rows = cursor.fetchall()
         conn.close()
         return [{"rule": r[0], "find": r[1], "replace": r[2], "confidence": r[3]} for r in rows]
 
     def save_rule(self, rule_text: str, find: str, replace: str, confidence: float, source: str):
-        """Persist a learned rule."""
+        """
+        Persist a learned rule.
+        Raises UnsafePatternError if `find` is not a valid regex or nests quantifiers.
+        """
+        check_pattern(find)
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute("""
@@ -202,8 +858,66 @@ class PDEIMemory:
             VALUES (?, ?, ?, ?, ?)
         """, (rule_text, find, replace, confidence, source))
         conn.commit()
+        self._bump_rules_version(cursor)
+        conn.close()
+
+    def quarantine_rule(self, find: str, reason: str):
+        """Take every learned rule using this pattern out of service."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT rule_text FROM code_rules WHERE pattern_find = ?", (find,))
+        row = cursor.fetchone()
+        cursor.execute("""
+            INSERT OR REPLACE INTO rule_quarantine
+            (pattern_find, rule_text, reason, timestamp)
+            VALUES (?, ?, ?, ?)
+        """, (find, row[0] if row else None, reason, datetime.now().isoformat()))
+        conn.commit()
+        self._bump_rules_version(cursor)
         conn.close()
 
+    def get_quarantined_rules(self) -> List[Dict]:
+        """List quarantined patterns, newest first."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT pattern_find, rule_text, reason, timestamp FROM rule_quarantine ORDER BY timestamp DESC")
+        rows = cursor.fetchall()
+        conn.close()
+        return [{"find": r[0], "rule": r[1], "reason": r[2], "timestamp": r[3]} for r in rows]
+
+    def search_repo_index(self, keywords: List[str], limit: int = 10, names_only: bool = False,
+                          snippet_tokens: int = 32) -> List[Dict]:
+        """
+        BM25-ranked full-text search of this user's indexed functions (best match first).
+
+        Each keyword matches as a prefix, and so do its camelCase parts. With `names_only`, only
+        function and repo names are searched. Every hit carries a `snippet` of its code around
+        the best match (the start of the code for name-only matches).
+        """
+        words = []
+        for keyword in keywords:
+            for word in re.findall(r'\w+', keyword):
+                words.append(word.lower())
+                words.extend(code_terms(word).split())
+        if not words:
+            return []
+        match = " OR ".join(f'"{w}"*' for w in dict.fromkeys(words))
+        if names_only:
+            match = f"{{function_name repo_name name_terms}} : ({match})"
+
+        with self.connection() as conn:
+            # Rows written since the last sync (e.g. by a plain connection)
+            sync_repo_search(conn)
+            rows = conn.execute("""
+                SELECT r.repo_name, r.file_path, r.function_name, repo_fts.content,
+                       snippet(repo_fts, 2, '', '', ' ... ', ?)
+                FROM repo_fts JOIN repo_index r ON r.id = repo_fts.rowid
+                WHERE repo_fts MATCH ? AND r.user_id = ?
+                ORDER BY bm25(repo_fts, 10.0, 5.0, 1.0, 5.0, 1.0)
+                LIMIT ?
+            """, (min(snippet_tokens, 64), match, self.user_id, limit)).fetchall()
+        return [{"repo": r[0], "file_path": r[1], "function": r[2], "content": r[3], "snippet": r[4]} for r in rows]
+
 
 class PDEIShadowEngine:
     """
@@ -237,18 +951,13 @@ class PDEIAdaptiveLearner:
 
     def learn_from_session(self, session_id: str):
         """Analyze what worked/failed in a session."""
-        conn = self.memory.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, role, content 
-            FROM messages 
-            WHERE session_id = ? 
-            ORDER BY id ASC
-        """, (session_id,))
-        
-        messages = cursor.fetchall()
-        conn.close()
+        with self.memory.messages_connection() as conn:
+            messages = conn.execute("""
+                SELECT id, role, unpack(content) 
+                FROM messages 
+                WHERE session_id = ? 
+                ORDER BY id ASC
+            """, (session_id,)).fetchall()
         
         # Logic to detect "No, that's wrong" or "Better" patterns would go here
         # and call self.memory.save_rule()
@@ -270,7 +979,7 @@ class PDEISmartLearner:
         
         # Fetch unprocessed corrections
         cursor.execute("""
-            SELECT id, original_code, corrected_code, reason 
+            SELECT id, unpack(original_code), unpack(corrected_code), reason 
             FROM corrections
             WHERE processed IS NOT 1
             LIMIT 5
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\profiler.py
+P.DE.I Framework - Rule Profiler
+================================
+
+Per-rule counters for the validator, so slow rules and rules that never fire can be found and
+pruned from `domain_configs`.
+
+Key Components:
+1. RuleProfiler: Counts, per rule, how often it was checked, how often its triggers/platform
+   matched, how many issues it emitted and the time spent checking it and applying its fix.
+2. format_profile: Text report used by the `/profile-rules` slash command.
+
+Where it fits:
+    Owned by `PDEIValidator` (`logic.py`), disabled by default (`PDEI_PROFILE_RULES=1` or
+    `/profile-rules on` enables it). Exposed by `GET /api/system/validator-stats` in `server.py`.
+    The shared automaton/regex scans cannot be attributed to single rules; their time is reported
+    as `scan_ms`. Cache hits and batch pool workers are not profiled.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+RuleKey = Tuple[str, str]
+
+# Counter slots per rule
+_CHECKS, _TRIGGERED, _ISSUES, _CHECK_NS, _FIXES, _FIX_NS = range(6)
+
+
+def rule_source(rule: Dict[str, Any]) -> str:
+    return rule.get('source', 'domain')
+
+
+class RuleProfiler:
+    """
+    Low-overhead per-rule counters.
+
+    Counters are plain lists updated without locking (a lost increment under heavy threading only
+    skews the numbers slightly); `reset` and `report` take the lock.
+    """
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.validations = 0
+            self.scan_ns = 0
+            self.started = time.time()
+            self._rules: Dict[RuleKey, List[int]] = {}
+
+    def _slots(self, key: RuleKey) -> List[int]:
+        slots = self._rules.get(key)
+        if slots is None:
+            slots = self._rules.setdefault(key, [0] * 6)
+        return slots
+
+    def record_scan(self, elapsed_ns: int):
+        self.validations += 1
+        self.scan_ns += elapsed_ns
+
+    def record_check(self, category: str, rule: Dict[str, Any], elapsed_ns: int, triggered: bool, issues: int):
+        slots = self._slots((category, str(rule.get('id'))))
+        slots[_CHECKS] += 1
+        slots[_CHECK_NS] += elapsed_ns
+        if triggered:
+            slots[_TRIGGERED] += 1
+        slots[_ISSUES] += issues
+
+    def timed_fix(self, categories: Dict[str, str], plan_fix: Callable[[str, Dict[str, Any]], Any]) -> Callable[[str, Dict[str, Any]], Any]:
+        """Wrap a fix planner so the time spent planning each rule's fix is recorded."""
+        def plan(code: str, issue: Dict[str, Any]):
+            start = time.perf_counter_ns()
+            try:
+                return plan_fix(code, issue)
+            finally:
+                rule_id = str(issue.get('id'))
+                slots = self._slots((categories.get(rule_id, '?'), rule_id))
+                slots[_FIXES] += 1
+                slots[_FIX_NS] += time.perf_counter_ns() - start
+        return plan
+
+    def report(self, validation_rules: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Stats for every loaded rule (including those never checked), slowest first."""
+        with self._lock:
+            rules = []
+            seen = set()
+            for category, cat_rules in validation_rules.items():
+                for rule in cat_rules:
+                    key = (category, str(rule.get('id')))
+                    seen.add(key)
+                    rules.append(self._row(key, rule_source(rule), self._rules.get(key)))
+            # Rules recorded under a previous rule set (e.g. before a reload)
+            for key, slots in self._rules.items():
+                if key not in seen:
+                    rules.append(self._row(key, 'removed', slots))
+            rules.sort(key=lambda r: (-r["check_ms"] - r["fix_ms"], r["category"], r["id"]))
+            return {
+                "enabled": self.enabled,
+                "since": self.started,
+                "validations": self.validations,
+                "scan_ms": round(self.scan_ns / 1e6, 3),
+                "rules": rules,
+                "dead_rules": [f"{r['category']}/{r['id']}" for r in rules if r["issues"] == 0 and r["source"] != 'removed'],
+            }
+
+    @staticmethod
+    def _row(key: RuleKey, source: str, slots: Optional[List[int]] = None) -> Dict[str, Any]:
+        slots = slots or [0] * 6
+        checks = slots[_CHECKS]
+        return {
+            "category": key[0],
+            "id": key[1],
+            "source": source,
+            "checks": checks,
+            "triggered": slots[_TRIGGERED],
+            "issues": slots[_ISSUES],
+            "check_ms": round(slots[_CHECK_NS] / 1e6, 3),
+            "avg_check_us": round(slots[_CHECK_NS] / checks / 1e3, 2) if checks else 0.0,
+            "fixes": slots[_FIXES],
+            "fix_ms": round(slots[_FIX_NS] / 1e6, 3),
+        }
+
+
+def format_profile(report: Dict[str, Any], limit: int = 15) -> str:
+    if not report["enabled"] and not report["validations"]:
+        return "⏱️ Rule profiling is off. Enable it with /profile-rules on"
+    lines = [f"⏱️ Rule Profile ({report['validations']} validations, shared scans {report['scan_ms']:.1f} ms):"]
+    for row in report["rules"][:limit]:
+        lines.append(f"  - {row['category']}/{row['id']} [{row['source']}]: {row['check_ms']:.2f} ms check, "
+                     f"{row['fix_ms']:.2f} ms fix | {row['checks']} checks, {row['triggered']} triggered, {row['issues']} issues")
+    if report["dead_rules"]:
+        lines.append(f"💤 Never fired ({len(report['dead_rules'])}): " + ", ".join(report["dead_rules"]))
+    return "\n".join(lines)
@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\rules.py
+P.DE.I Framework - Rule Compilation Layer
+=========================================
+
+This module turns the merged validation rules (Domain + Forge Theory + Learned) into a
+compiled, scan-once representation used by `PDEIValidator`.
+
+Key Components:
+1. PatternAutomaton: Aho-Corasick automaton that finds every literal pattern in a single pass.
+2. RegexLayer: Precompiled regex rules grouped into named-group alternations, scanned once.
+   Sandboxed (learned) patterns are only ever executed through the `RegexGuard` worker.
+3. CompiledRule: A rule with its trigger/forbidden/exclusion lists normalized once at load time
+   (and its optional `ast` / `formula` specs compiled, see `ast_rules.py` and `formulas.py`).
+4. CompiledRuleset: All categories plus the automata and regex layer built from their patterns,
+   and an inverted index from trigger/platform literals to the rules they gate.
+5. RuleRegistry: Process-wide store of compiled rule sets shared by every validator built from
+   the same configuration, Forge Theory file and learned-rule version.
+
+Where it fits:
+    Imported by `logic.py`. The validator compiles its rules once, scans each code block and its
+    context exactly once, and resolves every rule decision from the resulting hit sets.
+"""
+import itertools
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+
+from pdei_core.ast_rules import AstCheck, compile_ast_check
+from pdei_core.cache import ValidationCache
+from pdei_core.fixes import Edit
+from pdei_core.formulas import FormulaCheck, compile_formula_check
+from pdei_core.safe_regex import RegexGuard, get_guard
+
+Span = Tuple[int, int]
+
+# Constructs that change meaning (or fail to compile) once a pattern is embedded in an
+# alternation: numbered/named backreferences, named groups and global inline flags.
+_UNGROUPABLE = re.compile(r'\\[1-9]|\\g<|\(\?P[<=]|\(\?<[A-Za-z_]|\(\?[aiLmsux]+\)')
+
+
+def as_list(value: Any) -> List[Any]:
+    """Normalize a rule field that may be a single string or a list."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+class PatternAutomaton:
+    """
+    Aho-Corasick automaton over a fixed set of literal patterns.
+
+    The goto/fail functions are flattened into a DFA table at build time, so a scan is one
+    dictionary lookup per character regardless of how many patterns are registered.
+    """
+    def __init__(self, patterns: Iterable[str]):
+        unique = sorted(set(patterns))
+        # The empty string is a substring of everything
+        self.always: Tuple[str, ...] = tuple(p for p in unique if p == "")
+        self.patterns: Tuple[str, ...] = tuple(p for p in unique if p)
+        self._delta: List[Dict[str, int]] = [{}]
+        self._out: List[Tuple[str, ...]] = [()]
+        self._build()
+
+    def _build(self):
+        goto: List[Dict[str, int]] = [{}]
+        own: List[List[str]] = [[]]
+
+        # 1. Trie of all patterns
+        for pattern in self.patterns:
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    own.append([])
+                state = nxt
+            own[state].append(pattern)
+
+        # 2. Failure links (BFS) flattened into full transitions
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict() for _ in goto]
+        out: List[Tuple[str, ...]] = [()] * len(goto)
+        delta[0] = dict(goto[0])
+        out[0] = tuple(own[0])
+
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+            delta[state] = dict(delta[fail[state]])
+            delta[state].update(goto[state])
+            out[state] = tuple(own[state]) + out[fail[state]]
+
+        self._delta = delta
+        self._out = out
+
+    def search(self, text: str) -> Dict[str, int]:
+        """Return every pattern that occurs in `text`, mapped to the offset of its first occurrence."""
+        hits: Dict[str, int] = {p: 0 for p in self.always}
+        if not self.patterns or not text:
+            return hits
+
+        delta = self._delta
+        out = self._out
+        state = 0
+        for i, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                for pattern in out[state]:
+                    if pattern not in hits:
+                        hits[pattern] = i - len(pattern) + 1
+        return hits
+
+
+class RegexLayer:
+    """
+    Regex rules compiled once at load time.
+
+    Compatible patterns are combined into a single alternation of zero-width lookaheads,
+    `(?=(?P<r0>...))|(?=(?P<r1>...))`, so one `finditer` reports the match spans of the whole
+    group. At a reported position only the patterns ordered after the winning alternative are
+    re-tried, anchored at that position; every other position is already known not to match.
+    Patterns with backreferences, named groups or global flags are kept as solo patterns.
+
+    Sandboxed patterns come from untrusted sources (rules extracted by the model). They are run
+    by a `RegexGuard` under a time budget; a pattern that exceeds it is dropped from the layer and
+    reported through `on_budget_exceeded` so the caller can quarantine the rule. The layer is shared
+    by concurrent validations, so quarantining swaps in new lists under `_lock` (scans keep the
+    snapshot they started with) and reports each pattern once.
+
+    When rebuilt from a `previous` layer with the same trusted patterns (e.g. only learned rules
+    changed), the combined alternation and compiled patterns are reused instead of recompiled.
+    """
+    def __init__(self, patterns: Iterable[str], sandboxed: Iterable[str] = (),
+                 guard: Optional[RegexGuard] = None,
+                 on_budget_exceeded: Optional[Callable[[str], None]] = None,
+                 previous: Optional["RegexLayer"] = None):
+        self.compiled: Dict[str, Pattern] = {}
+        self.solo: List[str] = []
+        self.sandboxed: List[str] = []
+        self.quarantined: List[str] = []
+        self._lock = threading.Lock()
+        self.guard = guard
+        self.on_budget_exceeded = on_budget_exceeded
+        self._trusted = list(dict.fromkeys(patterns))
+
+        if previous is not None and previous._trusted == self._trusted:
+            # Trusted patterns are never quarantined, so the previous layer still holds all of them
+            self.compiled = {p: previous.compiled[p] for p in previous.grouped + previous.solo}
+            self.grouped: List[str] = previous.grouped
+            self.solo = previous.solo
+            self.combined: Optional[Pattern] = previous.combined
+        else:
+            self._compile_trusted()
+
+        reusable = previous.compiled if previous is not None else {}
+        for pattern in dict.fromkeys(sandboxed):
+            if pattern in self.compiled:
+                continue  # Also used by a trusted rule
+            try:
+                # Compiling is safe; matching is what can run away
+                self.compiled[pattern] = reusable.get(pattern) or re.compile(pattern)
+            except re.error as e:
+                logging.warning(f"Skipping invalid regex rule {pattern!r}: {e}")
+                continue
+            self.sandboxed.append(pattern)
+
+    def _compile_trusted(self):
+        grouped: List[str] = []
+        for pattern in self._trusted:
+            try:
+                self.compiled[pattern] = re.compile(pattern)
+            except re.error as e:
+                logging.warning(f"Skipping invalid regex rule {pattern!r}: {e}")
+                continue
+            if _UNGROUPABLE.search(pattern):
+                self.solo.append(pattern)
+            else:
+                grouped.append(pattern)
+
+        self.grouped = grouped
+        self.combined = None
+        if grouped:
+            try:
+                self.combined = re.compile("|".join(f"(?=(?P<r{i}>{p}))" for i, p in enumerate(grouped)))
+            except re.error:
+                self.solo = grouped + self.solo
+                self.grouped = []
+
+    def get(self, pattern: str) -> Optional[Pattern]:
+        """Return the precompiled form of a rule pattern (compiling ad-hoc patterns on demand)."""
+        if pattern in self.quarantined:
+            return None
+        compiled = self.compiled.get(pattern)
+        if compiled is None:
+            try:
+                compiled = re.compile(pattern)
+            except re.error:
+                return None
+        return compiled
+
+    def scan(self, text: str) -> Dict[str, List[Span]]:
+        """
+        Return the non-overlapping match spans of every pattern that matches `text`,
+        equivalent to running `finditer` for each pattern separately.
+        """
+        found: Dict[str, List[Span]] = {}
+
+        if self.combined is not None:
+            starts: Dict[str, List[Span]] = {}
+            grouped = self.grouped
+            for m in self.combined.finditer(text):
+                pos = m.start()
+                winner = int(m.lastgroup[1:])
+                starts.setdefault(grouped[winner], []).append(m.span(m.lastgroup))
+                # Alternatives before the winner already failed here; only later ones are unknown
+                for pattern in grouped[winner + 1:]:
+                    mm = self.compiled[pattern].match(text, pos)
+                    if mm:
+                        starts.setdefault(pattern, []).append(mm.span())
+            for pattern, spans in starts.items():
+                found[pattern] = self._non_overlapping(spans)
+
+        for pattern in self.solo:
+            spans = [m.span() for m in self.compiled[pattern].finditer(text)]
+            if spans:
+                found[pattern] = spans
+
+        sandboxed = tuple(self.sandboxed)
+        if sandboxed:
+            guarded, exceeded = self._guard().scan(sandboxed, text)
+            found.update(guarded)
+            for pattern in exceeded:
+                self._quarantine(pattern)
+        return found
+
+    def is_sandboxed(self, pattern: str) -> bool:
+        """True for untrusted patterns, including ones already quarantined."""
+        return pattern in self.sandboxed or pattern in self.quarantined
+
+    def edits(self, pattern: str, replacement: str, text: str) -> List[Edit]:
+        """
+        The edits `re.sub` would make for a rule pattern. Sandboxed patterns run in the guard and
+        quarantined ones never run.
+        """
+        if pattern in self.quarantined:
+            return []
+        if pattern in self.sandboxed:
+            edits, exceeded = self._guard().edits(pattern, replacement, text)
+            for p in exceeded:
+                self._quarantine(p)
+            return edits
+        compiled = self.get(pattern)
+        if compiled is None:
+            return []
+        return [(m.start(), m.end(), m.expand(replacement)) for m in compiled.finditer(text)]
+
+    def _guard(self) -> RegexGuard:
+        return self.guard if self.guard is not None else get_guard()
+
+    def _quarantine(self, pattern: str):
+        with self._lock:
+            # Another validation may have timed out on the same pattern first
+            if pattern not in self.sandboxed:
+                return
+            self.sandboxed = [p for p in self.sandboxed if p != pattern]
+            self.quarantined = self.quarantined + [pattern]
+            self.compiled.pop(pattern, None)
+        logging.warning(f"Regex rule {pattern!r} exceeded its time budget and was quarantined")
+        if self.on_budget_exceeded is not None:
+            self.on_budget_exceeded(pattern)
+
+    @staticmethod
+    def _non_overlapping(spans: List[Span]) -> List[Span]:
+        """Reduce per-position matches to the leftmost non-overlapping sequence `finditer` yields."""
+        selected: List[Span] = []
+        last_end = -1
+        for start, end in spans:
+            if start < last_end:
+                continue
+            selected.append((start, end))
+            last_end = end
+        return selected
+
+
+class CompiledRule:
+    """A validation rule with its literal fields normalized once at load time."""
+    __slots__ = ("rule", "platform", "exclusions", "exclusions_ctx", "triggers",
+                 "triggers_ctx", "forbidden", "forbidden_regex", "required_pattern",
+                 "required_alternatives", "required_regex", "exception", "implicit_trigger", "sandboxed", "ast_check",
+                 "formula_check")
+
+    def __init__(self, rule: Dict[str, Any]):
+        self.rule = rule
+        self.platform: Optional[str] = rule['platform'].lower() if 'platform' in rule else None
+
+        self.exclusions = as_list(rule.get('exclude_context'))
+        self.exclusions_ctx = [ex.lower() for ex in self.exclusions]
+
+        # None means "no trigger key" (always active); an empty list never triggers
+        self.triggers: Optional[List[str]] = as_list(rule['trigger']) if 'trigger' in rule else None
+        self.triggers_ctx = [t.lower() for t in self.triggers] if self.triggers is not None else []
+
+        self.forbidden = as_list(rule.get('forbidden'))
+        self.forbidden_regex = as_list(rule.get('forbidden_regex'))
+        self.required_pattern: Optional[str] = rule.get('required_pattern')
+        # Literals accepted in place of the required pattern (e.g. a Forge Theory lookup table for exp(-)
+        self.required_alternatives = as_list(rule.get('required_alternatives'))
+        self.required_regex: Optional[str] = rule.get('required_regex')
+        self.exception: Optional[str] = rule.get('exception')
+        # Learned rules: their regexes are executed by the guard only
+        self.sandboxed = bool(rule.get('sandboxed'))
+
+        # Python blocks that parse are checked structurally; the literal fields are the fallback
+        self.ast_check: Optional[AstCheck] = compile_ast_check(rule['ast'], rule.get('id')) if 'ast' in rule else None
+        # Exponentials that can be evaluated are checked by their numeric behavior instead
+        self.formula_check: Optional[FormulaCheck] = compile_formula_check(rule['formula'], rule.get('id')) if 'formula' in rule else None
+
+        # If no explicit forbidden/required patterns, the trigger itself is the issue
+        self.implicit_trigger = ('forbidden' not in rule and 'required_pattern' not in rule
+                                 and 'ast' not in rule and 'formula' not in rule and self.triggers is not None)
+
+    def code_literals(self) -> List[str]:
+        literals = self.exclusions + self.forbidden
+        if self.triggers:
+            literals += self.triggers
+        if self.required_pattern is not None:
+            literals.append(self.required_pattern)
+        return literals + self.required_alternatives
+
+    def context_literals(self) -> List[str]:
+        literals = self.exclusions_ctx + self.triggers_ctx
+        if self.platform is not None:
+            literals.append(self.platform)
+        return literals
+
+    def needs_regex(self) -> bool:
+        return bool(self.forbidden_regex) or self.required_regex is not None
+
+    def is_active(self, code_hits: Dict[str, int], context_hits: Dict[str, int]) -> bool:
+        """Resolve platform, exclusion and trigger constraints from the scan hit sets."""
+        if self.platform is not None and self.platform not in context_hits:
+            return False
+
+        for ex, ex_ctx in zip(self.exclusions, self.exclusions_ctx):
+            if ex in code_hits or ex_ctx in context_hits:
+                return False
+
+        if self.triggers is not None:
+            for t, t_ctx in zip(self.triggers, self.triggers_ctx):
+                if t in code_hits or t_ctx in context_hits:
+                    return True
+            return False
+
+        return True
+
+
+class CompiledRuleset:
+    """
+    Compiled form of a merged `validation_rules` dictionary.
+
+    Every literal used by any rule is registered in one of two automata: one matched
+    case-sensitively against the comment-stripped code, one matched against the lowercased
+    context. Regex rules are precompiled into a `RegexLayer`. A validation pass therefore costs
+    two linear scans (plus one regex scan when an active rule needs it) and dictionary lookups.
+
+    Rules gated by a platform or a trigger list are reachable only through an inverted index keyed
+    by those literals, so `candidates` touches the unconditional rules plus the rules whose gate
+    literal was actually seen, instead of every rule in every category.
+
+    Built from a `previous` ruleset, categories whose rules are unchanged keep their compiled rules
+    and unchanged regexes are not recompiled; only the (linear-time) automata and index are rebuilt.
+    """
+    def __init__(self, validation_rules: Dict[str, List[Dict[str, Any]]],
+                 on_budget_exceeded: Optional[Callable[[str], None]] = None,
+                 previous: Optional["CompiledRuleset"] = None):
+        self.categories: List[Tuple[str, List[CompiledRule]]] = []
+        # Snapshot of each category's source rules, compared on the next incremental rebuild
+        # (serialized: rule dicts are shared with the caller and could be mutated in place)
+        self.sources: Dict[str, str] = {}
+        self.reused_categories: List[str] = []
+        code_literals: List[str] = []
+        context_literals: List[str] = []
+        regex_patterns: List[str] = []
+        sandboxed_patterns: List[str] = []
+        # Position of every rule in (category, rule) order; index entries refer to these positions
+        self._rules: List[Tuple[int, CompiledRule]] = []
+        self._unconditional: List[int] = []
+        self._code_index: Dict[str, List[int]] = {}
+        self._context_index: Dict[str, List[int]] = {}
+
+        for category, rules in validation_rules.items():
+            if not isinstance(rules, list):
+                continue
+            source = json.dumps(rules, sort_keys=True, default=str)
+            compiled = previous.compiled_category(category, source) if previous is not None else None
+            if compiled is None:
+                compiled = [CompiledRule(rule) for rule in rules]
+            else:
+                self.reused_categories.append(category)
+            self.sources[category] = source
+            for rule in compiled:
+                code_literals.extend(rule.code_literals())
+                context_literals.extend(rule.context_literals())
+                patterns = sandboxed_patterns if rule.sandboxed else regex_patterns
+                patterns.extend(rule.forbidden_regex)
+                if rule.required_regex is not None:
+                    patterns.append(rule.required_regex)
+                self._index(len(self.categories), rule)
+            self.categories.append((category, compiled))
+
+        self.code_automaton = PatternAutomaton(code_literals)
+        self.context_automaton = PatternAutomaton(context_literals)
+        self.regex = RegexLayer(regex_patterns, sandboxed=sandboxed_patterns,
+                                on_budget_exceeded=on_budget_exceeded,
+                                previous=previous.regex if previous is not None else None)
+
+    def compiled_category(self, category: str, source: str) -> Optional[List[CompiledRule]]:
+        """The compiled rules of `category` if it was built from the same (serialized) rules, else None."""
+        if self.sources.get(category) != source:
+            return None
+        return next(compiled for name, compiled in self.categories if name == category)
+
+    def _index(self, category_idx: int, rule: CompiledRule):
+        position = len(self._rules)
+        self._rules.append((category_idx, rule))
+        if rule.platform is not None:
+            # The platform must appear in the context, whatever the triggers say
+            self._context_index.setdefault(rule.platform, []).append(position)
+        elif rule.triggers is not None:
+            # An empty trigger list is never indexed: the rule can never fire
+            for t, t_ctx in zip(rule.triggers, rule.triggers_ctx):
+                self._code_index.setdefault(t, []).append(position)
+                self._context_index.setdefault(t_ctx, []).append(position)
+        else:
+            self._unconditional.append(position)
+
+    def candidates(self, code_hits: Dict[str, int], context_hits: Dict[str, int]) -> List[Tuple[str, List[CompiledRule]]]:
+        """
+        Rules that may be active given the scan hits, grouped by category in ruleset order.
+        Exclusions are not resolved here; `CompiledRule.is_active` still decides each candidate.
+        """
+        positions = set(self._unconditional)
+        for hits, index in ((code_hits, self._code_index), (context_hits, self._context_index)):
+            for literal in hits:
+                gated = index.get(literal)
+                if gated:
+                    positions.update(gated)
+
+        grouped: List[Tuple[str, List[CompiledRule]]] = []
+        last_idx = -1
+        for position in sorted(positions):
+            category_idx, rule = self._rules[position]
+            if category_idx != last_idx:
+                grouped.append((self.categories[category_idx][0], []))
+                last_idx = category_idx
+            grouped[-1][1].append(rule)
+        return grouped
+
+    def scan(self, clean_code: str, context: str) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Single pass over the code and a single pass over the context."""
+        return self.code_automaton.search(clean_code), self.context_automaton.search(context.lower())
+
+
+class RegistryEntry:
+    """
+    An immutable compiled rule set plus the result cache shared by all validators using it.
+    `validation_rules` is shared as well and must be treated as read-only.
+    """
+    __slots__ = ("build_id", "validation_rules", "ruleset", "result_cache")
+
+    def __init__(self, build_id: int, validation_rules: Dict[str, List[Dict[str, Any]]], ruleset: CompiledRuleset):
+        self.build_id = build_id
+        self.validation_rules = validation_rules
+        self.ruleset = ruleset
+        self.result_cache = ValidationCache()
+
+
+class RuleRegistry:
+    """
+    Process-wide registry of compiled rule sets.
+
+    Entries are keyed by everything that determines the merged rules (domain config identity,
+    Forge Theory file, suppressed rules, learned-rule source and version), so validators for many
+    users of the same domain share one compiled rule set. Least recently used entries beyond
+    `max_entries` are dropped; superseded versions age out the same way.
+
+    Builds run outside the lock: validators keep using the entry they hold while a new version
+    compiles, and swap to it with a single assignment once it is registered.
+    """
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, RegistryEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_ids = itertools.count(1)
+        self.builds = 0
+
+    def get(self, key: Any, build: Callable[[], Tuple[Dict[str, List[Dict[str, Any]]], CompiledRuleset]]) -> RegistryEntry:
+        """Return the entry for `key`, calling `build()` only if it is not registered yet."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        validation_rules, ruleset = build()
+        with self._lock:
+            # Another thread may have registered the same version meanwhile; keep the first
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            entry = RegistryEntry(next(self._build_ids), validation_rules, ruleset)
+            self.builds += 1
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+RULE_REGISTRY = RuleRegistry()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\safe_regex.py
+P.DE.I Framework - Guarded Regex Execution
+==========================================
+
+Learned rules carry regexes written by the model (`PDEISmartLearner.analyze_corrections`), so
+they cannot be trusted the way hand-written domain rules are. A single catastrophic-backtracking
+pattern would otherwise pin the worker that validates or rewrites a code block.
+
+Key Components:
+1. check_pattern: Static complexity check run when a rule is saved (rejects nested quantifiers).
+2. RegexGuard: Runs learned patterns in a worker process with a per-pattern time budget and
+   restarts the worker when a pattern exceeds it.
+3. get_guard: Process-wide guard shared by the validator and the style signature pass.
+
+Where it fits:
+    `memory.py` calls `check_pattern` before persisting a rule. `rules.py` (via `logic.py`) and
+    `buddai_executive.py` execute learned patterns through the guard, and quarantine any rule the
+    guard reports as over budget.
+"""
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pdei_core.fixes import Edit
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+Span = Tuple[int, int]
+
+# Wall-clock budget for a single pattern over a single text (seconds)
+DEFAULT_BUDGET = 0.5
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+
+
+class UnsafePatternError(ValueError):
+    """Raised when a learned regex is rejected by the static complexity check."""
+
+
+def check_pattern(pattern: str) -> None:
+    """
+    Reject patterns that do not compile or that nest quantifiers, e.g. `(a+)+` or `(\\w*\\s?)*`.
+
+    An unbounded repeat whose body can itself repeat gives the engine exponentially many ways to
+    split the same input, which is the classic catastrophic-backtracking shape.
+    """
+    if not isinstance(pattern, str):
+        raise UnsafePatternError(f"Pattern must be a string, got {type(pattern).__name__}")
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error as e:
+        raise UnsafePatternError(f"Invalid regex {pattern!r}: {e}") from e
+
+    if _has_nested_quantifier(parsed, inside_unbounded=False):
+        raise UnsafePatternError(f"Nested quantifier in {pattern!r}")
+
+
+def is_safe_pattern(pattern: str) -> bool:
+    """Boolean form of `check_pattern`."""
+    try:
+        check_pattern(pattern)
+    except UnsafePatternError:
+        return False
+    return True
+
+
+def _has_nested_quantifier(items: Any, inside_unbounded: bool) -> bool:
+    for op, av in items:
+        if op in _REPEATS:
+            low, high, body = av
+            # A fixed count (`{3}`) splits input one way only; a variable one does not
+            if inside_unbounded and high > 1 and low != high:
+                return True
+            if _has_nested_quantifier(body, inside_unbounded or high == sre_constants.MAXREPEAT):
+                return True
+        elif op is sre_constants.SUBPATTERN:
+            if _has_nested_quantifier(av[-1], inside_unbounded):
+                return True
+        elif op is sre_constants.BRANCH:
+            if any(_has_nested_quantifier(branch, inside_unbounded) for branch in av[1]):
+                return True
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if _has_nested_quantifier(av[1], inside_unbounded):
+                return True
+        elif op is sre_constants.GROUPREF_EXISTS:
+            if any(branch is not None and _has_nested_quantifier(branch, inside_unbounded)
+                   for branch in av[1:]):
+                return True
+        # Atomic groups and possessive repeats never backtrack into their body
+    return False
+
+
+def _worker_main(conn):
+    """Worker loop: answer every item of a request with one message, so the parent can time each."""
+    conn.send(("ready", None))
+    while True:
+        try:
+            op, items, text = conn.recv()
+        except (EOFError, OSError):
+            return
+        for item in items:
+            try:
+                if op == "scan":
+                    conn.send(("ok", [m.span() for m in re.finditer(item, text)]))
+                elif op == "expand":
+                    pattern, replacement = item
+                    conn.send(("ok", [(m.start(), m.end(), m.expand(replacement))
+                                      for m in re.finditer(pattern, text)]))
+                else:
+                    pattern, replacement = item
+                    text = re.sub(pattern, replacement, text)
+                    conn.send(("ok", text))
+            except (re.error, IndexError, TypeError) as e:
+                conn.send(("error", str(e)))
+
+
+class RegexGuard:
+    """
+    Executes untrusted regexes in a worker process.
+
+    Python's `re` has no step counter and cannot be interrupted from another thread, so the budget
+    is enforced on wall-clock time: the worker reports after every pattern, and if a pattern does
+    not report within `budget` seconds the worker is killed and the pattern is reported back as
+    over budget. Remaining patterns are resubmitted to a fresh worker.
+    """
+    def __init__(self, budget: float = DEFAULT_BUDGET):
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._process = None
+        self._conn = None
+
+    def _ensure_worker(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        # Startup time (spawn re-imports this module) must not count against the first pattern
+        parent_conn.recv()
+        self._process, self._conn = process, parent_conn
+
+    def close(self):
+        """Stop the worker process (it is restarted on the next call)."""
+        with self._lock:
+            self._stop_worker()
+
+    def _stop_worker(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+            self._conn.close()
+        self._process, self._conn = None, None
+
+    def _run(self, op: str, items: Sequence[Any], text: str) -> List[Tuple[str, Any]]:
+        """Return one `(status, value)` per item; status is 'ok', 'error' or 'timeout'."""
+        results: List[Tuple[str, Any]] = []
+        with self._lock:
+            while len(results) < len(items):
+                pending = list(items[len(results):])
+                self._ensure_worker()
+                self._conn.send((op, pending, text))
+                for _ in pending:
+                    if not self._conn.poll(self.budget):
+                        self._stop_worker()
+                        results.append(("timeout", None))
+                        break
+                    status, value = self._conn.recv()
+                    results.append((status, value))
+                    if op == "sub" and status == "ok":
+                        text = value
+        return results
+
+    def scan(self, patterns: Sequence[str], text: str) -> Tuple[Dict[str, List[Span]], List[str]]:
+        """
+        Return the `finditer` spans of every pattern that matches `text`, plus the patterns that
+        exceeded the budget. Patterns that fail to compile are logged and treated as no match.
+        """
+        found: Dict[str, List[Span]] = {}
+        exceeded: List[str] = []
+        for pattern, (status, value) in zip(patterns, self._run("scan", patterns, text)):
+            if status == "timeout":
+                exceeded.append(pattern)
+            elif status == "error":
+                logging.warning(f"Skipping invalid regex rule {pattern!r}: {value}")
+            elif value:
+                found[pattern] = [tuple(span) for span in value]
+        return found, exceeded
+
+    def edits(self, pattern: str, replacement: str, text: str) -> Tuple[List[Edit], List[str]]:
+        """
+        Return the `(start, end, expanded replacement)` edit of every match, i.e. what `re.sub`
+        would do, plus the pattern itself if it exceeded the budget (then there are no edits).
+        """
+        (status, value), = self._run("expand", [(pattern, replacement)], text)
+        if status == "timeout":
+            return [], [pattern]
+        if status == "error":
+            logging.warning(f"Skipping invalid regex replacement {pattern!r}: {value}")
+            return [], []
+        return [tuple(e) for e in value], []
+
+    def sub(self, replacements: Sequence[Tuple[str, str]], text: str) -> Tuple[str, List[str]]:
+        """
+        Apply `re.sub` for each `(pattern, replacement)` in order and return the rewritten text plus
+        the patterns that exceeded the budget (those are skipped, the text is left as it was).
+        """
+        exceeded: List[str] = []
+        for (pattern, _), (status, value) in zip(replacements, self._run("sub", replacements, text)):
+            if status == "timeout":
+                exceeded.append(pattern)
+            elif status == "error":
+                logging.warning(f"Skipping invalid regex replacement {pattern!r}: {value}")
+            else:
+                text = value
+        return text, exceeded
+
+
+_GUARD: Optional[RegexGuard] = None
+_GUARD_LOCK = threading.Lock()
+
+
+def get_guard() -> RegexGuard:
+    """Return the process-wide guard (its worker is started lazily on first use)."""
+    global _GUARD
+    with _GUARD_LOCK:
+        if _GUARD is None:
+            _GUARD = RegexGuard()
+        return _GUARD
+
+
+def _reset_after_fork():
+    # A forked child (e.g. a batch validation worker) must not share the parent's worker pipe
+    global _GUARD, _GUARD_LOCK
+    _GUARD = None
+    _GUARD_LOCK = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
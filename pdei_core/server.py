@@ -23,7 +23,7 @@ from typing import Optional, List, Dict, Tuple, Union, Generator
 from fastapi import FastAPI
 import uvicorn
 
-from pdei_core.shared import SERVER_AVAILABLE, DATA_DIR, DB_PATH, MODELS, OLLAMA_HOST, OLLAMA_PORT, APP_NAME
+from pdei_core.shared import SERVER_AVAILABLE, DATA_DIR, DB_PATH, MODELS, OLLAMA_HOST, OLLAMA_PORT, APP_NAME, SOURCE_SUFFIXES
 
 # (Removed duplicate definitions of check_ollama, is_port_available, and main to resolve indentation and duplication errors)
 
@@ -31,12 +31,14 @@ from pdei_core.shared import SERVER_AVAILABLE, DATA_DIR, DB_PATH, MODELS, OLLAMA
 
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import File, UploadFile, Header, WebSocket, WebSocketDisconnect, Request, Response
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, ValidationError
 from urllib.parse import urlparse
 
 from pdei_core.buddai_executive import BuddAI
+from pdei_core.memory import get_pool
+from pdei_core.tuning import MAX_LOOP_RATE_HZ, MAX_RESPONSE_TIME_S, TuningConstraints, optimize_tuning
 
 try:
     import psutil
@@ -66,10 +68,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class TuneRequest(BaseModel):
+    target: float = 1.0
+    response_time_s: float = Field(0.5, gt=0, le=MAX_RESPONSE_TIME_S)
+    max_overshoot: float = 0.0
+    settle_band: float = 0.02
+    loop_rate_hz: float = Field(100.0, gt=0, le=MAX_LOOP_RATE_HZ)
+    candidates: Optional[int] = Field(None, ge=2, le=20_000)
+
 class ChatRequest(BaseModel):
     message: str
     model: Optional[str] = None
     forge_mode: Optional[str] = "2"
+    # Constraints for an optimized Forge Theory tuning; overrides forge_mode
+    tuning: Optional[TuneRequest] = None
 
 class SessionLoadRequest(BaseModel):
     session_id: str
@@ -89,6 +101,14 @@ class FeedbackRequest(BaseModel):
 class ResetGpuRequest(BaseModel):
     pass
 
+class ValidateItem(BaseModel):
+    code: str
+    context: str = ""
+
+class ValidateRequest(BaseModel):
+    items: List[ValidateItem]
+    workers: Optional[int] = Field(None, ge=1)
+
 # Multi-user support
 
 class BuddAIManager:
@@ -156,11 +176,8 @@ async def root(request: Request):
         process = psutil.Process(os.getpid())
         mem_usage = f"{process.memory_info().rss / 1024 / 1024:.0f} MB"
         
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM sessions")
-    total_sessions = cursor.fetchone()[0]
-    conn.close()
+    with get_pool(DB_PATH).connection() as conn:
+        total_sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
 
     return f"""
     <html>
@@ -322,7 +339,7 @@ def validate_upload(file: UploadFile) -> bool:
     if file.content_type not in ALLOWED_TYPES:
         # Fallback: check extension if content_type is generic
         ext = Path(file.filename).suffix.lower()
-        if ext not in ['.zip', '.py', '.ino', '.cpp', '.h', '.js', '.jsx', '.html', '.css']:
+        if ext not in ('.zip',) + SOURCE_SUFFIXES:
             raise ValueError("Invalid file type")
     # Scan for malicious content
     return True
@@ -341,10 +358,14 @@ def safe_extract_zip(zip_path: Path, extract_path: Path):
                 raise ValueError(f"Malicious zip member: {member.filename}")
         zip_ref.extractall(extract_path)
 
+def chat_tuning(tuning: Optional[TuneRequest]) -> Optional[Dict[str, float]]:
+    """Only the constraints the client set, so BuddAI fills in its own defaults."""
+    return tuning.dict(exclude_unset=True) if tuning is not None else None
+
 @app.post("/api/chat")
 async def chat_endpoint(request: ChatRequest, user_id: str = Header("default")):
     server_buddai = buddai_manager.get_instance(user_id)
-    response = server_buddai.chat(request.message, force_model=request.model, forge_mode=request.forge_mode)
+    response = server_buddai.chat(request.message, force_model=request.model, forge_mode=request.forge_mode, tuning=chat_tuning(request.tuning))
     return {"response": response, "message_id": server_buddai.last_generated_id}
 
 @app.websocket("/api/ws/chat")
@@ -357,16 +378,36 @@ async def websocket_endpoint(websocket: WebSocket):
             user_id = data.get("user_id", "default")
             model = data.get("model")
             forge_mode = data.get("forge_mode", "2")
+            try:
+                tuning = chat_tuning(TuneRequest(**data["tuning"]) if data.get("tuning") is not None else None)
+            except (TypeError, ValidationError) as e:
+                # Same token/end framing as a reply, so the client stops waiting
+                await websocket.send_json({"type": "token", "content": f"❌ Invalid tuning constraints: {e}"})
+                await websocket.send_json({"type": "end", "message_id": None})
+                continue
             
             server_buddai = buddai_manager.get_instance(user_id)
             
-            for chunk in server_buddai.chat_stream(user_message, model, forge_mode):
+            for chunk in server_buddai.chat_stream(user_message, model, forge_mode, tuning):
                 await websocket.send_json({"type": "token", "content": chunk})
                 
             await websocket.send_json({"type": "end", "message_id": server_buddai.last_generated_id})
     except WebSocketDisconnect:
         pass
 
+@app.post("/api/validate")
+async def validate_endpoint(req: ValidateRequest, user_id: str = Header("default")):
+    """Validate many code blocks; one NDJSON line per item, in request order."""
+    validator = buddai_manager.get_instance(user_id).validator
+    items = [(item.code, item.context) for item in req.items]
+
+    # Sync generator: Starlette iterates it in a worker thread, so the event loop is never blocked
+    def stream_results():
+        for index, (valid, issues) in enumerate(validator.validate_many(items, workers=req.workers)):
+            yield json.dumps({"index": index, "valid": valid, "issues": issues}) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @app.post("/api/feedback")
 async def feedback_endpoint(req: FeedbackRequest, user_id: str = Header("default")):
     server_buddai = buddai_manager.get_instance(user_id)
@@ -386,6 +427,21 @@ async def metrics_endpoint(user_id: str = Header("default")):
     server_buddai = buddai_manager.get_instance(user_id)
     return server_buddai.metrics.calculate_accuracy()
 
+@app.get("/api/system/validator-stats")
+async def validator_stats_endpoint(user_id: str = Header("default")):
+    server_buddai = buddai_manager.get_instance(user_id)
+    return server_buddai.validator.profile_report()
+
+@app.post("/api/forge/tune")
+def forge_tune_endpoint(req: TuneRequest):
+    """Sweep candidate time constants for the constraints; returns the best k, its metrics and curves."""
+    # Plain def: FastAPI runs the sweep in its threadpool instead of on the event loop
+    try:
+        constraints = TuningConstraints(req.target, req.response_time_s, req.max_overshoot, req.settle_band, req.loop_rate_hz)
+        return optimize_tuning(constraints, req.candidates)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+
 @app.get("/api/system/status")
 async def system_status_endpoint():
     mem_percent = 0
@@ -525,7 +581,7 @@ async def upload_repo(file: UploadFile = File(...), user_id: str = Header("defau
             return {"message": f"✅ Successfully indexed {safe_name}"}
         else:
             # Support single code files by moving them to a folder and indexing
-            if file_location.suffix.lower() in ['.py', '.ino', '.cpp', '.h', '.js', '.jsx', '.html', '.css']:
+            if file_location.suffix.lower() in SOURCE_SUFFIXES:
                 target_dir = uploads_dir / file_location.stem
                 target_dir.mkdir(exist_ok=True)
                 final_path = target_dir / safe_name
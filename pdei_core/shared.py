@@ -62,6 +62,9 @@ try:
 except ImportError:
     SERVER_AVAILABLE = False
 
+# Source files indexed from repositories and checked by the lint CLI
+SOURCE_SUFFIXES = ('.py', '.ino', '.cpp', '.h', '.js', '.jsx', '.html', '.css')
+
 # Shared Patterns
 COMPLEX_TRIGGERS = [
     "multiple modules", "integrate", "combine", "modular", "state machine", "safety", "failsafe", "logic", "protocol", "integration",
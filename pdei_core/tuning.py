@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\tuning.py
+P.DE.I Framework - Forge Theory Tuning Simulator
+================================================
+
+The integration step offers three fixed tunings (k = 0.3 / 0.1 / 0.03). This module picks k for a
+module's actual constraints instead, by simulating the update generated firmware runs every loop:
+
+    value += (target - value) * k          (k = alpha = dt / tau, see `ldr_smoothing` in forge_theory.json)
+
+which after n loops gives `target * (1 - (1 - k)^n)`. Small k is smooth but slow; k above 1
+overshoots and k of 2 or more never settles. Thousands of candidate time constants are
+simulated at once (one NumPy broadcast over candidates x samples), and the gentlest one that
+still meets the response time and overshoot limits wins.
+
+Key Components:
+1. TuningConstraints: Target, response time, overshoot limit, settling band and loop rate.
+2. optimize_tuning: Sweeps candidate tau values, returns the best k/tau, its metrics and the
+   step/decay/growth curves for it.
+3. k_to_tau: Continuous-time constant equivalent to a per-loop k (used for the lookup tables).
+
+Where it fits:
+    `BuddAI.execute_modular_build` uses it when `forge_mode` is "4" (optimized) or a `tuning` dict
+    is supplied (`/api/chat`). `POST /api/forge/tune` in `server.py` exposes it directly.
+"""
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_CANDIDATES = 4096
+# Without NumPy every candidate is simulated in a Python loop
+FALLBACK_CANDIDATES = 256
+# Upper bound on one sweep (loop iterations x candidates); keeps a request from allocating gigabytes
+MAX_SWEEP_CELLS = 20_000_000
+# Bounds on the constraints; API requests are validated against the same limits
+MAX_RESPONSE_TIME_S = 60.0
+MAX_LOOP_RATE_HZ = 100_000.0
+# Samples of curve data returned for the winning tuning
+CURVE_POINTS = 100
+
+
+class TuningConstraints:
+    """What a module needs from its response curve."""
+    __slots__ = ("target", "response_time_s", "max_overshoot", "settle_band", "loop_rate_hz")
+
+    def __init__(self, target: float = 1.0, response_time_s: float = 0.5, max_overshoot: float = 0.0,
+                 settle_band: float = 0.02, loop_rate_hz: float = 100.0):
+        if not all(math.isfinite(value) for value in (target, response_time_s, max_overshoot, settle_band, loop_rate_hz)):
+            raise ValueError("tuning constraints must be finite numbers")
+        if response_time_s <= 0 or loop_rate_hz <= 0 or not 0 < settle_band < 1 or max_overshoot < 0:
+            raise ValueError("response_time_s and loop_rate_hz must be positive, settle_band in (0, 1), max_overshoot >= 0")
+        if target == 0:
+            raise ValueError("target must be non-zero")
+        if response_time_s > MAX_RESPONSE_TIME_S or loop_rate_hz > MAX_LOOP_RATE_HZ:
+            raise ValueError(f"response_time_s must be <= {MAX_RESPONSE_TIME_S:g} and loop_rate_hz <= {MAX_LOOP_RATE_HZ:g}")
+        self.target = float(target)
+        self.response_time_s = float(response_time_s)
+        # Fraction of the step (0.05 = 5 %)
+        self.max_overshoot = float(max_overshoot)
+        self.settle_band = float(settle_band)
+        self.loop_rate_hz = float(loop_rate_hz)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TuningConstraints":
+        fields = {key: float(data[key]) for key in cls.__slots__ if data.get(key) is not None}
+        return cls(**fields)
+
+    @property
+    def dt(self) -> float:
+        return 1.0 / self.loop_rate_hz
+
+
+def k_to_tau(k: float, dt: float) -> float:
+    """Time constant whose exp(-t/tau) matches (1 - k)^n at the loop period (k in (0, 1))."""
+    return -dt / math.log(1.0 - k) if 0 < k < 1 else dt / k
+
+
+def _candidate_taus(constraints: TuningConstraints, count: int) -> List[float]:
+    # From just above the stability limit (k < 2) to ten response times
+    low, high = constraints.dt / 1.99, constraints.response_time_s * 10
+    ratio = (high / low) ** (1.0 / (count - 1))
+    return [low * ratio ** i for i in range(count)]
+
+
+def _sweep(constraints: TuningConstraints, taus: Sequence[float], samples: int) -> Tuple[List[float], List[float]]:
+    """Settling time (inf if never) and overshoot fraction per candidate, for a normalized 0 -> 1 step."""
+    band = constraints.settle_band
+    if np is not None:
+        k = constraints.dt / np.asarray(taus)
+        n = np.arange(samples + 1).reshape(-1, 1)
+        # Rows: loop iterations, columns: candidates
+        response = 1.0 - (1.0 - k) ** n
+        overshoot = np.clip(response.max(axis=0) - 1.0, 0.0, None)
+        outside = np.abs(response - 1.0) > band
+        # Last iteration outside the band; settled from the one after it
+        last_outside = samples - np.argmax(outside[::-1], axis=0)
+        settle = np.where(outside[-1], np.inf, (last_outside + 1) * constraints.dt)
+        settle = np.where(outside.any(axis=0), settle, 0.0)
+        return settle.tolist(), overshoot.tolist()
+
+    settle_times, overshoots = [], []
+    for tau in taus:
+        k = constraints.dt / tau
+        peak, last_outside, value = 0.0, -1, 0.0
+        for n in range(samples + 1):
+            value = 1.0 - (1.0 - k) ** n
+            peak = max(peak, value)
+            if abs(value - 1.0) > band:
+                last_outside = n
+        settle_times.append(math.inf if last_outside == samples else (last_outside + 1) * constraints.dt)
+        overshoots.append(max(0.0, peak - 1.0))
+    return settle_times, overshoots
+
+
+def curves_for(k: float, constraints: TuningConstraints, duration_s: Optional[float] = None) -> Dict[str, List[float]]:
+    """Step (0 -> target), growth (0 -> 1) and decay (1 -> 0) curves of the per-loop update."""
+    duration_s = duration_s or constraints.response_time_s * 2
+    steps = max(1, round(duration_s / constraints.dt))
+    stride = max(1, steps // CURVE_POINTS)
+    n_values = list(range(0, steps + 1, stride))
+    decay = [(1.0 - k) ** n for n in n_values]
+    return {
+        "t": [round(n * constraints.dt, 6) for n in n_values],
+        "step": [constraints.target * (1.0 - d) for d in decay],
+        "growth": [1.0 - d for d in decay],
+        "decay": decay,
+    }
+
+
+def optimize_tuning(constraints: TuningConstraints, candidates: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Sweep candidate time constants and pick the gentlest (smallest k) that settles within the
+    response time with acceptable overshoot. If none does, the fastest-settling candidate within the
+    overshoot limit is returned with `feasible: False`.
+
+    Raises ValueError if the sweep would exceed `MAX_SWEEP_CELLS`.
+    """
+    count = max(2, candidates or (DEFAULT_CANDIDATES if np is not None else FALLBACK_CANDIDATES))
+    # Simulate twice the response time so "never settles" is distinguishable from "settles late"
+    samples = max(2, math.ceil(constraints.response_time_s * 2 / constraints.dt))
+    if (samples + 1) * count > MAX_SWEEP_CELLS:
+        raise ValueError(f"Sweep of {count} candidates over {samples} loop iterations is too large; "
+                         f"lower candidates, response_time_s or loop_rate_hz")
+    taus = _candidate_taus(constraints, count)
+    settle_times, overshoots = _sweep(constraints, taus, samples)
+
+    allowed = [i for i in range(len(taus)) if overshoots[i] <= constraints.max_overshoot + 1e-12]
+    feasible = [i for i in allowed if settle_times[i] <= constraints.response_time_s]
+    if feasible:
+        # taus ascend, so the largest feasible tau is the smoothest response that meets the spec
+        best = feasible[-1]
+    else:
+        best = min(allowed or range(len(taus)), key=lambda i: (settle_times[i], overshoots[i]))
+
+    k = constraints.dt / taus[best]
+    return {
+        "k": k,
+        "tau": k_to_tau(k, constraints.dt),
+        "feasible": bool(feasible),
+        # None: never settles within the simulated window
+        "settling_time_s": settle_times[best] if math.isfinite(settle_times[best]) else None,
+        "overshoot": overshoots[best],
+        "candidates": len(taus),
+        "feasible_candidates": len(feasible),
+        "constraints": {key: getattr(constraints, key) for key in TuningConstraints.__slots__},
+        "curves": curves_for(k, constraints),
+    }
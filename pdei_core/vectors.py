@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+r"""
+C:\Users\gilbe\Documents\GitHub\readme-hub\P.DE.I-framework\pdei_core\vectors.py
+P.DE.I Framework - Semantic Code Index
+======================================
+
+Keyword search only finds code that shares a word with the request. This module embeds every
+indexed function (`repo_functions`, one chunk per function) and finds the ones closest in meaning
+to a request, so the style context gets the most relevant code rather than the first name match.
+
+Key Components:
+1. HashingEmbedder: Default, offline. Feature-hashes code tokens (camelCase and snake_case
+   parts included) with sublinear TF and IDF learned from the indexed functions.
+2. OllamaEmbedder: Uses a local Ollama embedding model (`/api/embed`).
+3. VectorIndex: Unit-length vectors stored as a memory-mapped float16 matrix (a new file per user
+   and rebuild) plus a JSON sidecar; top-k cosine search is one blocked matrix-vector product with
+   NumPy, or a plain Python scan without it. Rebuilt by `index_local_repositories`, or in the
+   background when a search finds it out of date with `repo_index`.
+
+Where it fits:
+    `BuddAI.retrieve_style_context` asks `VectorIndex.search` first and falls back to the FTS5
+    name search (`PDEIMemory.search_repo_index`), including while the index is being rebuilt.
+"""
+import http.client
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pdei_core.memory import PDEIMemory, code_terms, content_hash
+from pdei_core.shared import OLLAMA_HOST, OLLAMA_PORT
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_DIM = 512
+DEFAULT_OLLAMA_MODEL = "nomic-embed-text"
+# Texts per /api/embed request
+OLLAMA_BATCH = 32
+# Characters of each function embedded (long functions are represented by their start)
+MAX_CHUNK_CHARS = 4000
+# Rows per block in the NumPy search (float16 -> float32 conversion happens per block)
+SEARCH_BLOCK_ROWS = 8192
+
+_TOKEN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|\d+')
+
+
+def code_tokens(text: str) -> List[str]:
+    """Lowercased identifiers and numbers, plus their snake_case and camelCase parts."""
+    tokens = []
+    for token in _TOKEN.findall(text):
+        tokens.append(token.lower())
+        if '_' in token:
+            tokens.extend(part.lower() for part in token.split('_') if part)
+    tokens.extend(code_terms(text).split())
+    return tokens
+
+
+class HashingEmbedder:
+    """Feature hashing of code tokens, weighted by sublinear TF and IDF over the indexed functions."""
+    __slots__ = ('dim', 'idf')
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+        self.idf: Optional[List[float]] = None
+
+    @property
+    def name(self) -> str:
+        return f"hashing-{self.dim}"
+
+    def fresh(self) -> "HashingEmbedder":
+        """An unfitted embedder with the same settings (a rebuild fits it while searches use this one)."""
+        return HashingEmbedder(self.dim)
+
+    def _buckets(self, text: str) -> Dict[Tuple[int, float], int]:
+        """Token counts keyed by (bucket, sign)."""
+        counts: Dict[Tuple[int, float], int] = {}
+        for token in code_tokens(text):
+            # crc32 is stable across processes (hash() is salted); the top bit picks the sign
+            h = zlib.crc32(token.encode('utf-8'))
+            key = (h % self.dim, 1.0 if h & 0x80000000 else -1.0)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def fit(self, texts: Sequence[str]):
+        """Learn IDF weights per bucket."""
+        df = [0] * self.dim
+        for text in texts:
+            for bucket in {i for i, _ in self._buckets(text)}:
+                df[bucket] += 1
+        n = len(texts)
+        self.idf = [math.log((1 + n) / (1 + d)) + 1.0 for d in df]
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vec = [0.0] * self.dim
+            for (i, sign), count in self._buckets(text).items():
+                vec[i] += sign * (1.0 + math.log(count)) * (self.idf[i] if self.idf else 1.0)
+            vectors.append(vec)
+        return vectors
+
+    def state(self) -> Dict[str, Any]:
+        return {"idf": self.idf}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.idf = state.get("idf")
+
+
+class OllamaEmbedder:
+    """Embeddings from a local Ollama model (`POST /api/embed`)."""
+    __slots__ = ('model', 'host', 'port', 'timeout')
+
+    def __init__(self, model: str = DEFAULT_OLLAMA_MODEL, host: str = OLLAMA_HOST, port: int = OLLAMA_PORT, timeout: float = 120):
+        self.model = model
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    @property
+    def name(self) -> str:
+        return f"ollama:{self.model}"
+
+    def fresh(self) -> "OllamaEmbedder":
+        return OllamaEmbedder(self.model, self.host, self.port, self.timeout)
+
+    def fit(self, texts: Sequence[str]):
+        pass
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), OLLAMA_BATCH):
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                body = json.dumps({"model": self.model, "input": list(texts[start:start + OLLAMA_BATCH])})
+                conn.request("POST", "/api/embed", body, {"Content-Type": "application/json"})
+                response = conn.getresponse()
+                data = json.loads(response.read().decode('utf-8'))
+            finally:
+                conn.close()
+            if response.status != 200:
+                raise OSError(f"Ollama /api/embed returned {response.status}: {data.get('error', data)}")
+            vectors.extend(data["embeddings"])
+        return vectors
+
+    def state(self) -> Dict[str, Any]:
+        return {}
+
+    def load_state(self, state: Dict[str, Any]):
+        pass
+
+
+def make_embedder(spec: Optional[str] = None):
+    """Embedder from a config value: "hashing" (default), "ollama" or "ollama:<model>"."""
+    spec = (spec or "hashing").strip()
+    if spec == "hashing":
+        return HashingEmbedder()
+    if spec == "ollama" or spec.startswith("ollama:"):
+        return OllamaEmbedder(spec.split(":", 1)[1] if ":" in spec else DEFAULT_OLLAMA_MODEL)
+    logging.warning(f"Unknown embedder '{spec}', using hashing")
+    return HashingEmbedder()
+
+
+def _normalize(vec: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vec))
+    return [x / norm for x in vec] if norm else list(vec)
+
+
+class VectorIndex:
+    """
+    Function-level embedding index over one user's `repo_functions`.
+
+    Files: `<directory>/<user>-<hash>.<generation>.f16` (rows x dim little-endian float16, unit
+    length) and `<user>-<hash>.json` (embedder, dim, matrix file name, row -> repo_index id, embedder
+    state, repo_index fingerprint).
+
+    `search` never embeds the corpus itself: a missing or stale index returns no results and is
+    rebuilt on a background thread (callers fall back to keyword search meanwhile). A rebuild fits a
+    fresh embedder and writes a new matrix file, then swaps embedder, metadata and matrix together;
+    searches already running finish on the old snapshot (its file is deleted by this rebuild, or by
+    a later one where a mapped file cannot be deleted).
+    """
+
+    def __init__(self, memory: PDEIMemory, embedder=None, directory: Optional[Path] = None):
+        self.memory = memory
+        self.embedder = embedder or HashingEmbedder()
+        self.directory = Path(directory) if directory else memory.db_path.parent / "vectors"
+        # Readable prefix plus a hash, so IDs like "a.b" and "a_b" never share files
+        self.stem = f"{re.sub(r'[^A-Za-z0-9_-]', '_', memory.user_id)[:32]}-{content_hash(memory.user_id)[:12]}"
+        self.meta_path = self.directory / f"{self.stem}.json"
+        self._lock = threading.Lock()
+        # One rebuild at a time per index (each removes the matrix files before its own)
+        self._rebuild_lock = threading.Lock()
+        self._meta: Optional[Dict[str, Any]] = None
+        self._matrix = None
+        self._rebuild_thread: Optional[threading.Thread] = None
+
+    def _fingerprint(self, conn) -> List[int]:
+        count, max_id = conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM repo_index WHERE user_id = ?", (self.memory.user_id,)
+        ).fetchone()
+        return [count, max_id]
+
+    def rebuild(self) -> int:
+        """Embed every indexed function and write a new generation of the index. Returns the number of rows."""
+        with self._rebuild_lock:
+            return self._rebuild()
+
+    def _rebuild(self) -> int:
+        with self.memory.connection() as conn:
+            # Read before the rows: a change made meanwhile leaves the index stale, not wrongly current
+            fingerprint = self._fingerprint(conn)
+            rows = conn.execute(
+                "SELECT id, function_name, repo_name, content FROM repo_functions WHERE user_id = ? ORDER BY id",
+                (self.memory.user_id,)
+            ).fetchall()
+        texts = [f"{func} {repo}\n{(content or '')[:MAX_CHUNK_CHARS]}" for _, func, repo, content in rows]
+        # Searches keep using the current embedder (and its IDF) until the swap below
+        embedder = self.embedder.fresh()
+        embedder.fit(texts)
+        vectors = embedder.embed(texts) if texts else []
+        dim = len(vectors[0]) if vectors else getattr(embedder, 'dim', 0)
+
+        # A new file per rebuild: the current one may still be mapped by a search (and on Windows a
+        # mapped file can be neither replaced nor deleted)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        matrix_path = self.directory / f"{self.stem}.{uuid.uuid4().hex[:12]}.f16"
+        tmp = matrix_path.with_suffix(".tmp")
+        if np is not None and vectors:
+            matrix = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            (matrix / norms).astype('<f2').tofile(tmp)
+        else:
+            with open(tmp, 'wb') as f:
+                for vec in vectors:
+                    f.write(struct.pack(f'<{dim}e', *_normalize(vec)))
+        os.replace(tmp, matrix_path)
+        meta = {
+            "embedder": embedder.name,
+            "dim": dim,
+            "matrix": matrix_path.name,
+            "ids": [row[0] for row in rows],
+            "state": embedder.state(),
+            "fingerprint": fingerprint,
+        }
+        tmp = self.meta_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(meta), encoding='utf-8')
+
+        with self._lock:
+            os.replace(tmp, self.meta_path)
+            self.embedder, self._meta, self._matrix = embedder, meta, None
+        self._remove_old_matrices(matrix_path)
+        return len(rows)
+
+    def _remove_old_matrices(self, current: Path):
+        """Delete earlier generations; one still mapped by a search (Windows) is left for the next rebuild."""
+        # Also matches the single `<stem>.f16` of indexes written before generations
+        for path in self.directory.glob(f"{self.stem}*.f16"):
+            if path != current:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def rebuild_in_background(self) -> bool:
+        """Start `rebuild` on a daemon thread unless one is running. Returns True if one was started."""
+        with self._lock:
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return False
+            self._rebuild_thread = threading.Thread(target=self._rebuild_quietly, name="pdei-vector-rebuild", daemon=True)
+            self._rebuild_thread.start()
+            return True
+
+    def _rebuild_quietly(self):
+        try:
+            self.rebuild()
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Vector index rebuild failed: {e}")
+
+    def _is_current(self, meta: Optional[Dict[str, Any]]) -> bool:
+        if meta is None or meta.get("embedder") != self.embedder.name:
+            return False
+        with self.memory.connection() as conn:
+            return meta.get("fingerprint") == self._fingerprint(conn)
+
+    def _load(self) -> Optional[Tuple[Dict[str, Any], Any, Any]]:
+        """
+        A consistent (meta, matrix, embedder) snapshot of the current index, or None if it is empty,
+        missing or stale (a stale or missing index is rebuilt in the background).
+        """
+        with self._lock:
+            meta = self._meta
+        if meta is None and self.meta_path.exists():
+            try:
+                meta = json.loads(self.meta_path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                meta = None
+            # Written by an older version, or its matrix was removed by another process's rebuild
+            if meta is not None and not (self.directory / meta.get("matrix", "")).is_file():
+                meta = None
+        if not self._is_current(meta):
+            self.rebuild_in_background()
+            return None
+        if not meta["ids"]:
+            return None
+        with self._lock:
+            if self._meta is not meta:
+                if self._meta is not None:
+                    # A rebuild finished meanwhile; use it next time
+                    return None
+                embedder = self.embedder.fresh()
+                embedder.load_state(meta.get("state", {}))
+                self.embedder, self._meta = embedder, meta
+            if self._matrix is None:
+                matrix_path = self.directory / meta["matrix"]
+                try:
+                    if np is not None:
+                        self._matrix = np.memmap(matrix_path, dtype='<f2', mode='r', shape=(len(meta["ids"]), meta["dim"]))
+                    else:
+                        with open(matrix_path, 'rb') as f:
+                            self._matrix = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except FileNotFoundError:
+                    # Superseded by another process's rebuild; reload its metadata next time
+                    self._meta = None
+                    return None
+            return self._meta, self._matrix, self.embedder
+
+    @staticmethod
+    def _scores(meta: Dict[str, Any], matrix, query: List[float]) -> List[Tuple[float, int]]:
+        dim, n = meta["dim"], len(meta["ids"])
+        if np is not None:
+            q = np.asarray(query, dtype=np.float32)
+            scores = np.empty(n, dtype=np.float32)
+            for start in range(0, n, SEARCH_BLOCK_ROWS):
+                block = matrix[start:start + SEARCH_BLOCK_ROWS]
+                scores[start:start + len(block)] = block.astype(np.float32) @ q
+            return scores
+        row_format = struct.Struct(f'<{dim}e')
+        return [sum(a * b for a, b in zip(row_format.unpack_from(matrix, i * row_format.size), query))
+                for i in range(n)]
+
+    def search(self, query: str, k: int = 2, min_score: float = 0.0) -> List[Dict]:
+        """
+        Top-k functions by cosine similarity to `query` (best first), with their code. Empty while
+        the index is missing, stale or being rebuilt.
+        """
+        try:
+            snapshot = self._load()
+            if snapshot is None:
+                return []
+            meta, matrix, embedder = snapshot
+            q = _normalize(embedder.embed([query])[0])
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Vector search unavailable: {e}")
+            return []
+        if len(q) != meta["dim"]:
+            return []
+
+        scores = self._scores(meta, matrix, q)
+        if np is not None:
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            ranked = sorted(((float(scores[i]), int(i)) for i in top), reverse=True)
+        else:
+            ranked = sorted(((s, i) for i, s in enumerate(scores)), reverse=True)[:k]
+        ranked = [(score, meta["ids"][i]) for score, i in ranked if score > min_score]
+        if not ranked:
+            return []
+
+        ids = [row_id for _, row_id in ranked]
+        with self.memory.connection() as conn:
+            rows = {r[0]: r for r in conn.execute(
+                f"SELECT id, repo_name, file_path, function_name, content FROM repo_functions WHERE id IN ({','.join('?' * len(ids))})",
+                ids
+            )}
+        return [{"repo": rows[row_id][1], "file_path": rows[row_id][2], "function": rows[row_id][3],
+                 "content": rows[row_id][4], "score": score}
+                for score, row_id in ranked if row_id in rows]
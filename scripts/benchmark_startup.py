@@ -0,0 +1,94 @@
+import time
+import argparse
+import json
+import logging
+import pickle
+import statistics
+import sys
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core.composite import merge_domain_configs
+from pdei_core.logic import PDEIValidator
+from pdei_core.rules import RULE_REGISTRY, CompiledRuleset
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("PDEI-Startup-Benchmark")
+
+CONFIG_DIR = PROJECT_ROOT / "domain_configs"
+
+
+def _median_ms(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def measure(name: str, load_config, runs: int) -> dict:
+    """Cold-start phases of one validator, plus what loading a pickled ruleset would cost instead."""
+    config = load_config()
+    validator = PDEIValidator(config)
+    rules = validator._load_validation_rules()
+    snapshot = pickle.dumps(CompiledRuleset(rules), protocol=pickle.HIGHEST_PROTOCOL)
+
+    def cold_start():
+        # Every run is a cold start as far as the in-process registry is concerned
+        RULE_REGISTRY.clear()
+        PDEIValidator(load_config())
+
+    return {
+        "domain": name,
+        "parse": _median_ms(load_config, runs),
+        "merge": _median_ms(validator._load_validation_rules, runs),
+        "compile": _median_ms(lambda: CompiledRuleset(rules), runs),
+        "unpickle": _median_ms(lambda: pickle.loads(snapshot), runs),
+        "snapshot_kb": len(snapshot) / 1024,
+        "total": _median_ms(cold_start, runs),
+    }
+
+
+def _read(path: Path) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def benchmark(domains: list, runs: int = 20) -> None:
+    """Time each phase of building a validator for each domain (and all of them combined)."""
+    paths = []
+    for name in domains:
+        path = CONFIG_DIR / f"{name}.json"
+        if path.exists():
+            paths.append(path)
+        else:
+            logger.warning(f"Skipping unknown domain '{name}'")
+
+    results = [measure(path.stem, lambda path=path: _read(path), runs) for path in paths]
+    if len(paths) > 1:
+        results.append(measure("composite", lambda: merge_domain_configs({p.stem: _read(p) for p in paths}), runs))
+    RULE_REGISTRY.clear()
+
+    print("-" * 86)
+    print(f"{'domain':<14} {'parse ms':>9} {'merge ms':>9} {'compile ms':>11} {'unpickle ms':>12} {'snapshot KB':>12} {'total ms':>9}")
+    for r in results:
+        print(f"{r['domain'][:14]:<14} {r['parse']:>9.2f} {r['merge']:>9.2f} {r['compile']:>11.2f} "
+              f"{r['unpickle']:>12.2f} {r['snapshot_kb']:>12.1f} {r['total']:>9.2f}")
+    print("-" * 86)
+    slower = [r["domain"] for r in results if r["unpickle"] >= r["compile"]]
+    print(f"📊 Loading a pickled ruleset is slower than compiling it for {len(slower)}/{len(results)} configurations")
+
+
+if __name__ == "__main__":
+    default_domains = sorted(p.stem for p in CONFIG_DIR.glob("*.json") if p.stem != "forge_theory")
+    parser = argparse.ArgumentParser(description="Benchmark P.DE.I validator cold start, phase by phase")
+    parser.add_argument("--domains", nargs="+", default=default_domains, help="Domain configs to load (names in domain_configs/)")
+    parser.add_argument("--runs", type=int, default=20, help="Runs per measurement (median is reported)")
+
+    args = parser.parse_args()
+    benchmark(args.domains, args.runs)
@@ -1,10 +1,15 @@
 import os
 import sys
-import sqlite3
 import logging
 import argparse
 from pathlib import Path
 
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core.memory import get_pool, unpack_text
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("PDEI-Trainer")
@@ -17,18 +22,17 @@ def load_training_data(db_path):
         return []
 
     logger.info(f"📦 Loading data from {db_path}...")
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Fetch corrections: We want to learn from mistakes
-    # Input: Original Code + Context
-    # Output: Corrected Code
-    cursor.execute("SELECT original_code, corrected_code, context FROM corrections")
-    rows = cursor.fetchall()
-    conn.close()
+    # Pooled connection: the schema's views and triggers call SQL functions registered there
+    with get_pool(db_path).connection() as conn:
+        # Fetch corrections: We want to learn from mistakes
+        # Input: Original Code + Context
+        # Output: Corrected Code
+        rows = conn.execute("SELECT original_code, corrected_code, context FROM corrections").fetchall()
 
     dataset = []
     for orig, fixed, ctx in rows:
+        # Large code samples may be stored compressed
+        orig, fixed = unpack_text(orig), unpack_text(fixed)
         # Format for instruction tuning
         prompt = f"Context: {ctx}\nFix the following code:\n```\n{orig}\n```"
         response = f"```\n{fixed}\n```"
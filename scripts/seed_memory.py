@@ -1,7 +1,13 @@
-import sqlite3
 import os
+import sys
 from pathlib import Path
 
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core.memory import PDEIMemory
+
 def seed_database():
     # Define path relative to project root
     root_dir = Path(__file__).parent.parent
@@ -15,27 +21,15 @@ def seed_database():
 
     print(f"🌱 Seeding database at: {db_path}")
     
-    conn = sqlite3.connect(str(db_path))
-    cursor = conn.cursor()
+    # Creates (or upgrades) the full schema; its SQL functions only exist on pooled connections
+    memory = PDEIMemory(db_path)
 
-    # Create table if not exists
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS corrections (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            original_code TEXT,
-            corrected_code TEXT,
-            context TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
     # Check if data exists
-    cursor.execute("SELECT count(*) FROM corrections")
-    count = cursor.fetchone()[0]
+    with memory.connection() as conn:
+        count = conn.execute("SELECT count(*) FROM corrections").fetchone()[0]
     
     if count > 0:
         print(f"ℹ️  Database already contains {count} records. Skipping seed.")
-        conn.close()
         return
 
     # Sample Data: Forge Theory Violations -> Fixes
@@ -53,13 +47,9 @@ def seed_database():
     ]
 
     print(f"📝 Inserting {len(samples)} sample correction records...")
-    cursor.executemany(
-        "INSERT INTO corrections (original_code, corrected_code, context) VALUES (?, ?, ?)",
-        samples
-    )
+    for original, corrected, context in samples:
+        memory.save_correction(original, corrected, "Sample data", context)
     
-    conn.commit()
-    conn.close()
     print("✅ Database seeded successfully.")
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core.ast_rules import compile_ast_check, parse_python
+from pdei_core.logic import PDEIValidator
+
+AUDIT_RULE = {
+    "id": "audit_trail_header", "severity": "error", "trigger": ["def ", "class "],
+    "required_pattern": "@audit_log", "auto_fix": "inject_audit_header",
+    "ast": {"node": ["FunctionDef", "ClassDef"], "predicate": "missing_decorator", "args": {"name": "audit_log"}},
+}
+
+
+def make_validator(*rules):
+    return PDEIValidator({"domain": "test", "validation_rules": {"style": list(rules)}})
+
+
+class TestParsing(unittest.TestCase):
+    def test_fragments_do_not_parse(self):
+        """Test invalid Python yields None instead of raising."""
+        self.assertIsNone(parse_python("def process_data():"))
+        self.assertIsNotNone(parse_python("def process_data():\n    pass"))
+
+    def test_offsets_count_characters(self):
+        """Test AST byte columns map to character offsets on non-ASCII lines."""
+        code = "s = 'äö'; x = 1\n"
+        parsed = parse_python(code)
+        assign = parsed.tree.body[1]
+        self.assertEqual(parsed.span(assign), (code.index("x"), code.index("x") + 5))
+
+    def test_invalid_specs_are_ignored(self):
+        """Test unknown node types, predicates and missing args disable the AST check."""
+        self.assertIsNone(compile_ast_check({"node": "NoSuchNode"}))
+        self.assertIsNone(compile_ast_check({"node": "FunctionDef", "predicate": "no_such_predicate"}))
+        self.assertIsNone(compile_ast_check({"node": "FunctionDef", "predicate": "missing_decorator"}))
+        self.assertIsNotNone(compile_ast_check({"node": "ExceptHandler", "predicate": "bare_except"}))
+
+
+class TestAstValidation(unittest.TestCase):
+    def test_each_undecorated_definition_is_reported(self):
+        """Test one decorated function does not satisfy the rule for the others."""
+        code = "@audit_log\ndef a():\n    pass\n\ndef b():\n    pass\n"
+        valid, issues = make_validator(AUDIT_RULE).validate(code)
+        self.assertFalse(valid)
+        self.assertEqual([i['line'] for i in issues], [5])
+
+    def test_definitions_in_strings_are_ignored(self):
+        """Test 'def ' inside a string literal is not a definition."""
+        valid, issues = make_validator(AUDIT_RULE).validate('msg = "def helper(): pass"\n')
+        self.assertTrue(valid)
+
+    def test_fragment_falls_back_to_literal_fields(self):
+        """Test unparsable blocks are still checked with the rule's substring fields."""
+        validator = make_validator(AUDIT_RULE)
+        self.assertFalse(validator.validate("def process_data():")[0])
+        self.assertTrue(validator.validate("@audit_log\ndef process():")[0])
+
+    def test_rule_without_literal_fields_skips_fragments(self):
+        """Test an AST-only rule reports nothing (not its trigger) when the block does not parse."""
+        rule = {"id": "bare_except", "severity": "error", "trigger": ["except"],
+                "ast": {"node": "ExceptHandler", "predicate": "bare_except"}}
+        validator = make_validator(rule)
+        self.assertTrue(validator.validate("try:\n    x()\nexcept:")[0])
+        valid, issues = validator.validate("try:\n    x()\nexcept:\n    pass\n")
+        self.assertFalse(valid)
+        self.assertEqual(issues[0]['line'], 3)
+
+    def test_non_python_blocks_are_not_parsed(self):
+        """Test C code never reaches the AST rules."""
+        rule = {"id": "calls_delay", "severity": "error",
+                "ast": {"node": "Call", "predicate": "calls", "args": {"names": "delay"}}}
+        validator = make_validator(rule)
+        self.assertTrue(validator.validate("#include <Arduino.h>\nvoid loop() { delay(10); }")[0])
+        self.assertFalse(validator.validate("import time\ntime.delay(10)\n")[0])
+
+
+class TestAstFixes(unittest.TestCase):
+    def test_decorator_goes_above_existing_decorators(self):
+        """Test the audit header is inserted above other decorators, at method indentation."""
+        validator = make_validator(AUDIT_RULE)
+        code = "@audit_log\nclass Lab:\n    @staticmethod\n    def run():\n        pass\n"
+        valid, issues = validator.validate(code)
+        fixed = validator.auto_fix(code, issues)
+        self.assertEqual(fixed, "@audit_log\nclass Lab:\n    @audit_log\n    @staticmethod\n    def run():\n        pass\n")
+        self.assertTrue(validator.validate(fixed)[0])
+
+    def test_commented_decorator_is_not_trusted(self):
+        """Test a commented-out @audit_log above a function still gets the real decorator."""
+        validator = make_validator(AUDIT_RULE)
+        code = "# @audit_log\ndef run():\n    pass\n"
+        valid, issues = validator.validate(code)
+        self.assertFalse(valid)
+        self.assertEqual(validator.auto_fix(code, issues), "# @audit_log\n@audit_log\ndef run():\n    pass\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
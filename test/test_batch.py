@@ -0,0 +1,73 @@
+import unittest
+import shutil
+import sys
+import uuid
+from pathlib import Path
+from unittest import mock
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core import batch
+from pdei_core.batch import MIN_POOL_ITEMS
+from pdei_core.logic import PDEIValidator
+from pdei_core.memory import PDEIMemory
+
+CONFIG = {
+    "domain": "test",
+    "validation_rules": {
+        "safety": [{"id": "no_delay", "severity": "error", "trigger": ["motor"], "forbidden": ["delay("]}]
+    }
+}
+
+
+class TestValidateMany(unittest.TestCase):
+    def setUp(self):
+        self.items = [(f"delay({i}); // item {i}", "motor" if i % 2 else "") for i in range(MIN_POOL_ITEMS * 2)]
+
+    def test_pool_matches_inline(self):
+        """Test pooled results equal per-item validate() results, in input order."""
+        validator = PDEIValidator(CONFIG)
+        expected = [validator.validate(code, context) for code, context in self.items]
+        validator.result_cache.clear()
+        self.assertEqual(list(validator.validate_many(self.items, workers=2)), expected)
+
+    def test_cache_hits_skip_pool(self):
+        """Test a repeated batch is served from the parent's result cache."""
+        validator = PDEIValidator(CONFIG)
+        first = list(validator.validate_many(self.items, workers=2))
+        hits = validator.result_cache.hits
+        self.assertEqual(list(validator.validate_many(self.items, workers=2)), first)
+        self.assertEqual(validator.result_cache.hits - hits, len(self.items))
+
+    def test_workers_capped_and_pool_shared(self):
+        """Test a worker count above the CPU count is clamped, and one validator keeps one pool."""
+        validator = PDEIValidator(CONFIG)
+        expected = [validator.validate(code, context) for code, context in self.items]
+        validator.result_cache.clear()
+        with mock.patch("pdei_core.logic.os.cpu_count", return_value=2):
+            self.assertEqual(list(validator.validate_many(self.items, workers=500)), expected)
+            pool = batch._POOLS[validator._pool_key()]
+            validator.result_cache.clear()
+            list(validator.validate_many(self.items, workers=3))
+        self.assertEqual(pool.workers, 2)
+        self.assertIs(batch._POOLS[validator._pool_key()], pool)
+
+    def test_workers_load_learned_rules(self):
+        """Test pool workers rebuild the validator with the same memory-backed learned rules."""
+        test_dir = PROJECT_ROOT / "test_sandbox_batch"
+        test_dir.mkdir(exist_ok=True)
+        try:
+            memory = PDEIMemory(test_dir / f"test_{uuid.uuid4().hex}.db")
+            memory.save_rule("Use log()", r"Serial\.println", "log", 0.9, "test")
+            validator = PDEIValidator(CONFIG, memory)
+            items = [(f"Serial.println({i});", "") for i in range(MIN_POOL_ITEMS)]
+            results = list(validator.validate_many(items, workers=2))
+            self.assertTrue(all(issues and issues[0]['id'] == "learned_0" for _, issues in results))
+        finally:
+            shutil.rmtree(test_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
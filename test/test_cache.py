@@ -0,0 +1,85 @@
+import unittest
+import shutil
+import sys
+import uuid
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core.cache import ValidationCache
+from pdei_core.logic import PDEIValidator
+from pdei_core.memory import PDEIMemory
+
+CONFIG = {
+    "domain": "test",
+    "validation_rules": {
+        "safety": [{"id": "no_delay", "severity": "error", "trigger": ["motor"], "forbidden": ["delay("]}]
+    }
+}
+
+
+class TestValidationCache(unittest.TestCase):
+    def test_lru_eviction_respects_byte_cap(self):
+        """Test that the least recently used entry is evicted once the cap is exceeded."""
+        issue = [{"id": "x", "message": "m" * 100}]
+        cache = ValidationCache(max_bytes=1000)
+        for key in ("a", "b", "c"):
+            cache.put(key, (False, issue))
+        cache.get("a")
+        cache.put("d", (False, issue))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertLessEqual(cache.stats()["bytes"], 1000)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_key_normalizes_context_case(self):
+        """Test context case does not split cache entries, while code and version do."""
+        key = ValidationCache.make_key("code", "Motor", (0, 0))
+        self.assertEqual(key, ValidationCache.make_key("code", "motor", (0, 0)))
+        self.assertNotEqual(key, ValidationCache.make_key("code ", "motor", (0, 0)))
+        self.assertNotEqual(key, ValidationCache.make_key("code", "motor", (0, 1)))
+        self.assertNotEqual(key, ValidationCache.make_key("code", "motor", (0, 0), "c"))
+
+
+class TestValidatorResultCache(unittest.TestCase):
+    def test_repeat_validation_hits_cache(self):
+        """Test identical code and context are served from the cache with equal results."""
+        v = PDEIValidator(CONFIG)
+        hits, misses = v.result_cache.hits, v.result_cache.misses
+        first = v.validate("delay(100); // repeat", "Motor control")
+        second = v.validate("delay(100); // repeat", "motor CONTROL")
+        self.assertEqual(first, second)
+        self.assertFalse(second[0])
+        self.assertEqual((v.result_cache.hits - hits, v.result_cache.misses - misses), (1, 1))
+
+    def test_cached_issues_are_copies(self):
+        """Test mutating returned issues does not corrupt later cache hits."""
+        v = PDEIValidator(CONFIG)
+        _, issues = v.validate("delay(100);", "motor")
+        issues[0]['message'] = "changed"
+        issues[0]['span'][0] = 99
+        _, again = v.validate("delay(100);", "motor")
+        self.assertNotEqual(again[0]['message'], "changed")
+        self.assertEqual(again[0]['span'], [0, 6])
+
+    def test_new_learned_rule_invalidates(self):
+        """Test that saving a learned rule bumps the ruleset version and is applied."""
+        test_dir = PROJECT_ROOT / "test_sandbox_cache"
+        test_dir.mkdir(exist_ok=True)
+        try:
+            memory = PDEIMemory(test_dir / f"test_{uuid.uuid4().hex}.db")
+            v = PDEIValidator(CONFIG, memory)
+            self.assertEqual(v.validate("Serial.println(x);")[1], [])
+
+            memory.save_rule("Use log()", r"Serial\.println", "log", 0.9, "test")
+            _, issues = v.validate("Serial.println(x);")
+            self.assertEqual([i['id'] for i in issues], ["learned_0"])
+            self.assertEqual(v.rules_version[1], memory.rules_version)
+        finally:
+            shutil.rmtree(test_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import sys
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core import logic
+from pdei_core.composite import CompositeValidator, merge_domain_configs
+
+CONFIG_DIR = PROJECT_ROOT / "domain_configs"
+PATHS = [str(CONFIG_DIR / f"{name}.json") for name in ("embedded", "web_dev", "cybersecurity")]
+
+# Touches all three domains and the Forge Theory rules
+MIXED_CODE = """
+void loop() { delay(100); }
+var api_key = "sk-live";
+query = f"SELECT * FROM users WHERE id = {uid}"
+"""
+
+
+class TestMergeDomainConfigs(unittest.TestCase):
+    def test_rules_are_namespaced_and_tagged(self):
+        """Test every rule gets a `<domain>.<id>` ID, its base ID and its domain, without mutating the input."""
+        web = {"domain": "web_dev", "validation_rules": {"style": [{"id": "no_var", "trigger": ["var "]}]}}
+        sec = {"domain": "cybersecurity", "validation_rules": {"style": [{"id": "no_var", "trigger": ["var "]}]}}
+        merged = merge_domain_configs({"web_dev": web, "cybersecurity": sec})
+        rules = merged["validation_rules"]["style"]
+        self.assertEqual([r["id"] for r in rules], ["web_dev.no_var", "cybersecurity.no_var"])
+        self.assertEqual({r["base_id"] for r in rules}, {"no_var"})
+        self.assertEqual(merged["domains"], ["web_dev", "cybersecurity"])
+        self.assertEqual(web["validation_rules"]["style"][0]["id"], "no_var")
+
+    def test_suppression(self):
+        """Test namespaced entries suppress one domain's rule and bare IDs suppress it everywhere."""
+        rule = {"id": "no_var", "trigger": ["var "]}
+        domains = {"a": {"validation_rules": {"style": [rule]}}, "b": {"validation_rules": {"style": [rule]}}}
+        ids = lambda merged: [r["id"] for r in merged["validation_rules"]["style"]]
+        self.assertEqual(ids(merge_domain_configs(domains, ["a.no_var"])), ["b.no_var"])
+        self.assertEqual(ids(merge_domain_configs(domains, ["no_var"])), [])
+        merged = merge_domain_configs(domains, ["forge_theory.decay_negative_exponent"])
+        self.assertIn("decay_negative_exponent", merged["suppressed_rules"])
+
+
+class TestCompositeValidator(unittest.TestCase):
+    def test_single_pass_matches_separate_validators(self):
+        """Test one composite pass finds what one validator per domain finds, tagged by domain."""
+        validator = CompositeValidator.from_paths(PATHS)
+        _, issues = validator.validate(MIXED_CODE, context="esp32 motor")
+        found = {(i["domain"], i["id"]) for i in issues}
+        self.assertIn(("cybersecurity", "cybersecurity.hardcoded_secrets"), found)
+        self.assertIn(("cybersecurity", "cybersecurity.sql_injection"), found)
+        self.assertIn(("web_dev", "web_dev.no_var"), found)
+
+        expected = set()
+        for path in PATHS:
+            with open(path, 'r', encoding='utf-8') as f:
+                single = logic.PDEIValidator(json.load(f))
+            _, single_issues = single.validate(MIXED_CODE, context="esp32 motor")
+            expected |= {(i["id"], i["line"]) for i in single_issues}
+        # Forge Theory rules keep their bare IDs
+        composite = {(i["id"].split(".", 1)[-1], i["line"]) for i in issues}
+        self.assertEqual(composite, expected)
+
+    def test_domain_rule_still_overrides_forge_rule(self):
+        """Test a namespaced domain rule replaces the Forge Theory rule with the same base ID."""
+        validator = CompositeValidator.from_paths(PATHS)
+        ids = [r["id"] for r in validator.validation_rules["formulas"]]
+        self.assertIn("embedded.decay_negative_exponent", ids)
+        self.assertNotIn("decay_negative_exponent", ids)
+        self.assertTrue(all(r["domain"] in ("embedded", "forge_theory") for r in validator.validation_rules["formulas"]))
+
+    def test_member_config_edit_is_hot_reloaded(self):
+        """Test editing one member file swaps in its new rules without losing the others."""
+        with tempfile.TemporaryDirectory() as tmp:
+            web_path = Path(tmp) / "web_dev.json"
+            web_path.write_text(json.dumps({"domain": "web_dev", "validation_rules": {"style": [
+                {"id": "no_var", "severity": "error", "trigger": ["var "], "forbidden": ["var "]}]}}), encoding='utf-8')
+            validator = CompositeValidator.from_paths([web_path, PATHS[2]])
+            self.assertIn("web_dev.no_var", [i["id"] for i in validator.validate("var x = 1;")[1]])
+
+            web_path.write_text(json.dumps({"domain": "web_dev", "validation_rules": {"style": []}}), encoding='utf-8')
+            stamp = time.time() + 5
+            os.utime(web_path, (stamp, stamp))
+            validator._next_reload_check = 0
+            _, issues = validator.validate("var x = 1;\napi_key = \"sk-1\"")
+            ids = [i["id"] for i in issues]
+            self.assertNotIn("web_dev.no_var", ids)
+            self.assertIn("cybersecurity.hardcoded_secrets", ids)
+
+    def test_duplicate_domain_is_rejected(self):
+        """Test listing the same config twice raises ValueError."""
+        with self.assertRaises(ValueError):
+            CompositeValidator.from_paths([PATHS[0], PATHS[0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core.fixes import FixPlanner, apply_edits, edits_conflict
+from pdei_core.logic import PDEIValidator
+
+
+class TestApplyEdits(unittest.TestCase):
+    def test_single_pass_in_any_order(self):
+        """Test edits are applied against the original offsets regardless of order."""
+        text = "analogWrite(1023);"
+        edits = [(12, 16, "4095"), (0, 11, "ledcWrite"), (18, 18, " // fixed")]
+        self.assertEqual(apply_edits(text, edits), "ledcWrite(4095); // fixed")
+
+    def test_conflicts(self):
+        """Test overlap and same-offset insertions conflict, adjacent edits do not."""
+        self.assertTrue(edits_conflict((0, 5, "a"), (4, 6, "b")))
+        self.assertTrue(edits_conflict((3, 3, "a"), (3, 3, "b")))
+        self.assertTrue(edits_conflict((3, 3, "a"), (1, 5, "b")))
+        self.assertFalse(edits_conflict((0, 3, "a"), (3, 5, "b")))
+
+
+class TestFixPlanner(unittest.TestCase):
+    def test_duplicate_issues_fix_once(self):
+        """Test a rule reported several times contributes its fix once."""
+        calls = []
+
+        def plan(code, issue):
+            calls.append(issue['id'])
+            return [(0, 0, "!")] if not code.startswith("!") else []
+
+        issues = [{"id": "r1", "auto_fix": "x"}, {"id": "r1", "auto_fix": "x"}, {"id": "r2"}]
+        self.assertEqual(FixPlanner(plan).apply("code", issues), "!code")
+        self.assertEqual(calls, ["r1"])
+
+    def test_conflicting_fix_replanned_on_merged_result(self):
+        """Test the second of two overlapping fixes runs against the first one's output."""
+        def plan(code, issue):
+            pos = code.find(issue['find'])
+            return [(pos, pos + len(issue['find']), issue['to'])] if pos != -1 else []
+
+        issues = [{"id": "a", "auto_fix": "s", "find": "foo", "to": "bar"},
+                  {"id": "b", "auto_fix": "s", "find": "oo(", "to": "oo_safe("},
+                  {"id": "c", "auto_fix": "s", "find": "bar(", "to": "baz("}]
+        # "c" only matches after "a" has been applied
+        self.assertEqual(FixPlanner(plan).apply("foo(x)", issues), "baz(x)")
+
+
+class TestValidatorFixes(unittest.TestCase):
+    def setUp(self):
+        self.validator = PDEIValidator({"domain": "test", "validation_rules": {}})
+
+    def test_untouched_text_is_preserved(self):
+        """Test line-based fixes no longer drop the trailing newline or CRLF endings."""
+        code = "integral += error;\r\nx = 1;\r\n"
+        fixed = self.validator.auto_fix(code, [{"auto_fix": "fix_pid_dt"}])
+        self.assertEqual(fixed, "integral += error * dt;\r\nx = 1;\r\n")
+
+    def test_fix_sees_previous_fix_output(self):
+        """Test a growth fix still applies to a formula produced by the decay fix."""
+        code = "float charge = exp(t/tau);"
+        issues = [{"id": "decay", "auto_fix": "fix_decay_formula"}, {"id": "growth", "auto_fix": "fix_growth_formula"}]
+        self.assertEqual(self.validator.auto_fix(code, issues), "float charge = (1 - exp(-t/tau));")
+
+    def test_safety_timeout_and_pwm_merge(self):
+        """Test independent fixes are merged into one pass."""
+        code = "void setup() {}\nvoid loop() {\n  analogWrite(5, 10);\n}\n"
+        issues = [{"auto_fix": "inject_safety_timeout"}, {"auto_fix": "esp32_pwm_fix"}]
+        fixed = self.validator.auto_fix(code, issues)
+        self.assertTrue(fixed.startswith("unsigned long lastCommand = 0;"))
+        self.assertIn("void loop() {\n  if (millis() - lastCommand > SAFETY_TIMEOUT)", fixed)
+        self.assertIn("ledcWrite(5, 10);\n}\n", fixed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core import formulas
+from pdei_core.formulas import classify_argument, compile_formula_check, find_exp_terms, negate_expression
+from pdei_core.logic import PDEIValidator
+
+
+def kinds(code):
+    return [term.kind for term in find_exp_terms(code)]
+
+
+class TestClassification(unittest.TestCase):
+    def test_spellings_are_classified_by_behavior(self):
+        """Test spacing, C float functions and casts do not change the classification."""
+        self.assertEqual(kinds("v = exp( t / tau );"), ["divergent"])
+        self.assertEqual(kinds("v = expf(time/TAU);"), ["divergent"])
+        self.assertEqual(kinds("v = expf(-(float)millis() / 1000.0f / TAU);"), ["decay"])
+        self.assertEqual(kinds("v = Math.exp(-t / this.tau);"), ["decay"])
+        self.assertEqual(kinds("v = np.exp(-(t - t0) / (R * C))"), ["decay"])
+
+    def test_complement_forms(self):
+        """Test 1 - exp(...) is growth with a decaying exponent and divergent otherwise."""
+        self.assertEqual(kinds("c = 5 * (1 - exp(-t/tau));"), ["growth"])
+        self.assertEqual(kinds("c = 1.0f - expf(-elapsed / tau);"), ["growth"])
+        self.assertEqual(kinds("c = (1 - exp(k * t));"), ["divergent"])
+        # Not a complement: the 1 belongs to 2.1
+        self.assertEqual([t.complement for t in find_exp_terms("x = 2.1 - exp(-t/tau)")], [False])
+
+    def test_time_names_match_whole_words(self):
+        """Test names like time_constant and timeout are constants, not the time variable."""
+        self.assertEqual(kinds("v = exp(-t / time_constant);"), ["decay"])
+        self.assertEqual(kinds("v = exp(t / time_constant);"), ["divergent"])
+        self.assertEqual(kinds("v = 1 - exp(-elapsed_ms / decayTimeConstant);"), ["growth"])
+        self.assertEqual(kinds("v = exp(-startTime / timer_period);"), ["decay"])
+        self.assertIsNone(classify_argument("-timeout / tau"))
+
+    def test_unclassifiable_arguments(self):
+        """Test arguments without a time variable or with unknown calls are left alone."""
+        self.assertIsNone(classify_argument("-k * x"))
+        self.assertIsNone(classify_argument("-t / gain(tau)"))
+        self.assertIsNone(classify_argument("-tau / t"))
+
+    def test_pure_python_fallback_matches(self):
+        """Test the float evaluation gives the same results as the vectorized one."""
+        saved = formulas.np
+        formulas.np = None
+        classify_argument.cache_clear()
+        try:
+            self.assertFalse(classify_argument("t / tau"))
+            self.assertTrue(classify_argument("-t / tau"))
+            self.assertIsNone(classify_argument("-tau / t"))
+        finally:
+            formulas.np = saved
+            classify_argument.cache_clear()
+
+    def test_negate_expression(self):
+        """Test sign flips keep the expression readable."""
+        self.assertEqual(negate_expression(" t / tau "), "-t / tau")
+        self.assertEqual(negate_expression("-t/tau"), "t/tau")
+        self.assertEqual(negate_expression("t - t0"), "-(t - t0)")
+        self.assertEqual(negate_expression("1e-3 * t"), "-1e-3 * t")
+
+
+class TestFormulaRules(unittest.TestCase):
+    def setUp(self):
+        rule = {"id": "decay", "severity": "error", "trigger": ["decay"], "forbidden": ["exp(t/"],
+                "formula": {"expect": "decay", "forbid": ["divergent", "growth"]}, "auto_fix": "fix_decay_formula"}
+        self.validator = PDEIValidator({"domain": "test", "validation_rules": {"formulas": [rule]}})
+
+    def test_spaced_positive_exponent_is_caught_and_fixed(self):
+        """Test exp( t / tau ) no longer slips past the decay rule, and the fix is stable."""
+        code = "float decay = expf( time / TAU );"
+        valid, issues = self.validator.validate(code)
+        self.assertFalse(valid)
+        self.assertEqual(issues[0]['span'], [code.index("expf"), len(code) - 1])
+        fixed = self.validator.auto_fix(code, issues)
+        self.assertEqual(fixed, "float decay = expf(-time / TAU);")
+        self.assertTrue(self.validator.validate(fixed)[0])
+
+    def test_literal_fields_apply_when_nothing_is_classifiable(self):
+        """Test blocks without evaluable exponentials fall back to the literal fields."""
+        _, issues = self.validator.validate("decay = exp(t/gain(tau));")
+        self.assertIn("decay", [i['id'] for i in issues])
+        _, issues = self.validator.validate("decay = 0.5 * level;")
+        self.assertNotIn("decay", [i['id'] for i in issues])
+
+    def test_commented_formula_is_ignored(self):
+        """Test exponentials in comments are not classified."""
+        self.assertTrue(self.validator.validate("x = exp(-t/tau); // decay, not exp(t/tau)")[0])
+
+    def test_invalid_spec_is_ignored(self):
+        """Test unknown kinds disable the numeric check."""
+        self.assertIsNone(compile_formula_check({"expect": "oscillating"}))
+
+
+class TestFormulaFixes(unittest.TestCase):
+    def setUp(self):
+        self.validator = PDEIValidator({"domain": "test", "validation_rules": {}})
+
+    def test_growth_fix_wraps_only_the_term(self):
+        """Test the complement wraps the exponential, not the whole right-hand side."""
+        code = "heat = 5 * expf(-t / tau);"
+        fixed = self.validator.auto_fix(code, [{"auto_fix": "fix_growth_formula"}])
+        self.assertEqual(fixed, "heat = 5 * (1 - expf(-t / tau));")
+
+    def test_step_fix_handles_spacing(self):
+        """Test the step response fix flips the sign of any spelling of the exponent."""
+        code = "position = target * (1 - exp( t / tau )) + start_pos"
+        fixed = self.validator.auto_fix(code, [{"auto_fix": "fix_step_response"}])
+        self.assertEqual(fixed, "position = target * (1 - exp(-t / tau)) + start_pos")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,10 @@ import json
 import shutil
 import io
 import importlib.util
+import threading
+from contextlib import redirect_stdout
 from pathlib import Path
+from unittest.mock import patch
 
 # --- Environment Setup ---
 # Add project root to sys.path to allow imports from root and pdei_core
@@ -213,6 +216,64 @@ class TestPDEIPersonalityIntegration(unittest.TestCase):
         except Exception:
             pass # Expected behavior
 
+    def test_python_function_spans_ignore_extra_line_breaks(self):
+        """Test indexed function spans count lines like `ast`, even with form feeds in the file."""
+        if not CORE_AVAILABLE:
+            self.skipTest("pdei_core missing")
+
+        import ast
+        source = "# page one\x0c\ndef first():\n    return '\u2028'\n\ndef second():\n    return 2"
+        starts = BuddAI._line_starts(source)
+        spans = {node.name: source[starts[node.lineno - 1]:starts[node.end_lineno]]
+                 for node in ast.walk(ast.parse(source)) if isinstance(node, ast.FunctionDef)}
+        self.assertEqual(spans["first"], "def first():\n    return '\u2028'\n")
+        self.assertEqual(spans["second"], "def second():\n    return 2")
+
+    def test_chat_turn_leaves_messages_to_write_behind(self):
+        """Test a chat turn returns without committing its queued messages itself."""
+        if not CORE_AVAILABLE:
+            self.skipTest("pdei_core missing")
+
+        from pdei_core.memory import MessageWriteBehind
+        with redirect_stdout(io.StringIO()):
+            bot = BuddAI(user_id="test_write_behind", domain_config_path=str(self.domain_path))
+        flushed_by = []
+        real_flush = MessageWriteBehind.flush
+
+        def record_flush(writer):
+            flushed_by.append(threading.current_thread())
+            return real_flush(writer)
+
+        with patch.object(MessageWriteBehind, "flush", record_flush), \
+                patch.object(bot, "_route_request", return_value="Done."), redirect_stdout(io.StringIO()):
+            self.assertEqual(bot.chat("How do I ramp a motor?"), "Done.")
+        self.assertNotIn(threading.current_thread(), flushed_by)
+
+    def test_style_scan_reads_newest_code_replies(self):
+        """Test the style scan samples the three newest replies with code, compressed or not."""
+        if not CORE_AVAILABLE:
+            self.skipTest("pdei_core missing")
+
+        from pdei_core.memory import PDEIMemory, close_pool
+        with redirect_stdout(io.StringIO()):
+            bot = BuddAI(user_id="test_style_scan", domain_config_path=str(self.domain_path))
+        db_path = self.test_dir / "scan.db"
+        bot.memory = PDEIMemory(db_path, compression="zlib", compression_threshold=16)
+        replies = ["```cpp\nint oldest = 0;\n```", "```cpp\nint second = 0;\n```", "No code here, just words " * 4,
+                   "```cpp\nint third = 0;\n```", "```cpp\nint newest = 0;\n```", "ok"]
+        for reply in replies:
+            bot.memory.save_message("scan", "assistant", reply)
+        try:
+            with patch.object(bot, "call_model", return_value="- Naming: camelCase") as call_model, \
+                    redirect_stdout(io.StringIO()):
+                bot.scan_style_signature()
+        finally:
+            close_pool(db_path)
+        prompt = call_model.call_args[0][1]
+        for name in ("second", "third", "newest"):
+            self.assertIn(f"int {name}", prompt)
+        self.assertNotIn("int oldest", prompt)
+
     def test_setup_overwrite_existing(self):
         """Test that setup overwrites existing files."""
         if not init_pdei:
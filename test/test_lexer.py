@@ -0,0 +1,71 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core.lexer import BlockAnalysis, detect_language
+from pdei_core.logic import PDEIValidator
+
+
+class TestLanguageDetection(unittest.TestCase):
+    def test_detects_families(self):
+        """Test strong markers select a family and ambiguous snippets stay generic."""
+        self.assertEqual(detect_language("#include <Arduino.h>\nvoid setup() {}"), "c")
+        self.assertEqual(detect_language("def run(x):\n    return x"), "python")
+        self.assertEqual(detect_language("const x = () => 1;"), "js")
+        self.assertEqual(detect_language(".btn { color: red; }"), "css")
+        self.assertEqual(detect_language("<div>hi</div>"), "html")
+        self.assertEqual(detect_language("x = 1; // comment"), "generic")
+
+
+class TestBlockAnalysis(unittest.TestCase):
+    def test_preprocessor_lines_are_code_in_c(self):
+        """Test #include / #define survive stripping in C while // comments are blanked."""
+        code = "#include <Wire.h>\n#define PIN 5 // led\nvoid setup() {}"
+        clean = BlockAnalysis(code).clean_code
+        self.assertIn("#include <Wire.h>", clean)
+        self.assertIn("#define PIN 5", clean)
+        self.assertNotIn("led", clean)
+        self.assertEqual(len(clean), len(code))
+
+    def test_comment_markers_inside_strings(self):
+        """Test '#' and '//' inside string literals are not treated as comments."""
+        py = BlockAnalysis('def f():\n    url = "http://x/#top"  # note\n    return url', "python")
+        self.assertIn('"http://x/#top"', py.clean_code)
+        self.assertNotIn("note", py.clean_code)
+        js = BlockAnalysis("const url = 'http://x'; // note", "js")
+        self.assertIn("'http://x';", js.clean_code)
+        self.assertNotIn("note", js.clean_code)
+
+    def test_slashes_are_code_in_python(self):
+        """Test floor division is not mistaken for a line comment in Python."""
+        clean = BlockAnalysis("def half(n):\n    return n // 2").clean_code
+        self.assertIn("n // 2", clean)
+
+    def test_line_map(self):
+        """Test offsets map to 1-based line numbers, block comments keep their newlines."""
+        code = "a = 1;\n/* one\ntwo */\nb = 2;"
+        analysis = BlockAnalysis(code)
+        self.assertEqual(analysis.clean_code.count("\n"), code.count("\n"))
+        self.assertEqual(analysis.line_of(0), 1)
+        self.assertEqual(analysis.line_of(code.index("b")), 4)
+        self.assertEqual(analysis.line_of(code.index("\n")), 1)
+
+
+class TestValidatorLexing(unittest.TestCase):
+    def test_pattern_in_string_url_is_still_seen(self):
+        """Test a forbidden call after a string containing '#' is still flagged in C."""
+        config = {"domain": "test", "validation_rules": {
+            "safety": [{"id": "no_delay", "severity": "error", "forbidden": ["delay("]}]}}
+        validator = PDEIValidator(config)
+        code = '#include <Arduino.h>\nvoid loop() { Serial.print("#1"); delay(10); }'
+        valid, issues = validator.validate(code)
+        self.assertFalse(valid)
+        self.assertEqual(issues[0]['line'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
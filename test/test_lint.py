@@ -0,0 +1,107 @@
+import unittest
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core.lint import CACHE_FILENAME, collect_files, lint_paths, main, to_sarif
+from pdei_core.logic import PDEIValidator
+
+CONFIG = {
+    "domain": "test",
+    "validation_rules": {
+        "safety": [{"id": "no_delay", "severity": "error", "forbidden": ["delay("]}],
+        "hardware": [{"id": "pwm", "severity": "warning", "forbidden": ["analogWrite"], "auto_fix": "esp32_pwm_fix"}]
+    },
+    "suppressed_rules": ["safety_timeout", "forbidden_delay"]
+}
+
+
+class TestLint(unittest.TestCase):
+    def setUp(self):
+        self.root = PROJECT_ROOT / "test_sandbox_lint"
+        (self.root / "src").mkdir(parents=True, exist_ok=True)
+        (self.root / "node_modules").mkdir(exist_ok=True)
+        (self.root / "src" / "main.ino").write_text("void loop() {\n  delay(10);\n}\n")
+        (self.root / "src" / "led.cpp").write_text("void led() {\n  analogWrite(5, 10);\n}\n")
+        (self.root / "node_modules" / "dep.js").write_text("delay(1);")
+        (self.root / "notes.txt").write_text("delay(1);")
+        self.validator = PDEIValidator(CONFIG)
+        self.cache_path = self.root / CACHE_FILENAME
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_collects_source_suffixes_only(self):
+        """Test the walk uses the shared suffix set and skips vendored directories."""
+        files = [p.relative_to(self.root).as_posix() for p in collect_files(self.root)]
+        self.assertEqual(files, ["src/led.cpp", "src/main.ino"])
+
+    def test_unchanged_files_are_skipped(self):
+        """Test a re-run serves unchanged files from the cache and re-checks edited ones."""
+        first = lint_paths(self.root, self.validator, cache_path=self.cache_path)
+        self.assertEqual(first["cached"], 0)
+        self.assertEqual(first["results"]["src/main.ino"][0]["id"], "no_delay")
+
+        second = lint_paths(self.root, self.validator, cache_path=self.cache_path)
+        self.assertEqual(second["cached"], 2)
+        self.assertEqual(second["results"], first["results"])
+
+        main_ino = self.root / "src" / "main.ino"
+        main_ino.write_text("void loop() {}\n")
+        os.utime(main_ino, ns=(0, 0))
+        third = lint_paths(self.root, self.validator, cache_path=self.cache_path)
+        self.assertEqual(third["cached"], 1)
+        self.assertEqual(third["results"]["src/main.ino"], [])
+
+    def test_file_suffix_picks_lexer(self):
+        """Test '#' lines in an ambiguous C file are linted as code, not blanked as comments."""
+        validator = PDEIValidator({"domain": "test", "validation_rules": {"style": [
+            {"id": "no_define", "severity": "warning", "forbidden": ["#define"]}]}})
+        (self.root / "src" / "pins.h").write_text('#define LED_PIN 2\nconst char *msg = "=> ready";\n')
+        report = lint_paths(self.root, validator)
+        self.assertEqual([i["id"] for i in report["results"]["src/pins.h"]], ["no_define"])
+
+    def test_fix_rewrites_files(self):
+        """Test --fix writes auto-fixes back, even for files served from the cache."""
+        lint_paths(self.root, self.validator, cache_path=self.cache_path)
+        report = lint_paths(self.root, self.validator, fix=True, cache_path=self.cache_path)
+        self.assertEqual(report["fixed"], ["src/led.cpp"])
+        self.assertIn("ledcWrite(5, 10);", (self.root / "src" / "led.cpp").read_text())
+
+    def test_sarif_report(self):
+        """Test SARIF output carries rule ids, levels and line regions."""
+        sarif = to_sarif(lint_paths(self.root, self.validator))
+        results = sarif["runs"][0]["results"]
+        self.assertEqual(sarif["version"], "2.1.0")
+        self.assertEqual({r["ruleId"] for r in results}, {"no_delay", "pwm"})
+        error = next(r for r in results if r["ruleId"] == "no_delay")
+        self.assertEqual(error["level"], "error")
+        self.assertEqual(error["locations"][0]["physicalLocation"]["region"]["startLine"], 2)
+
+    def test_cli_exit_code_and_json(self):
+        """Test the CLI exits non-zero on errors and writes the JSON report."""
+        config_path = self.root / "domain.json"
+        config_path.write_text(json.dumps(CONFIG))
+        out = self.root / "report.json"
+        code = main([str(self.root / "src"), "--domain", str(config_path), "--format", "json", "--output", str(out), "--no-cache"])
+        self.assertEqual(code, 1)
+        self.assertEqual(json.loads(out.read_text())["errors"], 1)
+
+    def test_cli_rejects_empty_domain(self):
+        """Test an empty --domain list is a usage error, not a traceback."""
+        for domain in ("", ","):
+            with self.assertRaises(SystemExit) as raised, contextlib.redirect_stderr(io.StringIO()):
+                main([str(self.root / "src"), "--domain", domain, "--no-cache"])
+            self.assertEqual(raised.exception.code, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -213,6 +213,25 @@ class TestForgeTheoryFixes(unittest.TestCase):
         self.assertFalse(valid)
         self.assertEqual(issues[0]['id'], "req_regex")
 
+    def test_validate_with_language(self):
+        """Test an explicit language lexes an ambiguous block as that language."""
+        config = {
+            "domain": "test",
+            "validation_rules": {
+                "style": [{"id": "no_define", "severity": "warning", "trigger": ["#define"], "forbidden": ["#define"]}]
+            }
+        }
+        v = PDEIValidator(config)
+        # "=>" also looks like JS, so detection gives up and '#' lines are treated as comments
+        code = '#define LED_PIN 2\nvoid setup() { Serial.println("=> ready"); }'
+
+        self.assertEqual(v.validate(code)[1], [])
+        _, issues = v.validate(code, language="cpp")
+        self.assertEqual([i['id'] for i in issues], ["no_define"])
+        self.assertEqual(v.validate(code, language=".ino")[1], issues)
+        results = list(v.validate_many([(code, "", "ino"), (code, "")]))
+        self.assertEqual([len(r[1]) for r in results], [1, 0])
+
     def test_validate_forbidden_regex(self):
         """Test forbidden_regex rule."""
         config = {
@@ -429,6 +448,26 @@ class TestForgeTheoryFixes(unittest.TestCase):
         valid, issues = v.validate(code)
         self.assertFalse(valid)
 
+    def test_line_numbers_ignore_comments(self):
+        """Test that issue lines point at code, not at an earlier comment."""
+        code = "// bad idea\nx = 1;\n/* bad\n */ y = bad;"
+        config = {"domain": "test", "validation_rules": {"check": [{"id": "f", "severity": "error", "forbidden": ["bad"]}]}}
+        v = PDEIValidator(config)
+        valid, issues = v.validate(code)
+        self.assertEqual(issues[0]['line'], 4)
+
+    def test_generic_regex_fix_uses_match_spans(self):
+        """Test learned regex fixes rewrite the spans recorded during validation."""
+        config = {"domain": "test", "validation_rules": {"learned": [{
+            "id": "l", "severity": "error", "forbidden_regex": [r"Serial\.println\((\w+)\)"],
+            "auto_fix": "generic_regex_replace", "replacement": r"log(\1)"
+        }]}}
+        v = PDEIValidator(config)
+        code = "Serial.println(a); // Serial.println(b)\nSerial.println(c);"
+        valid, issues = v.validate(code)
+        self.assertEqual(issues[0]['match_spans'], [[0, 17], [40, 57]])
+        self.assertEqual(v.auto_fix(code, issues), "log(a); // Serial.println(b)\nlog(c);")
+
 class MarkdownTestResult(unittest.TextTestResult):
     def __init__(self, stream, descriptions, verbosity):
         super().__init__(stream, descriptions, verbosity)
@@ -0,0 +1,83 @@
+import unittest
+import sys
+import json
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core import lut
+from pdei_core.logic import PDEIValidator
+from pdei_core.lut import generate_lut, lut_header_for_tuning, render_lut_header
+
+
+class TestGenerateLut(unittest.TestCase):
+    def test_decay_and_growth_are_complements(self):
+        """Test decay falls from full scale and growth mirrors it."""
+        decay = generate_lut("decay", tau=0.1, sample_rate_hz=100, bits=8)
+        growth = generate_lut("growth", tau=0.1, sample_rate_hz=100, bits=8)
+        self.assertEqual(len(decay), 51)
+        self.assertEqual(decay[0], 255)
+        self.assertEqual(growth[0], 0)
+        self.assertEqual(decay[10], round(255 * 0.36787944))
+        self.assertTrue(all(a >= b for a, b in zip(decay, decay[1:])))
+        self.assertTrue(all(abs(d + g - 255) <= 1 for d, g in zip(decay, growth)))
+
+    def test_float_fallback_matches(self):
+        """Test the pure-Python path produces the same table as the vectorized one."""
+        expected = generate_lut("step_response", tau=0.3, sample_rate_hz=200, bits=12)
+        saved = lut.np
+        lut.np = None
+        try:
+            self.assertEqual(generate_lut("step_response", tau=0.3, sample_rate_hz=200, bits=12), expected)
+        finally:
+            lut.np = saved
+
+    def test_rejects_bad_parameters(self):
+        """Test unknown kinds, oversized tables and bit widths are refused."""
+        with self.assertRaises(ValueError):
+            generate_lut("sine", 0.1, 100, 8)
+        with self.assertRaises(ValueError):
+            generate_lut("decay", 10.0, 10000, 8)
+        with self.assertRaises(ValueError):
+            generate_lut("decay", 0.1, 100, 40)
+
+
+class TestLutHeader(unittest.TestCase):
+    def test_header_for_tuning(self):
+        """Test the preset tau is read from forge_theory.json and every table is emitted."""
+        header = lut_header_for_tuning("aggressive")
+        self.assertIn("Time constant 0.3 s", header)
+        for name in ("FORGE_DECAY_LUT", "FORGE_GROWTH_LUT", "FORGE_STEP_RESPONSE_LUT"):
+            self.assertIn(f"const uint16_t {name}[", header)
+        self.assertIn("forge_lut_lookup", header)
+        self.assertNotIn("exp(", header)
+
+    def test_element_type_follows_bit_width(self):
+        """Test 8-bit tables use uint8_t."""
+        header = render_lut_header(0.1, 100, 8, kinds=["decay"])
+        self.assertIn("const uint8_t FORGE_DECAY_LUT[51]", header)
+        self.assertNotIn("FORGE_GROWTH_LUT", header)
+
+    def test_unknown_tuning(self):
+        """Test an unknown preset raises ValueError."""
+        with self.assertRaises(ValueError):
+            lut_header_for_tuning("ludicrous")
+
+
+class TestLutValidation(unittest.TestCase):
+    def test_lut_use_satisfies_formula_rules(self):
+        """Test reading a Forge Theory table is accepted in place of exp(-t/tau)."""
+        with open(PROJECT_ROOT / "domain_configs" / "embedded.json", 'r', encoding='utf-8') as f:
+            validator = PDEIValidator(json.load(f))
+        code = "void fadeLed() { level = forge_lut_lookup(FORGE_DECAY_LUT, FORGE_DECAY_LUT_LEN, micros() - start); }"
+        valid, issues = validator.validate(code, context="led fade")
+        self.assertNotIn("decay_negative_exponent", [i['id'] for i in issues])
+        # A table does not excuse a diverging formula elsewhere in the block
+        valid, issues = validator.validate(code + "\nfloat fade = exp(t/tau);", context="led fade")
+        self.assertIn("decay_negative_exponent", [i['id'] for i in issues])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 import sqlite3
+import os
 import shutil
 import sys
 import time
@@ -10,7 +11,8 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).parents[1]
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from pdei_core.memory import PDEIMemory, PDEISmartLearner
+from pdei_core.memory import PDEIMemory, PDEISmartLearner, SCHEMA_VERSION, close_pool, code_terms, content_hash, get_pool, pack_text, unpack_text, zstd
+from pdei_core.safe_regex import UnsafePatternError
 
 class TestPDEIMemory(unittest.TestCase):
     def setUp(self):
@@ -25,6 +27,7 @@ class TestPDEIMemory(unittest.TestCase):
         # Close the connection to release the file lock on Windows
         if hasattr(self.memory, 'conn'):
             self.memory.conn.close()
+        close_pool(self.db_path)
         
         # Attempt to clean up the specific database file
         if self.db_path.exists():
@@ -134,6 +137,21 @@ class TestPDEIMemory(unittest.TestCase):
         rules = self.memory.get_learned_rules(min_confidence=0.5)
         self.assertEqual(len(rules), 1)
 
+    def test_save_rule_rejects_nested_quantifier(self):
+        """Test that a learned regex with nested quantifiers is never stored."""
+        with self.assertRaises(UnsafePatternError):
+            self.memory.save_rule("Runaway", r"(\w+\s*)+;", "", 0.95, "test")
+        self.assertEqual(self.memory.get_learned_rules(min_confidence=0.0), [])
+
+    def test_quarantined_rule_excluded(self):
+        """Test that quarantined patterns are dropped from the learned rule set."""
+        self.memory.save_rule("Keep", "A", "B", 0.9, "test")
+        self.memory.save_rule("Drop", "C", "D", 0.9, "test")
+        self.memory.quarantine_rule("C", "Exceeded regex time budget")
+        self.assertEqual([r['rule'] for r in self.memory.get_learned_rules()], ["Keep"])
+        quarantined = self.memory.get_quarantined_rules()
+        self.assertEqual((quarantined[0]['find'], quarantined[0]['rule']), ("C", "Drop"))
+
     def test_smart_learner_no_diff(self):
         """Test diff generation with identical strings."""
         learner = PDEISmartLearner(self.memory)
@@ -214,5 +232,337 @@ class TestPDEIMemory(unittest.TestCase):
         self.assertIsNotNone(cursor.fetchone())
         conn.close()
 
+    def test_pooled_connection_pragmas(self):
+        """Test pooled connections come up with the tuned pragmas."""
+        with self.memory.connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+            self.assertEqual(conn.execute("PRAGMA temp_store").fetchone()[0], 2)  # MEMORY
+
+    def test_pool_shared_per_database(self):
+        """Test every PDEIMemory on one file shares a single pool and reuses its connections."""
+        other = PDEIMemory(self.db_path)
+        self.assertIs(other.connection_pool, self.memory.connection_pool)
+        self.assertIs(get_pool(str(self.db_path)), self.memory.connection_pool)
+        with self.memory.connection() as first:
+            pass
+        with other.connection() as second:
+            self.assertIs(second, first)
+
+    def test_connection_context_commits_and_rolls_back(self):
+        """Test the with-block commits on success, rolls back on error and returns the connection."""
+        with self.memory.connection() as conn:
+            conn.execute("INSERT INTO sessions (session_id, user_id, started_at) VALUES ('kept', 'u', 't')")
+        with self.assertRaises(RuntimeError):
+            with self.memory.connection() as conn:
+                conn.execute("INSERT INTO sessions (session_id, user_id, started_at) VALUES ('dropped', 'u', 't')")
+                raise RuntimeError("boom")
+        self.assertEqual(self.memory.connection_pool.pool.qsize(), 1)
+
+        raw = sqlite3.connect(self.db_path)
+        ids = [r[0] for r in raw.execute("SELECT session_id FROM sessions")]
+        raw.close()
+        self.assertIn("kept", ids)
+        self.assertNotIn("dropped", ids)
+
+    def test_wrapper_context_manager(self):
+        """Test get_connection() works as a with-block and hands its connection back to the pool."""
+        with self.memory.get_connection() as conn:
+            conn.execute("INSERT INTO sessions (session_id, user_id, started_at) VALUES ('wrapped', 'u', 't')")
+        self.assertIsNone(conn._conn)
+        with self.memory.connection() as check:
+            self.assertIsNotNone(check.execute("SELECT 1 FROM sessions WHERE session_id = 'wrapped'").fetchone())
+
+    def test_async_messages_get_ids_immediately(self):
+        """Test write-behind save_message returns increasing IDs and the rows land with those IDs."""
+        memory = PDEIMemory(self.db_path, durability="async")
+        ids = [memory.save_message("sess_async", "user", f"msg {i}") for i in range(100)]
+        self.assertEqual(ids, list(range(ids[0], ids[0] + 100)))
+        self.assertTrue(memory.flush_messages())
+        self.assertEqual(memory.message_writer.pending, 0)
+
+        raw = sqlite3.connect(self.db_path)
+        rows = raw.execute("SELECT id, content FROM messages WHERE session_id = 'sess_async' ORDER BY id").fetchall()
+        raw.close()
+        self.assertEqual(rows, [(msg_id, f"msg {i}") for i, msg_id in enumerate(ids)])
+
+    def test_async_messages_visible_to_reads(self):
+        """Test reads through messages_connection see queued messages without an explicit flush."""
+        memory = PDEIMemory(self.db_path, durability="async")
+        msg_id = memory.save_message("sess_ryw", "assistant", "queued")
+        with memory.messages_connection() as conn:
+            row = conn.execute("SELECT content FROM messages WHERE id = ?", (msg_id,)).fetchone()
+        self.assertEqual(row[0], "queued")
+
+    def test_reserved_ids_do_not_collide_with_sync_writes(self):
+        """Test sync inserts (AUTOINCREMENT) skip the IDs an async writer has reserved."""
+        async_memory = PDEIMemory(self.db_path, durability="async")
+        first = async_memory.save_message("sess_mix", "user", "a")
+        sync_id = self.memory.save_message("sess_mix", "user", "b")
+        second = async_memory.save_message("sess_mix", "user", "c")
+        async_memory.flush_messages()
+        self.assertEqual(len({first, sync_id, second}), 3)
+        self.assertGreater(sync_id, second)
+        with self.memory.connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM messages WHERE session_id = 'sess_mix'").fetchone()[0]
+        self.assertEqual(count, 3)
+
+    def test_rejected_batch_is_dropped(self):
+        """Test a queued batch that violates a constraint is dropped instead of retried forever."""
+        memory = PDEIMemory(self.db_path, durability="async")
+        msg_id = memory.save_message("sess_dup", "user", "queued")
+        with memory.connection_pool.connection() as conn:
+            conn.execute("INSERT INTO messages (id, session_id, role, content) VALUES (?, 'other', 'user', 'x')", (msg_id,))
+        with self.assertLogs(level="ERROR"):
+            self.assertFalse(memory.flush_messages())
+        self.assertEqual(memory.message_writer.pending, 0)
+        self.assertTrue(memory.flush_messages())
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "needs fork()")
+    def test_forked_child_gets_its_own_pool(self):
+        """Test a forked child opens new connections and does not flush the parent's queue."""
+        memory = PDEIMemory(self.db_path, durability="async")
+        memory.save_message("sess_fork", "user", "parent")
+        parent_pool = get_pool(self.db_path)
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                child = PDEIMemory(self.db_path)
+                ok = child.connection_pool is not parent_pool and child.message_writer.pending == 0
+                os.write(write_fd, b"1" if ok else b"0")
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        result = os.read(read_fd, 1)
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+        self.assertEqual(result, b"1")
+        self.assertIs(get_pool(self.db_path), parent_pool)
+        self.assertTrue(memory.flush_messages())
+
+    def test_unknown_durability_falls_back_to_sync(self):
+        """Test an unknown durability mode warns and commits synchronously."""
+        with self.assertLogs(level="WARNING"):
+            memory = PDEIMemory(self.db_path, durability="eventually")
+        self.assertEqual(memory.durability, "sync")
+
+    def _index_function(self, repo, func, content, user_id="default"):
+        with self.memory.connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO repo_index (user_id, file_path, repo_name, function_name, content) VALUES (?, ?, ?, ?, ?)",
+                (user_id, f"{repo}/{func}.ino", repo, func, content)
+            )
+            return cursor.lastrowid
+
+    def test_code_terms(self):
+        """Test identifiers are split on camelCase/PascalCase boundaries."""
+        self.assertEqual(code_terms("void applyForgeDecay(HTTPServer s)"), "apply forge decay http server")
+        self.assertEqual(code_terms("set_motor_speed plain"), "")
+        self.assertEqual(code_terms(None), "")
+
+    def test_repo_search_ranks_and_splits_identifiers(self):
+        """Test BM25 ranks a function-name hit above a passing mention, and camelCase parts match."""
+        self._index_function("GilBot", "logStatus", "void logStatus() { Serial.println(motorState); }")
+        self._index_function("GilBot", "setMotorSpeed", "void setMotorSpeed(int pwm) { ledcWrite(0, pwm); }")
+        self._index_function("GilBot", "setMotorSpeed", "void setMotorSpeed() {}", user_id="someone_else")
+
+        hits = self.memory.search_repo_index(["motor"])
+        self.assertEqual([h["function"] for h in hits], ["setMotorSpeed", "logStatus"])
+        self.assertIn("ledcWrite", hits[0]["snippet"])
+
+        names = self.memory.search_repo_index(["motor"], names_only=True)
+        self.assertEqual([h["function"] for h in names], ["setMotorSpeed"])
+        self.assertEqual(self.memory.search_repo_index(["(", "  "]), [])
+
+    def test_repo_search_follows_table_changes(self):
+        """Test the triggers keep the full-text index in step with updates and deletes."""
+        row_id = self._index_function("GilBot", "setMotorSpeed", "void setMotorSpeed() {}")
+        with self.memory.connection() as conn:
+            conn.execute("UPDATE repo_index SET function_name = 'readServoAngle', content = 'int readServoAngle() {}' WHERE id = ?", (row_id,))
+        self.assertEqual(self.memory.search_repo_index(["motor"]), [])
+        self.assertEqual(len(self.memory.search_repo_index(["servo"])), 1)
+
+        with self.memory.connection() as conn:
+            conn.execute("DELETE FROM repo_index WHERE id = ?", (row_id,))
+            conn.execute("INSERT INTO repo_fts (repo_fts, rank) VALUES ('integrity-check', 1)")
+        self.assertEqual(self.memory.search_repo_index(["servo"]), [])
+
+    def test_plain_connection_can_write_repo_index(self):
+        """Test the sqlite3 shell or a backup copy can change repo_index without the Python SQL functions."""
+        raw = sqlite3.connect(self.db_path)
+        with raw:
+            row_id = raw.execute("INSERT INTO repo_index (user_id, file_path, repo_name, function_name, content) "
+                                 "VALUES ('default', 'g.ino', 'GilBot', 'setMotorSpeed', 'void setMotorSpeed() {}')").lastrowid
+        self.assertEqual([h["function"] for h in self.memory.search_repo_index(["motor"])], ["setMotorSpeed"])
+        with raw:
+            raw.execute("UPDATE repo_index SET function_name = 'readServoAngle', content = 'int readServoAngle() {}' WHERE id = ?", (row_id,))
+        self.assertEqual(self.memory.search_repo_index(["motor"]), [])
+        self.assertEqual([h["function"] for h in self.memory.search_repo_index(["servo"])], ["readServoAngle"])
+        with raw:
+            raw.execute("DELETE FROM repo_index WHERE id = ?", (row_id,))
+        raw.close()
+        self.assertEqual(self.memory.search_repo_index(["servo"]), [])
+    def test_pack_text_round_trip(self):
+        """Test large text is compressed with a codec tag, small or incompressible text is left alone."""
+        report = "Module 3/7: motor_driver.cpp ... PASS\n" * 200
+        packed = pack_text(report, "zlib")
+        self.assertIsInstance(packed, bytes)
+        self.assertLess(len(packed), len(report) // 5)
+        self.assertEqual(unpack_text(packed), report)
+        self.assertEqual(pack_text("short", "zlib"), "short")
+        self.assertEqual(pack_text(report, None), report)
+        # Codec overhead outweighs the saving
+        self.assertEqual(pack_text("q7Xw!kP2#vL9", "zlib", threshold=10), "q7Xw!kP2#vL9")
+        self.assertEqual(unpack_text(b"raw bytes"), b"raw bytes")
+
+    @unittest.skipIf(zstd is None, "zstandard not installed")
+    def test_pack_text_zstd(self):
+        """Test the zstd codec round-trips."""
+        report = "PASS motor_driver\n" * 500
+        self.assertEqual(unpack_text(pack_text(report, "zstd")), report)
+
+    def test_compressed_columns_read_back_transparently(self):
+        """Test compressed messages and corrections are stored smaller and read back as text."""
+        memory = PDEIMemory(self.db_path, compression="zlib")
+        report = "[modular build] step ok\n" * 300
+        msg_id = memory.save_message("sess_zip", "assistant", report)
+        memory.save_correction(report, report.replace("ok", "fixed"), "typo", "ctx")
+
+        raw = sqlite3.connect(self.db_path)
+        stored = raw.execute("SELECT content, typeof(content) FROM messages WHERE id = ?", (msg_id,)).fetchone()
+        raw.close()
+        self.assertEqual(stored[1], "blob")
+        self.assertLess(len(stored[0]), len(report))
+
+        with memory.connection() as conn:
+            self.assertEqual(conn.execute("SELECT unpack(content) FROM messages WHERE id = ?", (msg_id,)).fetchone()[0], report)
+        corrections = memory.get_connection()
+        row = corrections.execute("SELECT unpack(original_code), unpack(corrected_code) FROM corrections").fetchone()
+        corrections.close()
+        self.assertEqual(row, (report, report.replace("ok", "fixed")))
+
+    def test_compressed_blob_spans(self):
+        """Test function spans and full-text search read through a compressed blob."""
+        memory = PDEIMemory(self.db_path, compression="zlib", compression_threshold=16)
+        source = "int readServo() { return 1; }\nvoid park() { }\n" * 20
+        digest = content_hash(source)
+        with memory.connection() as conn:
+            conn.execute("INSERT INTO repo_blobs (hash, content) VALUES (?, ?)", (digest, memory.pack(source)))
+            conn.execute("INSERT INTO repo_index (user_id, file_path, repo_name, function_name, blob_hash, start_offset, end_offset) VALUES ('default', 's.ino', 'GilBot', 'park', ?, 30, 45)", (digest,))
+        hits = memory.search_repo_index(["park"])
+        self.assertEqual([h["content"] for h in hits], ["void park() { }"])
+
+    def test_unknown_codec_stores_plain_text(self):
+        """Test an unknown codec warns and disables compression."""
+        with self.assertLogs(level="WARNING"):
+            memory = PDEIMemory(self.db_path, compression="lz4")
+        self.assertIsNone(memory.compression)
+        self.assertIsNone(PDEIMemory(self.db_path, compression="none").compression)
+
+class TestSchemaMigrations(unittest.TestCase):
+    # Hot query shapes (from the executive and the learners) and the index each must use
+    QUERY_PLANS = [
+        ("SELECT id, role, content, timestamp FROM messages WHERE session_id = ? ORDER BY id ASC", 1, "idx_messages_session"),
+        ("SELECT content FROM messages WHERE session_id = ? AND id < ? AND role = 'user' ORDER BY id DESC LIMIT 1", 2, "idx_messages_session"),
+        ("SELECT session_id, started_at, title FROM sessions WHERE user_id = ? ORDER BY started_at DESC LIMIT ?", 2, "COVERING INDEX idx_sessions_user_started"),
+        ("SELECT id, original_code, corrected_code, reason FROM corrections WHERE processed IS NOT 1 LIMIT 5", 0, "idx_corrections_unprocessed"),
+        ("SELECT COUNT(*) FROM repo_index WHERE user_id = ?", 1, "COVERING INDEX idx_repo_index_user_repo"),
+        ("SELECT DISTINCT repo_name FROM repo_index WHERE user_id = ?", 1, "COVERING INDEX idx_repo_index_user_repo"),
+        ("SELECT rule_text, confidence FROM code_rules WHERE confidence > 0.6 ORDER BY confidence DESC", 0, "COVERING INDEX idx_code_rules_confidence"),
+        ("SELECT rule_text FROM code_rules ORDER BY confidence DESC LIMIT 50", 0, "COVERING INDEX idx_code_rules_confidence"),
+    ]
+
+    def setUp(self):
+        self.test_dir = PROJECT_ROOT / "test_sandbox_memory"
+        self.test_dir.mkdir(exist_ok=True)
+        self.db_path = self.test_dir / f"test_{uuid.uuid4().hex}.db"
+
+    def tearDown(self):
+        close_pool(self.db_path)
+        if self.db_path.exists():
+            try:
+                self.db_path.unlink()
+            except PermissionError:
+                pass # Best effort cleanup
+
+    def test_hot_queries_use_indexes(self):
+        """Test EXPLAIN QUERY PLAN shows each hot query served by its index, not a table scan."""
+        PDEIMemory(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for sql, params, index in self.QUERY_PLANS:
+                plan = " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", (1,) * params))
+                self.assertIn(index, plan, sql)
+        finally:
+            conn.close()
+
+    def test_unversioned_database_is_migrated(self):
+        """Test a database from before versioning keeps its data and gains the indexes."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, role TEXT, content TEXT, timestamp TIMESTAMP)")
+        conn.execute("INSERT INTO messages (session_id, role, content) VALUES ('old', 'user', 'kept')")
+        conn.commit()
+        conn.close()
+
+        memory = PDEIMemory(self.db_path)
+        with memory.connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+            self.assertEqual(conn.execute("SELECT content FROM messages WHERE session_id = 'old'").fetchone()[0], "kept")
+            indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertIn("idx_messages_session", indexes)
+        self.assertIn("idx_code_rules_confidence", indexes)
+
+    def test_repo_content_deduplicated_into_blobs(self):
+        """Test migrating a database that copies each file into every function row keeps one copy per file."""
+        source = "void setMotorSpeed(int pwm) { ledcWrite(0, pwm); }\nvoid stopMotor() { setMotorSpeed(0); }\n"
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""CREATE TABLE repo_index (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, file_path TEXT,
+                        repo_name TEXT, function_name TEXT, content TEXT, last_modified TIMESTAMP)""")
+        conn.executemany("INSERT INTO repo_index (user_id, file_path, repo_name, function_name, content) VALUES ('default', 'm.ino', 'GilBot', ?, ?)",
+                         [("setMotorSpeed", source), ("stopMotor", source)])
+        conn.commit()
+        conn.close()
+
+        with self.assertLogs(level="INFO") as logs:
+            memory = PDEIMemory(self.db_path)
+        self.assertTrue(any("2 rows now share 1 stored files" in line for line in logs.output))
+        with memory.connection() as conn:
+            self.assertEqual(conn.execute("SELECT hash FROM repo_blobs").fetchall(), [(content_hash(source),)])
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM repo_index WHERE content IS NOT NULL").fetchone()[0], 0)
+            self.assertEqual({r[0] for r in conn.execute("SELECT content FROM repo_functions")}, {source})
+        self.assertEqual(len(memory.search_repo_index(["ledcWrite"])), 2)
+
+    def test_blob_spans_and_release(self):
+        """Test rows read their function's span of a shared blob, and the blob goes with its last row."""
+        memory = PDEIMemory(self.db_path)
+        source = "int readServo() { return 1; }\nvoid park() { }\n"
+        digest = content_hash(source)
+        with memory.connection() as conn:
+            conn.execute("INSERT INTO repo_blobs (hash, content) VALUES (?, ?)", (digest, source))
+            conn.executemany("INSERT INTO repo_index (user_id, file_path, repo_name, function_name, blob_hash, start_offset, end_offset) VALUES ('default', 's.ino', 'GilBot', ?, ?, ?, ?)",
+                             [("readServo", digest, 0, 29), ("park", digest, 30, 45)])
+        self.assertEqual([h["content"] for h in memory.search_repo_index(["park"], names_only=True)], ["void park() { }"])
+
+        with memory.connection() as conn:
+            conn.execute("DELETE FROM repo_index WHERE function_name = 'park'")
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM repo_blobs").fetchone()[0], 1)
+            conn.execute("DELETE FROM repo_index WHERE function_name = 'readServo'")
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM repo_blobs").fetchone()[0], 0)
+            conn.execute("INSERT INTO repo_fts (repo_fts, rank) VALUES ('integrity-check', 1)")
+
+    def test_current_database_skips_migrations(self):
+        """Test reopening an up-to-date database runs no DDL (a dropped index stays dropped)."""
+        PDEIMemory(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DROP INDEX idx_messages_session")
+        conn.commit()
+        conn.close()
+
+        memory = PDEIMemory(self.db_path)
+        with memory.connection() as conn:
+            self.assertIsNone(conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_messages_session'").fetchone())
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,67 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core.logic import PDEIValidator
+from pdei_core.profiler import RuleProfiler, format_profile
+
+CONFIG = {
+    "domain": "test",
+    "validation_rules": {
+        "safety": [{"id": "no_delay", "severity": "error", "forbidden": ["delay("]}],
+        "hardware": [
+            {"id": "pwm", "severity": "warning", "trigger": ["analogWrite"], "forbidden": ["analogWrite"], "auto_fix": "esp32_pwm_fix"},
+            {"id": "never", "severity": "warning", "trigger": ["unused_api"], "forbidden": ["unused_api("]}
+        ]
+    }
+}
+
+
+class TestRuleProfiler(unittest.TestCase):
+    def setUp(self):
+        self.validator = PDEIValidator(CONFIG)
+        self.validator.profiler = RuleProfiler(enabled=True)
+        self.validator.result_cache.clear()
+
+    def _row(self, report, rule_id):
+        return next(r for r in report["rules"] if r["id"] == rule_id)
+
+    def test_counts_checks_triggers_and_issues(self):
+        """Test per-rule checks, trigger hits and issue counts are recorded."""
+        _, issues = self.validator.validate("delay(10); analogWrite(5, 1);")
+        self.validator.validate("x = 1;")
+        report = self.validator.profile_report()
+
+        self.assertEqual(report["validations"], 2)
+        no_delay = self._row(report, "no_delay")
+        self.assertEqual((no_delay["checks"], no_delay["triggered"], no_delay["issues"]), (2, 2, 1))
+        self.assertEqual(no_delay["source"], "domain")
+        pwm = self._row(report, "pwm")
+        self.assertEqual((pwm["checks"], pwm["issues"]), (1, 1))
+        self.assertIn("hardware/never", report["dead_rules"])
+        self.assertNotIn("safety/no_delay", report["dead_rules"])
+
+        self.validator.auto_fix("analogWrite(5, 1);", [i for i in issues if i["id"] == "pwm"])
+        self.assertEqual(self._row(self.validator.profile_report(), "pwm")["fixes"], 1)
+
+    def test_disabled_records_nothing(self):
+        """Test a disabled profiler leaves every counter at zero."""
+        self.validator.profiler.enabled = False
+        self.validator.validate("delay(10);")
+        report = self.validator.profile_report()
+        self.assertEqual(report["validations"], 0)
+        self.assertTrue(all(r["checks"] == 0 for r in report["rules"]))
+        self.assertIn("off", format_profile(report))
+
+    def test_forge_rules_are_tagged(self):
+        """Test merged Forge Theory rules report their source."""
+        sources = {r["source"] for r in self.validator.profile_report()["rules"]}
+        self.assertIn("forge_theory", sources)
+
+
+if __name__ == '__main__':
+    unittest.main()
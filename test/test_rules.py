@@ -0,0 +1,267 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import uuid
+
+from pdei_core.rules import RULE_REGISTRY, PatternAutomaton, RegexLayer, CompiledRuleset
+from pdei_core.logic import PDEIValidator
+from pdei_core.memory import PDEIMemory
+
+class TestPatternAutomaton(unittest.TestCase):
+    def test_finds_all_literals(self):
+        """Test that every occurring pattern is reported in one pass."""
+        automaton = PatternAutomaton(["exp(", "exp(-", "(1 - exp(", "tau", "missing"])
+        hits = automaton.search("y = (1 - exp(-t/tau));")
+        self.assertEqual(set(hits), {"exp(", "exp(-", "(1 - exp(", "tau"})
+
+    def test_overlapping_patterns(self):
+        """Test patterns that are suffixes of other patterns (failure links)."""
+        automaton = PatternAutomaton(["she", "he", "hers", "his"])
+        self.assertEqual(set(automaton.search("ushers")), {"she", "he", "hers"})
+
+    def test_empty_pattern_always_hits(self):
+        """Test that an empty pattern matches like the `in` operator does."""
+        automaton = PatternAutomaton(["", "abc"])
+        self.assertEqual(set(automaton.search("")), {""})
+        self.assertEqual(set(automaton.search("xabcx")), {"", "abc"})
+
+    def test_reports_first_offset(self):
+        """Test that each hit carries the offset of its first occurrence."""
+        hits = PatternAutomaton(["delay(", "ay"]).search("x;\ndelay(1); delay(2);")
+        self.assertEqual(hits["delay("], 3)
+        self.assertEqual(hits["ay"], 6)
+
+    def test_matches_substring_semantics(self):
+        """Test the automaton agrees with naive substring checks."""
+        patterns = ["delay(", "millis()", "analogWrite", "a", "ab", "bab"]
+        text = "void loop() { delay(10); analogWrite(3, millis()); } abab"
+        self.assertEqual(set(PatternAutomaton(patterns).search(text)), {p for p in patterns if p in text})
+
+
+class TestRegexLayer(unittest.TestCase):
+    def assertMatchesFinditer(self, patterns, text):
+        found = RegexLayer(patterns).scan(text)
+        for pattern in patterns:
+            expected = [m.span() for m in re.finditer(pattern, text)]
+            self.assertEqual(found.get(pattern, []), expected, pattern)
+
+    def test_grouped_scan_equals_separate_searches(self):
+        """Test the combined alternation reports the same spans as per-pattern finditer."""
+        self.assertMatchesFinditer([r"temp_\d+", r"exp\(\s*t", r"\bdelay\(\d+\)"],
+                                   "temp_1 = exp( t/tau); delay(100); temp_22")
+
+    def test_shadowed_alternatives_are_recovered(self):
+        """Test patterns that only match where an earlier alternative also matches."""
+        self.assertMatchesFinditer([r"foo", r"fo+", r"o"], "foo fooo")
+
+    def test_empty_matches_follow_finditer(self):
+        """Test zero-width matches adjacent to a previous match are reported like finditer."""
+        self.assertMatchesFinditer([r"a", r"b*", r"\b"], "abba bb a")
+
+    def test_backreferences_stay_solo(self):
+        """Test that patterns with backreferences are not embedded in the alternation."""
+        layer = RegexLayer([r"(\w)\1", r"ab"])
+        self.assertIn(r"(\w)\1", layer.solo)
+        self.assertEqual(layer.scan("xaab")[r"(\w)\1"], [(1, 3)])
+
+    def test_invalid_pattern_is_skipped(self):
+        """Test that a broken learned regex does not break the whole layer."""
+        layer = RegexLayer([r"(unclosed", r"ok"])
+        self.assertNotIn(r"(unclosed", layer.compiled)
+        self.assertEqual(layer.scan("ok"), {"ok": [(0, 2)]})
+
+    def test_concurrent_quarantine_is_reported_once(self):
+        """Test two scans timing out on the same pattern quarantine it once, without errors."""
+        slow = r"(x|x)*y"
+
+        class TimeoutGuard:
+            def __init__(self):
+                self.barrier = threading.Barrier(2)
+                self.seen = []
+
+            def scan(self, patterns, text):
+                self.seen.append(patterns)
+                # Both scans are running before either one quarantines
+                self.barrier.wait(5)
+                return {}, [slow] if slow in patterns else []
+
+        reported = []
+        guard = TimeoutGuard()
+        layer = RegexLayer([], sandboxed=[slow, r"ok"], guard=guard, on_budget_exceeded=reported.append)
+        errors = []
+
+        def scan():
+            try:
+                layer.scan("xxxx ok")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=scan) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(errors, [])
+        self.assertEqual(reported, [slow])
+        self.assertEqual((layer.sandboxed, layer.quarantined), ([r"ok"], [slow]))
+        # The guard was given snapshots, never the layer's live list
+        self.assertTrue(all(isinstance(patterns, tuple) for patterns in guard.seen))
+
+
+class TestCompiledRuleset(unittest.TestCase):
+    def test_context_literals_are_lowercased(self):
+        """Test that platform/trigger context checks are case-insensitive."""
+        ruleset = CompiledRuleset({"hw": [{"id": "p", "platform": "ESP32", "trigger": ["Motor"], "forbidden": ["x"]}]})
+        code_hits, context_hits = ruleset.scan("x", "esp32 MOTOR driver")
+        rule = ruleset.categories[0][1][0]
+        self.assertIn("esp32", context_hits)
+        self.assertTrue(rule.is_active(code_hits, context_hits))
+
+    def test_empty_trigger_list_never_fires(self):
+        """Test that an explicit empty trigger list disables the rule."""
+        ruleset = CompiledRuleset({"c": [{"id": "t", "trigger": [], "forbidden": ["bad"]}]})
+        rule = ruleset.categories[0][1][0]
+        self.assertFalse(rule.is_active(*ruleset.scan("bad", "")))
+
+    def test_candidates_follow_gate_literals(self):
+        """Test that only ungated rules and rules whose trigger/platform was seen are candidates."""
+        ruleset = CompiledRuleset({
+            "safety": [{"id": "motor", "trigger": ["motor"]}, {"id": "always", "forbidden": ["x"]}],
+            "hw": [{"id": "esp", "platform": "ESP32", "trigger": ["wifi"]}, {"id": "never", "trigger": []}],
+            "style": [{"id": "servo", "trigger": ["Servo"]}],
+        })
+        candidates = ruleset.candidates(*ruleset.scan("Servo s; motor();", "build for esp32"))
+        self.assertEqual([(cat, [r.rule['id'] for r in rules]) for cat, rules in candidates],
+                         [("safety", ["motor", "always"]), ("hw", ["esp"]), ("style", ["servo"])])
+
+        candidates = ruleset.candidates(*ruleset.scan("int x;", ""))
+        self.assertEqual([(cat, [r.rule['id'] for r in rules]) for cat, rules in candidates],
+                         [("safety", ["always"])])
+
+    def test_many_rules_single_validation(self):
+        """Test that a large ruleset still resolves each rule correctly."""
+        rules = [{"id": f"r{i}", "severity": "error", "trigger": [f"trig{i}_"], "forbidden": [f"bad{i}_"]} for i in range(300)]
+        v = PDEIValidator({"domain": "test", "validation_rules": {"bulk": rules}})
+        valid, issues = v.validate("trig7_ bad7_ bad8_ trig9_")
+        self.assertFalse(valid)
+        self.assertEqual([i['id'] for i in issues if i['id'].startswith('r')], ["r7"])
+
+class TestRuleRegistry(unittest.TestCase):
+    def test_validators_share_compiled_rules(self):
+        """Test validators for the same config reuse one compiled rule set and result cache."""
+        config = {"domain": "shared", "validation_rules": {"c": [{"id": "x", "forbidden": ["registry_probe("]}]}}
+        first = PDEIValidator(config)
+        builds = RULE_REGISTRY.builds
+        second = PDEIValidator(json.loads(json.dumps(config)))
+        self.assertIs(first.ruleset, second.ruleset)
+        self.assertIs(first.result_cache, second.result_cache)
+        self.assertEqual(RULE_REGISTRY.builds, builds)
+
+    def test_config_change_builds_new_entry(self):
+        """Test suppressed rules and rule content are part of the registry key."""
+        config = {"domain": "shared", "validation_rules": {"c": [{"id": "y", "forbidden": ["registry_probe("]}]}}
+        base = PDEIValidator(config)
+        suppressed = PDEIValidator(dict(config, suppressed_rules=["decay_negative_exponent"]))
+        changed = PDEIValidator({"domain": "shared", "validation_rules": {"c": [{"id": "y", "forbidden": ["other("]}]}})
+        self.assertIsNot(base.ruleset, suppressed.ruleset)
+        self.assertIsNot(base.ruleset, changed.ruleset)
+        ids = [r.get('id') for r in suppressed.validation_rules['formulas']]
+        self.assertNotIn("decay_negative_exponent", ids)
+
+class TestHotReload(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = PROJECT_ROOT / "test_sandbox_reload"
+        self.test_dir.mkdir(exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_incremental_rebuild_reuses_unchanged_categories(self):
+        """Test only changed categories are recompiled and trusted regexes are reused."""
+        rules = {"safety": [{"id": "a", "forbidden": ["delay("]}],
+                 "style": [{"id": "b", "forbidden_regex": [r"Serial\.print\w*"]}]}
+        first = CompiledRuleset(rules)
+        changed = dict(rules, safety=[{"id": "a", "forbidden": ["delay(", "yield("]}])
+        second = CompiledRuleset(json.loads(json.dumps(changed)), previous=first)
+        self.assertEqual(second.reused_categories, ["style"])
+        self.assertIs(second.categories[1][1], first.categories[1][1])
+        self.assertIs(second.regex.combined, first.regex.combined)
+        self.assertIn("yield(", second.scan("yield();", "")[0])
+
+    def test_config_file_edit_is_picked_up(self):
+        """Test an edited domain config swaps in a new rule set without a new validator."""
+        config_path = self.test_dir / f"domain_{uuid.uuid4().hex}.json"
+        config = {"domain": "reload", "validation_rules": {"c": [{"id": "old", "severity": "error", "forbidden": ["old_api("]}]}}
+        config_path.write_text(json.dumps(config))
+        v = PDEIValidator(config, config_path=str(config_path))
+        version = v.rules_version
+        self.assertTrue(v.validate("new_api();")[0])
+
+        config["validation_rules"]["c"][0]["forbidden"] = ["new_api("]
+        config_path.write_text(json.dumps(config))
+        stat = config_path.stat()
+        os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        v._next_reload_check = 0
+        valid, issues = v.validate("new_api();")
+        self.assertFalse(valid)
+        self.assertNotEqual(v.rules_version, version)
+
+    def test_reload_mid_validation_keeps_snapshot(self):
+        """Test a rule set swapped in while a validation runs does not leak into its checks."""
+        domain = f"snapshot_{uuid.uuid4().hex}"
+        v = PDEIValidator({"domain": domain, "validation_rules": {"c": [
+            {"id": "needs_wdt", "severity": "error", "required_regex": r"WDT_\w+\("}]}})
+        other = PDEIValidator({"domain": domain, "validation_rules": {"c": [{"id": "unrelated", "forbidden": ["nope("]}]}})
+        check_rules = v._check_rules
+
+        def reload_then_check(*args):
+            v._entry = other._entry
+            return check_rules(*args)
+
+        v._check_rules = reload_then_check
+        valid, issues = v.validate("void loop() {}")
+        self.assertFalse(valid)
+        self.assertEqual([i['id'] for i in issues if i['id'] in ("needs_wdt", "unrelated")], ["needs_wdt"])
+
+    def test_broken_config_edit_keeps_rules(self):
+        """Test invalid JSON written mid-edit keeps the previous rules."""
+        config_path = self.test_dir / f"domain_{uuid.uuid4().hex}.json"
+        config = {"domain": "reload", "validation_rules": {"c": [{"id": "old", "severity": "error", "forbidden": ["old_api("]}]}}
+        config_path.write_text(json.dumps(config))
+        v = PDEIValidator(config, config_path=str(config_path))
+        config_path.write_text("{ broken")
+        stat = config_path.stat()
+        os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        v._next_reload_check = 0
+        self.assertFalse(v.validate("old_api();")[0])
+
+    def test_external_rule_write_is_picked_up(self):
+        """Test a learned rule written by another process (direct DB write) is loaded."""
+        db_path = self.test_dir / f"test_{uuid.uuid4().hex}.db"
+        memory = PDEIMemory(db_path)
+        v = PDEIValidator({"domain": "reload", "validation_rules": {}}, memory)
+        self.assertEqual(v.validate("Serial.println(x);")[1], [])
+
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO code_rules (rule_text, pattern_find, pattern_replace, confidence, learned_from) VALUES (?, ?, ?, ?, ?)",
+                     ("Use log()", r"Serial\.println", "log", 0.9, "other process"))
+        conn.commit()
+        conn.close()
+        v._next_reload_check = 0
+        _, issues = v.validate("Serial.println(x);")
+        self.assertEqual([i['id'] for i in issues], ["learned_0"])
+
+
+if __name__ == '__main__':
+    unittest.main()
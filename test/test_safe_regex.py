@@ -0,0 +1,125 @@
+import unittest
+import re
+import shutil
+import sys
+import uuid
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core.safe_regex import RegexGuard, UnsafePatternError, check_pattern, is_safe_pattern
+from pdei_core.memory import PDEIMemory
+from pdei_core.logic import PDEIValidator
+
+# Exponential on a run of "x" without a trailing "y": every x can come from either branch
+CATASTROPHIC = r"(x|x)*y"
+
+
+class TestCheckPattern(unittest.TestCase):
+    def test_rejects_nested_quantifiers(self):
+        """Test that the classic catastrophic-backtracking shapes are rejected."""
+        for pattern in [r"(a+)+", r"(\w*\s?)*", r"(?:x|y+)*z", r"((ab)*c?)+", r"(a{2,3})*"]:
+            with self.assertRaises(UnsafePatternError, msg=pattern):
+                check_pattern(pattern)
+
+    def test_accepts_flat_patterns(self):
+        """Test that ordinary learned patterns pass."""
+        for pattern in [r"delay\(\d+\)", r"(ab)+", r"(a{2})*", r"Serial\.print(ln)?", r"\bint\s+\w+", ""]:
+            self.assertTrue(is_safe_pattern(pattern), pattern)
+
+    def test_rejects_invalid_regex(self):
+        """Test that a pattern that does not compile is rejected."""
+        with self.assertRaises(UnsafePatternError):
+            check_pattern(r"(unclosed")
+
+
+class TestRegexGuard(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.guard = RegexGuard(budget=0.3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.guard.close()
+
+    def test_scan_matches_finditer(self):
+        """Test guarded scan returns the same spans as running finditer in process."""
+        patterns = [r"delay\(\d+\)", r"\bx\b", r"missing"]
+        text = "delay(10); x = 1; delay(20);"
+        found, exceeded = self.guard.scan(patterns, text)
+        self.assertEqual(exceeded, [])
+        self.assertEqual(found[r"delay\(\d+\)"], [m.span() for m in re.finditer(r"delay\(\d+\)", text)])
+        self.assertEqual(found[r"\bx\b"], [(11, 12)])
+        self.assertNotIn("missing", found)
+
+    def test_budget_exceeded_is_reported(self):
+        """Test a runaway pattern is cut off and the patterns after it still run."""
+        found, exceeded = self.guard.scan([CATASTROPHIC, r"x+"], "x" * 40)
+        self.assertEqual(exceeded, [CATASTROPHIC])
+        self.assertEqual(found[r"x+"], [(0, 40)])
+
+        # The worker is replaced, so later calls keep working
+        found, exceeded = self.guard.scan([r"y"], "xy")
+        self.assertEqual((found, exceeded), ({"y": [(1, 2)]}, []))
+
+    def test_sub_applies_in_order(self):
+        """Test chained substitutions skip an over-budget pattern and keep the rest."""
+        text, exceeded = self.guard.sub([(r"a", "b"), (CATASTROPHIC, ""), (r"b", "c")], "a" + "x" * 40)
+        self.assertEqual(exceeded, [CATASTROPHIC])
+        self.assertEqual(text, "c" + "x" * 40)
+
+
+class TestLearnedRuleQuarantine(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = PROJECT_ROOT / "test_sandbox_safe_regex"
+        self.test_dir.mkdir(exist_ok=True)
+        self.memory = PDEIMemory(self.test_dir / f"test_{uuid.uuid4().hex}.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _insert_rule(self, find: str, replace: str):
+        # Bypass save_rule to simulate a rule stored before the complexity check existed
+        conn = self.memory.get_connection()
+        conn.execute("INSERT INTO code_rules (rule_text, pattern_find, pattern_replace, confidence, learned_from) VALUES (?, ?, ?, ?, ?)",
+                     ("Legacy rule", find, replace, 0.9, "test"))
+        conn.commit()
+        conn.close()
+
+    def test_validator_quarantines_runaway_rule(self):
+        """Test a learned rule that exceeds the budget is quarantined and not loaded again."""
+        self._insert_rule(r"(x|x)*y", "z")
+        validator = PDEIValidator({"domain": "test", "validation_rules": {}}, self.memory)
+        validator.ruleset.regex.guard = RegexGuard(budget=0.3)
+        try:
+            validator.validate("x" * 40)
+        finally:
+            validator.ruleset.regex.guard.close()
+
+        self.assertEqual([q['find'] for q in self.memory.get_quarantined_rules()], [r"(x|x)*y"])
+        self.assertEqual(self.memory.get_learned_rules(), [])
+        # Fixing with a quarantined pattern leaves the code untouched
+        issue = {"auto_fix": "generic_regex_replace", "trigger_pattern": r"(x|x)*y", "replacement": "z"}
+        self.assertEqual(validator.auto_fix("xxy", [issue]), "xxy")
+
+    def test_validator_quarantines_statically_unsafe_rule(self):
+        """Test a stored rule with nested quantifiers is never executed."""
+        self._insert_rule(r"(a+)+b", "c")
+        validator = PDEIValidator({"domain": "test", "validation_rules": {}}, self.memory)
+        self.assertEqual(validator.validation_rules.get('learned_behavior', []), [])
+        self.assertEqual(self.memory.get_quarantined_rules()[0]['reason'], "Failed static complexity check")
+
+    def test_learned_rule_is_fixed_through_guard(self):
+        """Test a safe learned rule still validates and auto-fixes."""
+        self.memory.save_rule("Use log()", r"Serial\.println\((\w+)\)", r"log(\1)", 0.9, "test")
+        validator = PDEIValidator({"domain": "test", "validation_rules": {}}, self.memory)
+        code = "Serial.println(a);"
+        _, issues = validator.validate(code)
+        self.assertEqual(len(issues), 1)
+        self.assertEqual(validator.auto_fix(code, issues), "log(a);")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -44,7 +44,7 @@ class TestServerAPI(unittest.TestCase):
         self.assertEqual(data["message_id"], 123)
         
         # Verify arguments passed to chat
-        mock_instance.chat.assert_called_with("Hello", force_model="fast", forge_mode="2")
+        mock_instance.chat.assert_called_with("Hello", force_model="fast", forge_mode="2", tuning=None)
 
     @patch('pdei_core.server.buddai_manager')
     def test_session_history(self, mock_manager):
@@ -106,6 +106,75 @@ class TestServerAPI(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         mock_instance.record_feedback.assert_called_with(1, True, "Good job")
 
+    @patch('pdei_core.server.buddai_manager')
+    def test_validate_endpoint_streams_ndjson(self, mock_manager):
+        """Test batch validation returns one NDJSON line per item, in order"""
+        mock_instance = MagicMock()
+        mock_instance.validator.validate_many.return_value = iter([(True, []), (False, [{"id": "no_delay"}])])
+        mock_manager.get_instance.return_value = mock_instance
+
+        payload = {"items": [{"code": "x = 1;"}, {"code": "delay(10);", "context": "motor"}]}
+        response = self.client.post("/api/validate", json=payload)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("application/x-ndjson", response.headers["content-type"])
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([l["index"] for l in lines], [0, 1])
+        self.assertFalse(lines[1]["valid"])
+        mock_instance.validator.validate_many.assert_called_with([("x = 1;", ""), ("delay(10);", "motor")], workers=None)
+
+    @patch('pdei_core.server.buddai_manager')
+    def test_validator_stats_endpoint(self, mock_manager):
+        """Test the validator profiler report is exposed"""
+        mock_instance = MagicMock()
+        mock_instance.validator.profile_report.return_value = {"enabled": True, "validations": 3, "rules": []}
+        mock_manager.get_instance.return_value = mock_instance
+
+        response = self.client.get("/api/system/validator-stats")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["validations"], 3)
+
+    def test_forge_tune_endpoint(self):
+        """Test the tau sweep returns the best k with its curves, and rejects bad constraints"""
+        response = self.client.post("/api/forge/tune", json={"response_time_s": 0.5, "loop_rate_hz": 100})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data["feasible"])
+        self.assertLessEqual(data["settling_time_s"], 0.5)
+        self.assertEqual(len(data["curves"]["t"]), len(data["curves"]["step"]))
+
+        response = self.client.post("/api/forge/tune", json={"response_time_s": -1})
+        self.assertEqual(response.status_code, 422)
+        response = self.client.post("/api/forge/tune", json={"settle_band": 1.5})
+        self.assertEqual(response.status_code, 400)
+
+    def test_forge_tune_rejects_oversized_sweeps(self):
+        """Test out-of-range sweep sizes are rejected before anything is allocated"""
+        response = self.client.post("/api/forge/tune", json={"candidates": 1_000_000})
+        self.assertEqual(response.status_code, 422)
+        response = self.client.post("/api/forge/tune", json={"response_time_s": 60, "loop_rate_hz": 100_000, "candidates": 20_000})
+        self.assertEqual(response.status_code, 400)
+
+    @patch('pdei_core.server.buddai_manager')
+    def test_chat_with_tuning_constraints(self, mock_manager):
+        """Test optimized tuning constraints are passed through to the build"""
+        mock_instance = MagicMock()
+        mock_instance.chat.return_value = "ok"
+        mock_manager.get_instance.return_value = mock_instance
+
+        payload = {"message": "Build a servo controller", "tuning": {"response_time_s": 0.2}}
+        response = self.client.post("/api/chat", json=payload)
+        self.assertEqual(response.status_code, 200)
+        mock_instance.chat.assert_called_with("Build a servo controller", force_model=None, forge_mode="2",
+                                              tuning={"response_time_s": 0.2})
+
+    @patch('pdei_core.server.buddai_manager')
+    def test_chat_rejects_out_of_range_tuning(self, mock_manager):
+        """Test chat tuning constraints get the same bounds as /api/forge/tune"""
+        response = self.client.post("/api/chat", json={"message": "hi", "tuning": {"loop_rate_hz": 1e6}})
+        self.assertEqual(response.status_code, 422)
+        mock_manager.get_instance.return_value.chat.assert_not_called()
+
     # --- New Tests (10) ---
 
     def test_chat_missing_message(self):
@@ -179,7 +248,7 @@ class TestServerAPI(unittest.TestCase):
             mock_manager.get_instance.return_value = mock_instance
             response = self.client.post("/api/chat", json={"message": "hi", "model": "unknown_model"})
             self.assertEqual(response.status_code, 200)
-            mock_instance.chat.assert_called_with("hi", force_model="unknown_model", forge_mode='2')
+            mock_instance.chat.assert_called_with("hi", force_model="unknown_model", forge_mode='2', tuning=None)
 
     def test_cors_preflight(self):
         """Test CORS preflight request."""
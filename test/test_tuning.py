@@ -0,0 +1,96 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core import tuning
+from pdei_core.lut import lut_header_for_tau
+from pdei_core.tuning import TuningConstraints, k_to_tau, optimize_tuning
+
+
+class TestConstraints(unittest.TestCase):
+    def test_from_dict_ignores_missing_values(self):
+        """Test unset keys keep their defaults and numeric strings are accepted."""
+        constraints = TuningConstraints.from_dict({"response_time_s": "0.2", "max_overshoot": None})
+        self.assertEqual(constraints.response_time_s, 0.2)
+        self.assertEqual(constraints.max_overshoot, 0.0)
+        self.assertEqual(constraints.dt, 0.01)
+
+    def test_rejects_bad_constraints(self):
+        """Test non-positive times, bands outside (0, 1) and a zero target raise ValueError."""
+        with self.assertRaises(ValueError):
+            TuningConstraints(response_time_s=0)
+        with self.assertRaises(ValueError):
+            TuningConstraints(settle_band=1.5)
+        with self.assertRaises(ValueError):
+            TuningConstraints(target=0)
+
+    def test_rejects_non_finite_and_out_of_range_constraints(self):
+        """Test infinite or NaN values and rates beyond the API bounds raise ValueError."""
+        for bad in ({"loop_rate_hz": float("inf")}, {"target": float("inf")}, {"response_time_s": float("nan")},
+                    {"loop_rate_hz": 1e6}, {"response_time_s": 61}):
+            with self.subTest(bad=bad), self.assertRaises(ValueError):
+                TuningConstraints.from_dict(bad)
+
+
+class TestOptimizeTuning(unittest.TestCase):
+    def test_rejects_oversized_sweep(self):
+        """Test a sweep larger than MAX_SWEEP_CELLS raises ValueError instead of allocating it."""
+        constraints = TuningConstraints(response_time_s=60, loop_rate_hz=100_000)
+        with self.assertRaises(ValueError):
+            optimize_tuning(constraints, candidates=20_000)
+
+    def test_picks_gentlest_k_meeting_response_time(self):
+        """Test the chosen k settles in time and a slightly smaller k would not."""
+        constraints = TuningConstraints(response_time_s=0.5, loop_rate_hz=100)
+        result = optimize_tuning(constraints)
+        self.assertTrue(result["feasible"])
+        self.assertLessEqual(result["settling_time_s"], 0.5)
+        self.assertEqual(result["overshoot"], 0.0)
+        # 2 % band after 50 loops: (1 - k)^50 <= 0.02
+        self.assertAlmostEqual(result["k"], 1 - 0.02 ** (1 / 49), delta=0.005)
+        self.assertAlmostEqual(result["tau"], k_to_tau(result["k"], 0.01))
+
+    def test_overshoot_limit_excludes_large_k(self):
+        """Test k above 1 is only chosen when overshoot is allowed."""
+        strict = optimize_tuning(TuningConstraints(response_time_s=0.005, loop_rate_hz=100))
+        self.assertFalse(strict["feasible"])
+        self.assertLessEqual(strict["k"], 1.0 + 1e-9)
+        self.assertEqual(strict["overshoot"], 0.0)
+
+    def test_curves_cover_response_window(self):
+        """Test step, growth and decay curves are sampled on the same time axis."""
+        result = optimize_tuning(TuningConstraints(target=4.0, response_time_s=1.0), candidates=64)
+        curves = result["curves"]
+        self.assertEqual(result["candidates"], 64)
+        self.assertEqual(len(curves["t"]), len(curves["step"]))
+        self.assertEqual(curves["decay"][0], 1.0)
+        self.assertEqual(curves["growth"][0], 0.0)
+        self.assertAlmostEqual(curves["step"][-1], 4.0, delta=4.0 * 0.02)
+
+    def test_float_fallback_matches(self):
+        """Test the pure-Python sweep picks the same candidate as the vectorized one."""
+        constraints = TuningConstraints(response_time_s=0.3, max_overshoot=0.1, loop_rate_hz=50)
+        expected = optimize_tuning(constraints, candidates=128)
+        saved = tuning.np
+        tuning.np = None
+        try:
+            result = optimize_tuning(constraints, candidates=128)
+        finally:
+            tuning.np = saved
+        self.assertAlmostEqual(result["k"], expected["k"])
+        self.assertEqual(result["feasible_candidates"], expected["feasible_candidates"])
+
+    def test_lut_header_for_optimized_tau(self):
+        """Test the optimized time constant can be turned into lookup tables."""
+        result = optimize_tuning(TuningConstraints(response_time_s=0.5))
+        header = lut_header_for_tau(result["tau"])
+        self.assertIn(f"Time constant {result['tau']:g} s", header)
+        self.assertIn("FORGE_DECAY_LUT", header)
+
+
+if __name__ == '__main__':
+    unittest.main()
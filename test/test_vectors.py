@@ -0,0 +1,149 @@
+import unittest
+import json
+import shutil
+import sys
+import uuid
+from pathlib import Path
+
+# Add project root to sys.path
+PROJECT_ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pdei_core import vectors
+from pdei_core.memory import PDEIMemory, close_pool
+from pdei_core.vectors import HashingEmbedder, OllamaEmbedder, VectorIndex, code_tokens, make_embedder
+
+FUNCTIONS = [
+    ("GilBot", "setMotorSpeed", "void setMotorSpeed(int pwm) { ledcWrite(MOTOR_CHANNEL, pwm); motorSpeed = pwm; }"),
+    ("GilBot", "readBatteryVoltage", "float readBatteryVoltage() { int raw = analogRead(BATTERY_PIN); return raw * 3.3 / 4095.0 * 2; }"),
+    ("ServoLab", "servo_sweep", "void servo_sweep() { for (int angle = 0; angle < 180; angle++) { servo.write(angle); delay(15); } }"),
+    ("GilBot", "beepBuzzer", "void beepBuzzer(int ms) { tone(BUZZER_PIN, 2000); delay(ms); noTone(BUZZER_PIN); }"),
+]
+
+
+class TestVectorIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = PROJECT_ROOT / "test_sandbox_vectors" / uuid.uuid4().hex
+        self.test_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.test_dir / "test.db"
+        self.memory = PDEIMemory(self.db_path)
+        for repo, func, content in FUNCTIONS:
+            self._index_function(repo, func, content)
+
+    def tearDown(self):
+        close_pool(self.db_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(PROJECT_ROOT / "test_sandbox_vectors", ignore_errors=True)
+
+    def _index_function(self, repo, func, content):
+        with self.memory.connection() as conn:
+            conn.execute(
+                "INSERT INTO repo_index (user_id, file_path, repo_name, function_name, content) VALUES ('default', ?, ?, ?, ?)",
+                (f"{repo}/{func}.ino", repo, func, content)
+            )
+
+    def test_code_tokens(self):
+        """Test identifiers are kept whole and split into their snake_case and camelCase parts."""
+        tokens = code_tokens("void setMotorSpeed(int motor_pwm)")
+        for token in ("setmotorspeed", "set", "motor", "speed", "motor_pwm", "pwm"):
+            self.assertIn(token, tokens)
+
+    def test_hashing_embedder_is_deterministic(self):
+        """Test the same text always hashes to the same vector (no per-process salt)."""
+        embedder = HashingEmbedder(dim=64)
+        first, second = embedder.embed(["servo.write(angle)", "servo.write(angle)"])
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 64)
+        self.assertTrue(any(first))
+
+    def test_search_ranks_relevant_function_first(self):
+        """Test a request finds the function closest in meaning, with its code."""
+        index = VectorIndex(self.memory)
+        index.rebuild()
+        self.assertEqual(index.search("sweep the servo angle")[0]["function"], "servo_sweep")
+        hit = index.search("check the battery voltage", k=1)[0]
+        self.assertEqual((hit["repo"], hit["function"]), ("GilBot", "readBatteryVoltage"))
+        self.assertIn("analogRead", hit["content"])
+        self.assertGreater(hit["score"], 0)
+        self.assertEqual(index.search("quantum chromodynamics", min_score=0.5), [])
+
+    def test_stale_index_rebuilds_in_background(self):
+        """Test a stale index returns nothing (keyword fallback) and is rebuilt off the search path."""
+        index = VectorIndex(self.memory)
+        self.assertEqual(index.rebuild(), len(FUNCTIONS))
+        self._index_function("GilBot", "blinkStatusLed", "void blinkStatusLed() { digitalWrite(LED_PIN, !digitalRead(LED_PIN)); }")
+        self.assertEqual(index.search("blink the status led", k=1), [])
+        index._rebuild_thread.join(10)
+        self.assertEqual(index.search("blink the status led", k=1)[0]["function"], "blinkStatusLed")
+
+    def test_rebuild_leaves_running_searches_their_snapshot(self):
+        """Test a rebuild fits a new embedder and writes a new matrix file instead of changing the ones in use."""
+        index = VectorIndex(self.memory)
+        index.rebuild()
+        meta, matrix, embedder = index._load()
+        idf = list(embedder.idf)
+        self._index_function("GilBot", "blinkStatusLed", "void blinkStatusLed() { digitalWrite(LED_PIN, HIGH); }")
+        index.rebuild()
+
+        self.assertEqual(embedder.idf, idf)
+        self.assertIsNot(index.embedder, embedder)
+        self.assertEqual(len(VectorIndex._scores(meta, matrix, [0.0] * meta["dim"])), len(FUNCTIONS))
+        current = index._load()[0]
+        self.assertNotEqual(current["matrix"], meta["matrix"])
+        self.assertEqual(list(index.directory.glob(f"{index.stem}.*.f16")), [index.directory / current["matrix"]])
+
+    def test_missing_index_is_not_built_inline(self):
+        """Test the first search does not embed the corpus itself."""
+        index = VectorIndex(self.memory)
+        self.assertEqual(index.search("servo sweep"), [])
+        index._rebuild_thread.join(10)
+        self.assertEqual(index.search("servo sweep", k=1)[0]["function"], "servo_sweep")
+
+    def test_user_ids_get_distinct_files(self):
+        """Test user IDs that sanitize to the same name still get their own index files."""
+        first = VectorIndex(PDEIMemory(self.db_path, user_id="a.b"))
+        second = VectorIndex(PDEIMemory(self.db_path, user_id="a_b"))
+        self.assertNotEqual(first.stem, second.stem)
+        self.assertNotEqual(first.meta_path, second.meta_path)
+
+    def test_index_persists_across_instances(self):
+        """Test a second index over the same files loads them instead of re-embedding."""
+        VectorIndex(self.memory).rebuild()
+        index = VectorIndex(self.memory)
+        self.assertTrue((index.directory / json.loads(index.meta_path.read_text())["matrix"]).exists())
+        index.rebuild = lambda: self.fail("index was rebuilt")
+        self.assertEqual(index.search("buzzer beep", k=1)[0]["function"], "beepBuzzer")
+
+    def test_empty_index(self):
+        """Test a user with nothing indexed gets no results."""
+        index = VectorIndex(PDEIMemory(self.db_path, user_id="nobody"))
+        self.assertEqual(index.rebuild(), 0)
+        self.assertEqual(index.search("motor speed"), [])
+
+    def test_make_embedder(self):
+        """Test config values map to embedders, and unknown ones fall back to hashing with a warning."""
+        self.assertIsInstance(make_embedder(None), HashingEmbedder)
+        self.assertEqual(make_embedder("ollama").name, f"ollama:{vectors.DEFAULT_OLLAMA_MODEL}")
+        self.assertEqual(make_embedder("ollama:mxbai-embed-large").name, "ollama:mxbai-embed-large")
+        self.assertIsInstance(make_embedder("ollama"), OllamaEmbedder)
+        with self.assertLogs(level="WARNING"):
+            self.assertIsInstance(make_embedder("word2vec"), HashingEmbedder)
+
+    @unittest.skipIf(vectors.np is None, "NumPy is not installed")
+    def test_python_fallback_matches(self):
+        """Test the pure-Python scan ranks the same functions as the NumPy one."""
+        VectorIndex(self.memory).rebuild()
+        expected = [hit["function"] for hit in VectorIndex(self.memory).search("motor pwm speed", k=3)]
+        saved = vectors.np
+        vectors.np = None
+        try:
+            result = [hit["function"] for hit in VectorIndex(self.memory).search("motor pwm speed", k=3)]
+        finally:
+            vectors.np = saved
+        self.assertEqual(result, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()